@@ -267,38 +267,46 @@ class HiveServerTRowSet2(object):
     self.rows = row_set.rows
     self.schema = schema
     self.startRowOffset = row_set.startRowOffset
+    self._columns = None
+    self._rows_iterator = None
+
+  @property
+  def columns(self):
+    """
+    Values of each TColumn, decoded only once per row set. Rows are transposed lazily from these arrays when iterating.
+    """
+    if self._columns is None:
+      self._columns = [HiveServerTColumnValue2(column).val for column in (self.row_set.columns or [])]
+    return self._columns
 
   def is_empty(self):
-    return not self.row_set.columns or not HiveServerTColumnValue2(self.row_set.columns[0]).val
+    return not self.row_set.columns or not self.columns[0]
 
   def cols(self, col_names):
-    cols_rows = []
-
-    rs = HiveServerTRow2(self.row_set.columns, self.schema)
-    cols = [rs.full_col(name) for name in col_names]
-
-    for cols_row in zip(*cols):
-      cols_rows.append(dict(zip(col_names, cols_row)))
+    positions = [HiveServerTRow2.get_col_position(self.schema, name) for name in col_names]
+    cols = [self.columns[pos] for pos in positions]
 
-    return cols_rows
+    return [dict(zip(col_names, cols_row)) for cols_row in zip(*cols)]
 
   def __iter__(self):
     return self
 
   def __next__(self):
-    if self.row_set.columns:
-      return HiveServerTRow2(self.row_set.columns, self.schema)
-    else:
-      raise StopIteration
+    if self._rows_iterator is None:
+      self._rows_iterator = zip(*self.columns)
+    return HiveServerTRow2(self.row_set.columns, self.schema, values=next(self._rows_iterator))
 
 
 class HiveServerTRow2(object):
-  def __init__(self, cols, schema):
+  def __init__(self, cols, schema, values=None):
     self.cols = cols
     self.schema = schema
+    self.values = values
 
   def col(self, colName):
     pos = self._get_col_position(colName)
+    if self.values is not None:
+      return self.values[pos]
     try:
       return HiveServerTColumnValue2(self.cols[pos]).val[0]  # Return only first element
     except Exception:
@@ -310,9 +318,15 @@ class HiveServerTRow2(object):
     return HiveServerTColumnValue2(self.cols[pos]).val  # Return the full column and its values
 
   def _get_col_position(self, column_name):
-    return list(filter(lambda i_col1: i_col1[1].columnName == column_name, enumerate(self.schema.columns)))[0][0]
+    return self.get_col_position(self.schema, column_name)
+
+  @classmethod
+  def get_col_position(cls, schema, column_name):
+    return list(filter(lambda i_col1: i_col1[1].columnName == column_name, enumerate(schema.columns)))[0][0]
 
   def fields(self):
+    if self.values is not None:
+      return list(self.values)
     try:
       return [HiveServerTColumnValue2(field).val.pop(0) for field in self.cols]
     except IndexError:
@@ -349,42 +363,9 @@ class HiveServerTColumnValue2(object):
     column.nulls = ''  # Clear the null values for not re-marking again the column with nulls at the next call
     return column.values
 
-  @classmethod
-  def mark_nulls(cls, values, bytestring):
-    if isinstance(bytestring, bytes):
-      mask = bytearray(bytestring)
-    else:
-      bitstring = python_util.from_string_to_bits(bytestring)
-      mask = python_util.get_bytes_from_bits(bitstring)
-
-    for n in mask:
-      yield n & 0x01
-      yield n & 0x02
-      yield n & 0x04
-      yield n & 0x08
-
-      yield n & 0x10
-      yield n & 0x20
-      yield n & 0x40
-      yield n & 0x80
-
   @classmethod
   def set_nulls(cls, values, nulls):
-    can_decode = True
-    bytestring = nulls
-    if isinstance(bytestring, bytes):
-      try:
-        bytestring = bytestring.decode('utf-8')
-      except Exception:
-        can_decode = False
-
-    if bytestring == '' or (can_decode and re.match('^(\x00)+$', bytestring)):  # HS2 has just \x00 or '', Impala can have \x00\x00...
-      return values
-    else:
-      _values = [None if is_null else value for value, is_null in zip(values, cls.mark_nulls(values, nulls))]
-      if len(values) != len(_values):  # HS2 can have just \x00\x01 instead of \x00\x01\x00...
-        _values.extend(values[len(_values):])
-      return _values
+    return python_util.set_nulls(values, nulls)
 
 
 class HiveServerDataTable(DataTable):
@@ -21,12 +21,12 @@ import logging
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
-from TCLIService.ttypes import TStatusCode
+from TCLIService.ttypes import TColumn, TColumnDesc, TI32Column, TRowSet, TStatusCode, TStringColumn, TTableSchema
 
 from beeswax.conf import CLOSE_SESSIONS, MAX_NUMBER_OF_SESSIONS
 from beeswax.models import HiveServerQueryHandle, Session
 from beeswax.server.dbms import QueryServerException, get_query_server_config
-from beeswax.server.hive_server2_lib import HiveServerClient, HiveServerClientCompatible, HiveServerTable
+from beeswax.server.hive_server2_lib import HiveServerClient, HiveServerClientCompatible, HiveServerTable, HiveServerTRowSet2
 from desktop.auth.backend import rewrite_user
 from desktop.lib.django_test_util import make_logged_in_client
 from useradmin.models import User
@@ -1041,3 +1041,45 @@ class TestHiveServerClientCompatible():
     ]
 
     assert sorted_table == massaged_tables
+
+
+class TestHiveServerTRowSet2():
+
+  def setup_method(self):
+    self.schema = TTableSchema(columns=[TColumnDesc(columnName='id', position=0), TColumnDesc(columnName='name', position=1)])
+
+  def _row_set(self):
+    return TRowSet(
+      startRowOffset=0,
+      rows=[],
+      columns=[
+        TColumn(i32Val=TI32Column(values=[1, 2, 3], nulls=b'\x02')),
+        TColumn(stringVal=TStringColumn(values=['a', 'b', 'c'], nulls=b'\x04')),
+      ]
+    )
+
+  def test_iterate_rows(self):
+    row_set = HiveServerTRowSet2(self._row_set(), self.schema)
+
+    assert not row_set.is_empty()
+    assert [[1, 'a'], [None, 'b'], [3, None]] == [row.fields() for row in row_set]
+
+  def test_columns_decoded_once(self):
+    row_set = HiveServerTRowSet2(self._row_set(), self.schema)
+
+    with patch('beeswax.server.hive_server2_lib.HiveServerTColumnValue2.set_nulls', side_effect=lambda values, nulls: values) as set_nulls:
+      row_set.is_empty()
+      list(row_set)
+
+      assert 2 == set_nulls.call_count
+
+  def test_cols(self):
+    row_set = HiveServerTRowSet2(self._row_set(), self.schema)
+
+    assert [{'name': 'a', 'id': 1}, {'name': 'b', 'id': None}, {'name': None, 'id': 3}] == row_set.cols(('name', 'id'))
+
+  def test_is_empty(self):
+    row_set = TRowSet(startRowOffset=0, rows=[], columns=[TColumn(i32Val=TI32Column(values=[], nulls=b''))])
+
+    assert HiveServerTRowSet2(row_set, self.schema).is_empty()
+    assert [] == list(HiveServerTRowSet2(row_set, self.schema))
@@ -18,11 +18,11 @@
 import os
 import json
 import logging
-import operator
 import mimetypes
 import posixpath
 from io import BytesIO as string_io
 
+from django.core.cache import cache
 from django.core.paginator import EmptyPage, Paginator
 from django.http import HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
 from django.utils.http import http_date
@@ -45,12 +45,15 @@ from desktop.lib.tasks.extract_archive.extract_utils import extract_archive_in_h
 from filebrowser.conf import (
   ENABLE_EXTRACT_UPLOADED_ARCHIVE,
   FILE_DOWNLOAD_CACHE_CONTROL,
+  FILE_LISTING_CACHE_MAX_ENTRIES,
+  FILE_LISTING_CACHE_TIMEOUT,
   MAX_FILE_SIZE_UPLOAD_LIMIT,
   REDIRECT_DOWNLOAD,
   RESTRICT_FILE_EXTENSIONS,
   SHOW_DOWNLOAD_BUTTON,
 )
 from filebrowser.lib import xxd
+from filebrowser.lib.listing_cache import SORT_KEYS, ListingCache, get_listing_version, invalidates_listings
 from filebrowser.lib.rwx import compress_mode, filetype, rwx
 from filebrowser.utils import parse_broker_url
 from filebrowser.views import (
@@ -70,6 +73,8 @@ from useradmin.models import Group, User
 
 LOG = logging.getLogger()
 
+_listing_cache = None
+
 
 def error_handler(view_fn):
   def decorator(*args, **kwargs):
@@ -212,9 +217,14 @@ def listdir_paged(request):
   """
   A paginated version of listdir.
 
+  The listings are cached for a short time, so that the pages of a directory do not list it again.
+
   Query parameters:
     pagenum           - The page number to show. Defaults to 1.
     pagesize          - How many to show on a page. Defaults to 30.
+    page_token        - Pages with continuation tokens instead of page numbers when set: empty for the first page, then the
+                        next_page_token of the previous page. The filesystem pages the listing itself when it is not sorted
+                        or filtered.
     sortby=?          - Specify attribute to sort by. Accepts: (type, name, atime, mtime, size, user, group). Defaults to name.
     descending        - Specify a descending sort order. Default to false.
     filter=?          - Specify a substring filter to search for in the filename field.
@@ -227,6 +237,7 @@ def listdir_paged(request):
 
   pagenum = int(request.GET.get('pagenum', 1))
   pagesize = int(request.GET.get('pagesize', 30))
+  page_token = request.GET.get('page_token')
 
   do_as = None
   if is_admin(request.user) or request.user.has_hue_permission(action="impersonate", app="security"):
@@ -234,62 +245,93 @@ def listdir_paged(request):
   if hasattr(request, 'doas'):
     do_as = request.doas
 
-  try:
+  filter_string = request.GET.get('filter')
+  descending = coerce_bool(request.GET.get('descending'))
+  sortby = request.GET.get('sortby')
+  if sortby and sortby not in SORT_KEYS:
+    LOG.info(f'Invalid sort attribute {sortby} for list directory operation. Skipping it.')
+    sortby = None
+
+  def list_as_user(fn, *args):
     if do_as:
-      all_stats = request.fs.do_as_user(do_as, request.fs.listdir_stats, path)
-    else:
-      all_stats = request.fs.listdir_stats(path)
-  except (S3ListAllBucketsException, GSListAllBucketsException) as e:
-    return HttpResponse(f'Bucket listing is not allowed: {str(e)}', status=403)
+      return request.fs.do_as_user(do_as, fn, *args)
+    return fn(*args)
 
-  # Filter first
-  filter_string = request.GET.get('filter')
-  if filter_string:
-    filtered_stats = [sb for sb in all_stats if filter_string in sb['name']]
-    all_stats = filtered_stats
+  def get_stats():
+    key = (request.user.username, get_listing_version(request), do_as, request.fs._get_scheme(path), path)
+    listing = _get_listing_cache().get(key, lambda: list_as_user(request.fs.listdir_stats, path))
+    return listing.get_stats(sortby=sortby, descending=descending, filter_string=filter_string)
 
-  # Sort next
-  sortby = request.GET.get('sortby')
-  descending_param = request.GET.get('descending')
-  if sortby:
-    if sortby not in ('type', 'name', 'atime', 'mtime', 'user', 'group', 'size'):
-      LOG.info(f'Invalid sort attribute {sortby} for list directory operation. Skipping it.')
+  response = {}
+  page = None
+  try:
+    if page_token is not None:
+      shown_stats = None
+      if not sortby and not filter_string:
+        try:
+          shown_stats, next_page_token = list_as_user(request.fs.listdir_stats_paged, path, pagesize, page_token or None)
+        except NotImplementedError:
+          pass
+
+      if shown_stats is None:
+        try:
+          offset = int(page_token or 0)
+        except ValueError:
+          return HttpResponse(f'Invalid page token {page_token}: the sort order or filter changed.', status=400)
+        all_stats = get_stats()
+        shown_stats = all_stats[offset:offset + pagesize]
+        next_page_token = str(offset + pagesize) if offset + pagesize < len(all_stats) else None
+
+      response['next_page_token'] = next_page_token
     else:
-      all_stats = sorted(all_stats, key=operator.attrgetter(sortby), reverse=coerce_bool(descending_param))
+      all_stats = get_stats()
+  except (S3ListAllBucketsException, GSListAllBucketsException) as e:
+    return HttpResponse(f'Bucket listing is not allowed: {str(e)}', status=403)
 
   # Do pagination
-  try:
-    paginator = Paginator(all_stats, pagesize, allow_empty_first_page=True)
-    page = paginator.page(pagenum)
-    shown_stats = page.object_list
-  except EmptyPage:
-    message = "No results found for the requested page."
-    LOG.warning(message)
-    return HttpResponse(message, status=404)  # TODO: status code?
+  if page_token is None:
+    try:
+      paginator = Paginator(all_stats, pagesize, allow_empty_first_page=True)
+      page = paginator.page(pagenum)
+      shown_stats = page.object_list
+    except EmptyPage:
+      message = "No results found for the requested page."
+      LOG.warning(message)
+      return HttpResponse(message, status=404)  # TODO: status code?
 
-  if page:
-    page.object_list = [_massage_stats(request, stat_absolute_path(path, s)) for s in shown_stats]
+  shown_stats = [_massage_stats(request, stat_absolute_path(path, s)) for s in shown_stats]
 
   # TODO: Shift below fields to /get_config?
   is_hdfs = request.fs._get_scheme(path) == 'hdfs'
   is_trash_enabled = is_hdfs and int(get_trash_interval()) > 0
   is_fs_superuser = is_hdfs and _is_hdfs_superuser(request)
 
-  response = {
+  response.update({
     'is_trash_enabled': is_trash_enabled,
-    'files': page.object_list if page else [],
+    'files': shown_stats,
     'page': _massage_page(page, paginator) if page else {},  # TODO: Check if we need to clean response of _massage_page
     # TODO: Check what to keep or what to remove? or move some fields to /get_config?
     'is_fs_superuser': is_fs_superuser,
-    'groups': is_fs_superuser and [str(x) for x in Group.objects.values_list('name', flat=True)] or [],
-    'users': is_fs_superuser and [str(x) for x in User.objects.values_list('username', flat=True)] or [],
+    'groups': is_fs_superuser and cache.get_or_set(
+      'filebrowser_groups', lambda: [str(x) for x in Group.objects.values_list('name', flat=True)], FILE_LISTING_CACHE_TIMEOUT.get()
+    ) or [],
+    'users': is_fs_superuser and cache.get_or_set(
+      'filebrowser_users', lambda: [str(x) for x in User.objects.values_list('username', flat=True)], FILE_LISTING_CACHE_TIMEOUT.get()
+    ) or [],
     'superuser': request.fs.superuser,
     'supergroup': request.fs.supergroup,
-  }
+  })
 
   return JsonResponse(response)
 
 
+def _get_listing_cache():
+  global _listing_cache
+  if _listing_cache is None:
+    _listing_cache = ListingCache(FILE_LISTING_CACHE_TIMEOUT.get(), FILE_LISTING_CACHE_MAX_ENTRIES.get())
+  return _listing_cache
+
+
 @api_error_handler
 def display(request):
   """
@@ -395,6 +437,7 @@ def upload_complete(request):
 
 
 @api_error_handler
+@invalidates_listings
 def upload_file(request):
   # Read request body first to prevent RawPostDataException later on which occurs when trying to access body after it has already been read
   body_data_bytes = string_io(request.body)
@@ -441,6 +484,7 @@ def upload_file(request):
 
 
 @api_error_handler
+@invalidates_listings
 def mkdir(request):
   # TODO: Check if this needs to be a PUT request
   path = request.POST.get('path')
@@ -454,6 +498,7 @@ def mkdir(request):
 
 
 @api_error_handler
+@invalidates_listings
 def touch(request):
   path = request.POST.get('path')
   name = request.POST.get('name')
@@ -466,6 +511,7 @@ def touch(request):
 
 
 @api_error_handler
+@invalidates_listings
 def save_file(request):
   """
   The POST endpoint to save a file in the file editor.
@@ -494,6 +540,7 @@ def save_file(request):
 
 
 @api_error_handler
+@invalidates_listings
 def rename(request):
   source_path = request.POST.get('source_path', '')
   destination_path = request.POST.get('destination_path', '')
@@ -529,6 +576,7 @@ def rename(request):
 
 
 @api_error_handler
+@invalidates_listings
 def move(request):
   source_path = request.POST.get('source_path', '')
   destination_path = request.POST.get('destination_path', '')
@@ -541,6 +589,7 @@ def move(request):
 
 
 @api_error_handler
+@invalidates_listings
 def copy(request):
   source_path = request.POST.get('source_path', '')
   destination_path = request.POST.get('destination_path', '')
@@ -584,6 +633,7 @@ def content_summary(request):
 
 
 @api_error_handler
+@invalidates_listings
 def set_replication(request):
   # TODO: Check if this needs to be a PUT request
   path = request.POST.get('path')
@@ -597,6 +647,7 @@ def set_replication(request):
 
 
 @api_error_handler
+@invalidates_listings
 def rmtree(request):
   # TODO: Check if this needs to be a DELETE request
   path = request.POST.get('path')
@@ -627,6 +678,7 @@ def get_trash_path(request):
 
 
 @api_error_handler
+@invalidates_listings
 def trash_restore(request):
   path = request.POST.get('path')
   request.fs.restore(path)
@@ -635,6 +687,7 @@ def trash_restore(request):
 
 
 @api_error_handler
+@invalidates_listings
 def trash_purge(request):
   request.fs.purge_trash()
 
@@ -642,6 +695,7 @@ def trash_purge(request):
 
 
 @api_error_handler
+@invalidates_listings
 def chown(request):
   # TODO: Check if this needs to be a PUT request
   path = request.POST.get('path')
@@ -656,6 +710,7 @@ def chown(request):
 
 
 @api_error_handler
+@invalidates_listings
 def chmod(request):
   # TODO: Check if this needs to be a PUT request
   # Order matters for calculating mode below
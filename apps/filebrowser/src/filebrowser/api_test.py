@@ -20,7 +20,7 @@ from unittest.mock import Mock, patch
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from filebrowser.api import rename, upload_file
+from filebrowser.api import listdir_paged, rename, upload_file
 from filebrowser.conf import (
   MAX_FILE_SIZE_UPLOAD_LIMIT,
   RESTRICT_FILE_EXTENSIONS,
@@ -33,6 +33,7 @@ class TestSimpleFileUploadAPI:
       with patch('filebrowser.api.stat_absolute_path') as stat_absolute_path:
         with patch('filebrowser.api._massage_stats') as _massage_stats:
           request = Mock(
+            session={},
             method='POST',
             META=Mock(),
             POST={'destination_path': 's3a://test-bucket/test-user/'},
@@ -91,6 +92,7 @@ class TestSimpleFileUploadAPI:
   def test_upload_invalid_file_type(self):
     with patch('filebrowser.api.string_io') as string_io:
       request = Mock(
+        session={},
         method='POST',
         META=Mock(),
         POST={'destination_path': 's3a://test-bucket/test-user/'},
@@ -121,6 +123,7 @@ class TestSimpleFileUploadAPI:
   def test_upload_file_exceeds_max_size(self):
     with patch('filebrowser.api.string_io') as string_io:
       request = Mock(
+        session={},
         method='POST',
         META=Mock(),
         POST={'destination_path': 's3a://test-bucket/test-user/'},
@@ -151,6 +154,7 @@ class TestSimpleFileUploadAPI:
   def test_upload_file_already_exists(self):
     with patch('filebrowser.api.string_io') as string_io:
       request = Mock(
+        session={},
         method='POST',
         META=Mock(),
         POST={'destination_path': 's3a://test-bucket/test-user/'},
@@ -180,6 +184,7 @@ class TestSimpleFileUploadAPI:
   def test_destination_path_does_not_exists(self):
     with patch('filebrowser.api.string_io') as string_io:
       request = Mock(
+        session={},
         method='POST',
         META=Mock(),
         POST={'destination_path': 's3a://test-bucket/test-user/'},
@@ -209,6 +214,7 @@ class TestSimpleFileUploadAPI:
   def test_file_upload_failure(self):
     with patch('filebrowser.api.string_io') as string_io:
       request = Mock(
+        session={},
         method='POST',
         META=Mock(),
         POST={'destination_path': 's3a://test-bucket/test-user/'},
@@ -239,6 +245,7 @@ class TestSimpleFileUploadAPI:
 class TestRenameAPI:
   def test_rename_success(self):
     request = Mock(
+      session={},
       method='POST',
       POST={'source_path': 's3a://test-bucket/test-user/source.txt', 'destination_path': 'new_name.txt'},
       body=Mock(),
@@ -259,6 +266,7 @@ class TestRenameAPI:
 
   def test_rename_restricted_file_type(self):
     request = Mock(
+      session={},
       method='POST',
       POST={'source_path': 's3a://test-bucket/test-user/source.txt', 'destination_path': 'new_name.exe'},
       body=Mock(),
@@ -277,6 +285,7 @@ class TestRenameAPI:
 
   def test_rename_hash_in_path(self):
     request = Mock(
+      session={},
       method='POST',
       POST={'source_path': 's3a://test-bucket/test-user/source.txt', 'destination_path': 'new#name.txt'},
       body=Mock(),
@@ -295,6 +304,7 @@ class TestRenameAPI:
 
   def test_rename_destination_exists(self):
     request = Mock(
+      session={},
       method='POST',
       POST={'source_path': 's3a://test-bucket/test-user/source.txt', 'destination_path': 'new_name.txt'},
       body=Mock(),
@@ -315,6 +325,7 @@ class TestRenameAPI:
 
   def test_rename_no_source_path(self):
     request = Mock(
+      session={},
       method='POST',
       POST={'destination_path': 'new_name.txt'},
       body=Mock(),
@@ -333,6 +344,7 @@ class TestRenameAPI:
 
   def test_rename_no_destination_path(self):
     request = Mock(
+      session={},
       method='POST',
       POST={'source_path': 's3a://test-bucket/test-user/source.txt'},
       body=Mock(),
@@ -348,3 +360,17 @@ class TestRenameAPI:
       assert response.content.decode('utf-8') == 'Missing required parameters: source_path and destination_path'
     finally:
       reset()
+
+
+class TestListdirPagedAPI:
+  def test_listdir_paged_invalid_page_token(self):
+    request = Mock(
+      session={},
+      GET={'path': 's3a://test-bucket/test-user', 'page_token': 'test-user/file_1', 'sortby': 'name'},  # Marker of an unsorted page
+      fs=Mock(isdir=Mock(return_value=True)),
+    )
+
+    response = listdir_paged(request)
+
+    assert response.status_code == 400
+    request.fs.listdir_stats.assert_not_called()
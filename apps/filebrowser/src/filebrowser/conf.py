@@ -111,3 +111,20 @@ RESTRICT_FILE_EXTENSIONS = Config(
     'Specify file extensions that are not allowed, separated by commas. For example: .exe, .zip, .rar, .tar, .gz'
   ),
 )
+
+FILE_LISTING_CACHE_TIMEOUT = Config(
+  key='file_listing_cache_timeout',
+  default=30,
+  type=int,
+  help=_(
+    'Number of seconds a directory listing is cached for a user, so that paging or sorting it does not list the directory again. '
+    'The changes made by other users or in other sessions can take this long to show. A value of 0 disables the cache.'
+  ),
+)
+
+FILE_LISTING_CACHE_MAX_ENTRIES = Config(
+  key='file_listing_cache_max_entries',
+  default=1000000,
+  type=int,
+  help=_('Maximum number of directory entries in the cached listings of a Hue process. Larger listings are not cached.'),
+)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Short-lived cache of directory listings.
+
+Paging through a large directory lists it once instead of at every page, and its entries are sorted once per sort order
+instead of at every page too. The listings are kept as is in the memory of the process, so that serving a page does not
+copy or decode the whole listing.
+
+The listings of a user are keyed by a version which is changed by the operations of the user on the filesystems, so that
+they see their own changes right away. The version is kept in the session of the user, which is shared by all the Hue
+processes, unlike the default cache. Changes made by other users or in other sessions can take the timeout of the cache
+to show.
+"""
+
+import time
+import operator
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+SORT_KEYS = ('type', 'name', 'atime', 'mtime', 'user', 'group', 'size')
+LISTING_VERSION_SESSION_KEY = 'filebrowser_listing_version'
+
+
+def get_listing_version(request):
+  return request.session.get(LISTING_VERSION_SESSION_KEY, 0)
+
+
+def invalidate_listings(request):
+  # Not incrementing, as the listings of this version could have been cached by another session of the user
+  request.session[LISTING_VERSION_SESSION_KEY] = max(int(time.time() * 1000), get_listing_version(request) + 1)
+
+
+def invalidates_listings(view_fn):
+  """
+  Decorator of the views changing files, which discards the cached listings of the user even if the view fails midway.
+  """
+  @wraps(view_fn)
+  def decorator(request, *args, **kwargs):
+    try:
+      return view_fn(request, *args, **kwargs)
+    finally:
+      invalidate_listings(request)
+  return decorator
+
+
+class Listing(object):
+
+  def __init__(self, stats, expires):
+    self.stats = stats
+    self.expires = expires
+    self._orders = {}
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self.stats)
+
+  def get_stats(self, sortby=None, descending=False, filter_string=None):
+    """
+    Returns the stats sorted by the attribute sortby if it is one of SORT_KEYS, and only the ones with a name containing
+    filter_string if it is set.
+    """
+    stats = self.stats
+
+    if sortby in SORT_KEYS:
+      order = (sortby, descending)
+      with self._lock:
+        if order not in self._orders:
+          self._orders[order] = sorted(self.stats, key=operator.attrgetter(sortby), reverse=descending)
+        stats = self._orders[order]
+
+    if filter_string:
+      stats = [stat for stat in stats if filter_string in stat['name']]
+
+    return stats
+
+
+class ListingCache(object):
+  """
+  Listings of directories by key, e.g. (user, filesystem, path), kept for timeout seconds.
+
+  The least recently used listings are dropped when the cached listings have more than max_entries entries in total.
+  Listings with more entries than this are not cached.
+  """
+
+  def __init__(self, timeout, max_entries):
+    self.timeout = timeout
+    self.max_entries = max_entries
+
+    self._listings = OrderedDict()
+    self._entries = 0
+    self._lock = threading.Lock()
+
+  def get(self, key, list_stats):
+    """
+    Returns the listing of key, calling list_stats() for the stats of the directory when it is not cached or expired.
+    """
+    now = time.time()
+    with self._lock:
+      listing = self._listings.get(key)
+      if listing is not None:
+        if listing.expires > now:
+          self._listings.move_to_end(key)
+          return listing
+        self._pop(key)
+
+    listing = Listing(list_stats(), now + self.timeout)
+
+    if self.timeout > 0 and len(listing) <= self.max_entries:
+      with self._lock:
+        self._pop(key)
+        self._listings[key] = listing
+        self._entries += len(listing)
+        while self._entries > self.max_entries:
+          self._pop(next(iter(self._listings)))
+
+    return listing
+
+  def _pop(self, key):
+    listing = self._listings.pop(key, None)
+    if listing is not None:
+      self._entries -= len(listing)
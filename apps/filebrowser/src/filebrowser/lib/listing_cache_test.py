@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest.mock import Mock, patch
+
+from filebrowser.lib.listing_cache import ListingCache, get_listing_version, invalidate_listings
+
+
+class Stat(dict):
+  def __getattr__(self, name):
+    return self[name]
+
+
+def make_stats(*names):
+  return [Stat(name=name, size=len(name), type='FILE') for name in names]
+
+
+class TestListingCache(object):
+
+  def test_get(self):
+    cache = ListingCache(timeout=30, max_entries=10)
+    calls = []
+
+    def list_stats():
+      calls.append(1)
+      return make_stats('b', 'a')
+
+    assert ['b', 'a'] == [stat.name for stat in cache.get('key', list_stats).get_stats()]
+    assert ['b', 'a'] == [stat.name for stat in cache.get('key', list_stats).get_stats()]
+    assert 1 == len(calls)
+
+    cache.get('other', list_stats)
+    assert 2 == len(calls)
+
+    with patch('filebrowser.lib.listing_cache.time.time', return_value=1e12):
+      cache.get('key', list_stats)
+    assert 3 == len(calls)
+
+  def test_disabled(self):
+    cache = ListingCache(timeout=0, max_entries=10)
+    calls = []
+
+    def list_stats():
+      calls.append(1)
+      return make_stats('a')
+
+    cache.get('key', list_stats)
+    cache.get('key', list_stats)
+    assert 2 == len(calls)
+
+  def test_max_entries(self):
+    cache = ListingCache(timeout=30, max_entries=4)
+
+    cache.get('a', lambda: make_stats('1', '2'))
+    cache.get('b', lambda: make_stats('1', '2'))
+    cache.get('a', lambda: make_stats('1', '2'))  # Now the most recently used
+    cache.get('c', lambda: make_stats('1'))
+    cache.get('d', lambda: make_stats('1', '2', '3', '4', '5'))  # Too large
+
+    assert ['a', 'c'] == list(cache._listings)
+    assert 3 == cache._entries
+
+  def test_get_stats(self):
+    listing = ListingCache(timeout=30, max_entries=10).get('key', lambda: make_stats('bb', 'a', 'ccc', 'ab'))
+
+    assert ['a', 'ab', 'bb', 'ccc'] == [stat.name for stat in listing.get_stats(sortby='name')]
+    assert ['ccc', 'bb', 'ab', 'a'] == [stat.name for stat in listing.get_stats(sortby='name', descending=True)]
+    assert ['bb', 'ab'] == [stat.name for stat in listing.get_stats(sortby='size', descending=True, filter_string='b')]
+    assert ['bb', 'a', 'ccc', 'ab'] == [stat.name for stat in listing.get_stats(sortby='unknown')]
+
+    assert listing.get_stats(sortby='name') is listing.get_stats(sortby='name')
+
+
+def test_invalidate_listings():
+  request = Mock(session={})
+  other_request = Mock(session={})  # e.g. of another browser
+  version = get_listing_version(request)
+  assert version == get_listing_version(request)
+
+  invalidate_listings(request)
+  assert version != get_listing_version(request)
+  assert get_listing_version(request) == get_listing_version(request)
+  assert version == get_listing_version(other_request)
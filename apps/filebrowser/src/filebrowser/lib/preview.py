@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming decoders of the file previews.
+
+They only read the part of a file needed for the requested window, so that previewing a large compressed, Avro or Parquet
+file does not load it into memory.
+"""
+
+import io
+import bz2
+import zlib
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from avro import datafile, io as avro_io
+
+READ_SIZE = 1024 * 1024  # Bytes read from the file system at a time
+DECOMPRESSED_SIZE = 1024 * 1024  # Maximum bytes decompressed at a time
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+GZIP_MAGIC = b'\x1f\x8b'
+AVRO_SYNC_SIZE = 16
+
+
+class RemoteFile(io.RawIOBase):
+  """
+  Random access to a file of the file systems, whose handles only support seek() and read().
+  """
+
+  def __init__(self, fhandle, size=None):
+    self.fhandle = fhandle
+    if size is None:
+      fhandle.seek(0, io.SEEK_END)
+      size = fhandle.tell()
+    self.size = size
+    self._pos = 0
+
+  def readable(self):
+    return True
+
+  def seekable(self):
+    return True
+
+  def tell(self):
+    return self._pos
+
+  def seek(self, offset, whence=io.SEEK_SET):
+    if whence == io.SEEK_SET:
+      self._pos = offset
+    elif whence == io.SEEK_CUR:
+      self._pos += offset
+    elif whence == io.SEEK_END:
+      self._pos = self.size + offset
+    else:
+      raise ValueError('Invalid whence: %s' % whence)
+    return self._pos
+
+  def readinto(self, buffer):
+    length = min(len(buffer), self.size - self._pos)
+    if length <= 0:
+      return 0
+    self.fhandle.seek(self._pos)
+    data = self.fhandle.read(length)
+    buffer[:len(data)] = data
+    self._pos += len(data)
+    return len(data)
+
+
+def open_remote(fhandle, size=None):
+  """
+  Returns a buffered and seekable file object reading the file handle READ_SIZE bytes at a time.
+  """
+  return io.BufferedReader(RemoteFile(fhandle, size), buffer_size=READ_SIZE)
+
+
+def iter_gzip(fileobj):
+  """
+  Yields the decompressed content of a gzip file, possibly made of several members, by chunks of at most DECOMPRESSED_SIZE.
+  """
+  decompressor = zlib.decompressobj(GZIP_WBITS)
+  data = b''
+
+  while True:
+    if not data:
+      data = fileobj.read(READ_SIZE)
+      if not data:
+        break
+    chunk = decompressor.decompress(data, DECOMPRESSED_SIZE)
+    data = decompressor.unconsumed_tail
+
+    if decompressor.eof:
+      data = decompressor.unused_data
+      if data and not GZIP_MAGIC.startswith(data[:2]):
+        if chunk:
+          yield chunk
+        return  # Trailing garbage, e.g. padding, is ignored like gzip does
+      decompressor = zlib.decompressobj(GZIP_WBITS)
+
+    if chunk:
+      yield chunk
+
+  chunk = decompressor.flush()
+  if chunk:
+    yield chunk
+
+
+def iter_bz2(fileobj):
+  """
+  Yields the decompressed content of a bzip2 file, possibly made of several streams, by chunks of at most DECOMPRESSED_SIZE.
+  """
+  decompressor = bz2.BZ2Decompressor()
+  data = b''
+
+  while True:
+    if not data and decompressor.needs_input:
+      data = fileobj.read(READ_SIZE)
+      if not data:
+        break
+    chunk = decompressor.decompress(data, DECOMPRESSED_SIZE)
+    data = b''
+
+    if decompressor.eof:
+      data = decompressor.unused_data
+      decompressor = bz2.BZ2Decompressor()
+
+    if chunk:
+      yield chunk
+
+
+def read_range(chunks, offset, length):
+  """
+  Returns the length bytes after offset of the content yielded by chunks, without consuming the following chunks.
+  """
+  contents = []
+  size = 0
+  try:
+    for chunk in chunks:
+      if offset >= len(chunk):
+        offset -= len(chunk)
+        continue
+      chunk = chunk[offset:offset + length - size]
+      offset = 0
+      contents.append(chunk)
+      size += len(chunk)
+      if size >= length:
+        break
+  finally:
+    chunks.close()
+  return b''.join(contents)
+
+
+def seek_avro_sync(fileobj, sync_marker, offset):
+  """
+  Moves to the first sync marker at or after offset, i.e. to the beginning of a block, and returns False if there is none.
+  """
+  fileobj.seek(offset)
+  tail = b''
+
+  while True:
+    data = fileobj.read(READ_SIZE)
+    if not data:
+      return False
+    buffer = tail + data
+    index = buffer.find(sync_marker)
+    if index != -1:
+      fileobj.seek(offset - len(tail) + index)
+      return True
+    tail = buffer[-(AVRO_SYNC_SIZE - 1):]
+    offset += len(data)
+
+
+def read_avro(fileobj, offset, length):
+  """
+  Returns the records of the blocks starting at or after offset, up to the first one ending after length more bytes.
+  """
+  reader = datafile.DataFileReader(fileobj, avro_io.DatumReader())
+  try:
+    if offset > fileobj.tell() and not seek_avro_sync(fileobj, reader.sync_marker, offset):
+      return ''
+
+    contents = []
+    read_start = fileobj.tell()
+    for datum in reader:
+      if fileobj.tell() - read_start > length and contents:
+        break
+      contents.append(str(datum) + '\n')
+    return ''.join(contents)
+  finally:
+    reader.close()
+
+
+def read_parquet(fileobj, offset, length):
+  """
+  Returns the rows offset to offset + length of a Parquet file as a DataFrame, read from the footer of the file and the row
+  groups they belong to.
+  """
+  parquet_file = pq.ParquetFile(fileobj)
+  metadata = parquet_file.metadata
+
+  first_row = 0  # Of the first row group to read
+  first_row_group = metadata.num_row_groups
+  for index in range(metadata.num_row_groups):
+    num_rows = metadata.row_group(index).num_rows
+    if first_row + num_rows > offset:
+      first_row_group = index
+      break
+    first_row += num_rows
+
+  batches = []
+  rows = first_row
+  if first_row_group < metadata.num_row_groups and length > 0:
+    for batch in parquet_file.iter_batches(row_groups=range(first_row_group, metadata.num_row_groups)):
+      batches.append(batch)
+      rows += batch.num_rows
+      if rows >= offset + length:
+        break
+
+  data_frame = pa.Table.from_batches(batches, schema=parquet_file.schema_arrow).to_pandas()
+  if isinstance(data_frame.index, pd.RangeIndex):
+    data_frame.index = pd.RangeIndex(first_row, first_row + len(data_frame))
+  return data_frame.iloc[offset - first_row:offset - first_row + length]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bz2
+import gzip
+import random
+from io import BytesIO
+from unittest.mock import patch
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from avro import datafile, io as avro_io, schema
+
+from filebrowser.lib.preview import iter_bz2, iter_gzip, open_remote, read_avro, read_parquet, read_range
+
+
+class ReadCountingFile(BytesIO):
+  def __init__(self, data):
+    BytesIO.__init__(self, data)
+    self.bytes_read = 0
+
+  def read(self, size=-1):
+    data = BytesIO.read(self, size)
+    self.bytes_read += len(data)
+    return data
+
+
+def make_content():
+  random.seed(1)
+  return b''.join(b'%d %s\n' % (i, str(random.random()).encode()) for i in range(200000))
+
+
+def test_read_gzip():
+  content = make_content()
+  data = gzip.compress(content[:1000]) + gzip.compress(content[1000:])  # Several members
+
+  assert content[:10] == read_range(iter_gzip(open_remote(BytesIO(data))), 0, 10)
+  assert content[995:1010] == read_range(iter_gzip(open_remote(BytesIO(data))), 995, 15)
+  assert content[-5:] == read_range(iter_gzip(open_remote(BytesIO(data))), len(content) - 5, 100)
+  assert b'' == read_range(iter_gzip(open_remote(BytesIO(data))), len(content), 100)
+
+
+def test_read_gzip_streams():
+  content = make_content()
+  fhandle = ReadCountingFile(gzip.compress(content))
+
+  with patch('filebrowser.lib.preview.READ_SIZE', 1024), patch('filebrowser.lib.preview.DECOMPRESSED_SIZE', 1024):
+    assert content[2000:2100] == read_range(iter_gzip(open_remote(fhandle)), 2000, 100)
+
+  assert fhandle.bytes_read < len(fhandle.getvalue()) / 10
+
+
+def test_read_bz2():
+  content = make_content()
+  data = bz2.compress(content[:1000]) + bz2.compress(content[1000:])  # Several streams
+
+  assert content[:10] == read_range(iter_bz2(open_remote(BytesIO(data))), 0, 10)
+  assert content[995:1010] == read_range(iter_bz2(open_remote(BytesIO(data))), 995, 15)
+  assert content[-5:] == read_range(iter_bz2(open_remote(BytesIO(data))), len(content) - 5, 100)
+
+
+def test_read_avro():
+  test_schema = schema.Parse('{"name": "test", "type": "record", "fields": [{"name": "id", "type": "int"}]}')
+  data = BytesIO()
+  writer = datafile.DataFileWriter(data, avro_io.DatumWriter(), writer_schema=test_schema)
+  for i in range(1000):
+    writer.append({'id': i})
+    if i % 100 == 99:
+      writer.sync()  # New block
+  writer.flush()
+  data = data.getvalue()
+
+  assert "{'id': 0}\n" == read_avro(open_remote(BytesIO(data)), 0, 1)
+  lines = read_avro(open_remote(BytesIO(data)), 0, 20).splitlines()
+  assert 1 < len(lines) < 100
+  assert ["{'id': %d}" % i for i in range(len(lines))] == lines
+
+  record = eval(read_avro(open_remote(BytesIO(data)), len(data) // 2, 1))  # From the next block
+  assert 0 < record['id'] and 0 == record['id'] % 100
+
+  assert '' == read_avro(open_remote(BytesIO(data)), len(data) - 1, 1)
+
+
+def test_read_parquet():
+  data_frame = pd.DataFrame({'id': range(1000), 'name': ['name%d' % i for i in range(1000)]})
+  data = BytesIO()
+  pq.write_table(pa.Table.from_pandas(data_frame), data, row_group_size=100)
+
+  assert data_frame.iloc[250:260].to_string() == read_parquet(open_remote(BytesIO(data.getvalue())), 250, 10).to_string()
+  assert data_frame.iloc[990:1000].to_string() == read_parquet(open_remote(BytesIO(data.getvalue())), 990, 100).to_string()
+  assert 0 == len(read_parquet(open_remote(BytesIO(data.getvalue())), 1000, 100))
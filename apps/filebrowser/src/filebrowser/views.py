@@ -28,15 +28,11 @@ import posixpath
 import urllib.error
 import urllib.request
 from builtins import object, str as new_str
-from bz2 import decompress
 from datetime import datetime
 from functools import partial
-from gzip import decompress as decompress_gzip
-from io import BytesIO, StringIO as string_io
+from io import StringIO as string_io
 from urllib.parse import quote as urllib_quote, unquote as urllib_unquote, urlparse as lib_urlparse
 
-import pandas as pd
-from avro import datafile, io
 from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
 from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
 from django.http import Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
@@ -98,6 +94,8 @@ from filebrowser.forms import (
 )
 from filebrowser.lib import xxd
 from filebrowser.lib.archives import archive_factory
+from filebrowser.lib.listing_cache import invalidate_listings, invalidates_listings
+from filebrowser.lib.preview import iter_bz2, iter_gzip, open_remote, read_avro, read_parquet, read_range
 from filebrowser.lib.rwx import filetype, rwx
 from hadoop.conf import UPLOAD_CHUNK_SIZE
 from hadoop.core_site import get_trash_interval
@@ -423,6 +421,7 @@ def edit(request, path, form=None):
   return render("edit.mako", request, data)
 
 
+@invalidates_listings
 def save_file(request):
   """
   The POST endpoint to save a file in the file editor.
@@ -893,7 +892,6 @@ def read_contents(codec_type, path, fs, offset, length):
       codec_type = 'none'
       if path.endswith('.gz') and detect_gzip(contents):
         codec_type = 'gzip'
-        offset = 0
       elif (path.endswith('.bz2') or path.endswith('.bzip2')) and detect_bz2(contents):
         codec_type = 'bz2'
       elif path.endswith('.avro') and detect_avro(contents):
@@ -953,24 +951,7 @@ def _read_snappy(fhandle, path, offset, length, stats):
 def _read_avro(fhandle, path, offset, length, stats):
   contents = ''
   try:
-    fhandle.seek(offset)
-    data_file_reader = datafile.DataFileReader(fhandle, io.DatumReader())
-
-    try:
-      contents_list = []
-      read_start = fhandle.tell()
-      # Iterate over the entire sought file.
-      for datum in data_file_reader:
-        read_length = fhandle.tell() - read_start
-        if read_length > length and len(contents_list) > 0:
-          break
-        else:
-          datum_str = str(datum) + "\n"
-          contents_list.append(datum_str)
-    finally:
-      data_file_reader.close()
-
-    contents = "".join(contents_list)
+    contents = read_avro(open_remote(fhandle, stats.size if stats else None), offset, length)
   except Exception as e:
     logging.exception('Could not read avro file at "%s": %s' % (path, e))
     raise PopupException(_("Failed to read Avro file."))
@@ -979,16 +960,7 @@ def _read_avro(fhandle, path, offset, length, stats):
 
 def _read_parquet(fhandle, path, offset, length, stats):
   try:
-    size = 1 * 128 * 1024 * 1024  # Buffer file stream to 128 MiB chunks
-
-    fhandle.seek(offset)
-    file_data = BytesIO(fhandle.read(size))
-
-    data_frame = pd.read_parquet(file_data, engine='pyarrow')
-
-    data_chunk = data_frame.iloc[offset:offset + length].to_string()
-
-    return data_chunk
+    return read_parquet(open_remote(fhandle, stats.size if stats else None), offset, length).to_string()
   except Exception as e:
     logging.exception('Could not read parquet file at "%s": %s' % (path, e))
     raise PopupException(_("Failed to read Parquet file."))
@@ -996,10 +968,8 @@ def _read_parquet(fhandle, path, offset, length, stats):
 
 def _read_gzip(fhandle, path, offset, length, stats):
   contents = ''
-  if offset and offset != 0:
-    raise PopupException(_("Offsets are not supported with Gzip compression."))
   try:
-    contents = decompress_gzip(fhandle.read())
+    contents = read_range(iter_gzip(open_remote(fhandle, stats.size if stats else None)), offset, length)
   except Exception as e:
     logging.exception('Could not decompress file at "%s": %s' % (path, e))
     raise PopupException(_("Failed to decompress file."))
@@ -1009,7 +979,7 @@ def _read_gzip(fhandle, path, offset, length, stats):
 def _read_bz2(fhandle, path, offset, length, stats):
   contents = ''
   try:
-    contents = decompress(fhandle.read(length))
+    contents = read_range(iter_bz2(open_remote(fhandle, stats.size if stats else None)), offset, length)
   except Exception as e:
     logging.exception('Could not decompress file at "%s": %s' % (path, e))
     raise PopupException(_("Failed to decompress file."))
@@ -1238,6 +1208,8 @@ def generic_op(form_class, request, op, parameter_names, piggyback=None, templat
       except NotImplementedError as e:
         msg = _("Cannot perform operation.")
         raise PopupException(msg, detail=e)
+      finally:
+        invalidate_listings(request)
 
       if next:
         logging.debug("Next: %s" % next)
@@ -1522,6 +1494,7 @@ def extract_upload_data(request, method):
 
 
 @require_http_methods(["POST"])
+@invalidates_listings
 def upload_chunks(request):
   """
   View function to handle chunked file uploads using Fine Uploader.
@@ -1555,6 +1528,7 @@ def upload_chunks(request):
 
 
 @require_http_methods(["POST"])
+@invalidates_listings
 def upload_complete(request):
   """
   View function that handles the completion of a file upload.
@@ -1572,6 +1546,7 @@ def upload_complete(request):
 
 
 @require_http_methods(["POST"])
+@invalidates_listings
 def upload_file(request):
   """
   A wrapper around the actual upload view function to clean up the temporary file afterwards if it fails.
@@ -971,9 +971,9 @@ class TestFileBrowserWithHadoop(object):
     assert response.context[0]['view']['compression'] == "gzip"
     assert 'Output rendered from compressed' in response.content, response.content
 
-    # offset should do nothing
+    # offsets are in the decompressed content
     response = self.c.get('/filebrowser/view=%s/test-view.gz?compression=gzip&offset=1' % prefix)
-    assert "Offsets are not supported" in response.context[0]['message'], response.context[0]['message']
+    assert response.context[0]['view']['contents'] == "df\n"
 
     f = self.cluster.fs.open(prefix + '/test-view2.gz', "w")
     f.write("hello")
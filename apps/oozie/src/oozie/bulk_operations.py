@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Bulk operations of the dashboard, e.g. killing hundreds of coordinators at once.
+
+The jobs are fetched by batches of ids with the Oozie jobs API instead of one by one to check the permissions, then controlled
+concurrently. Each job gets its own result, an error on one job does not stop the others.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.utils.translation import gettext as _
+
+from desktop.auth.backend import is_admin
+from desktop.lib.rest.http_client import RestException
+from desktop.log.access import access_warn
+from liboozie.oozie_api import get_oozie
+from oozie.conf import BULK_OPERATION_BATCH_SIZE, BULK_OPERATION_WORKERS
+
+LOG = logging.getLogger()
+
+
+def get_job_type(job_id):
+  if job_id.endswith('W'):
+    return 'wf'
+  elif job_id.endswith('C'):
+    return 'coord'
+  else:
+    return 'bundle'
+
+
+class BulkJobControl(object):
+  """
+  Sends an action, e.g. kill, suspend or resume, to a list of Oozie jobs on behalf of a user.
+  """
+
+  def __init__(self, user, action, request=None, workers=None, batch_size=None, on_progress=None):
+    self.user = user
+    self.action = action
+    self.request = request  # For logging the denied accesses
+    self.workers = workers or BULK_OPERATION_WORKERS.get()
+    self.batch_size = batch_size or BULK_OPERATION_BATCH_SIZE.get()
+    self.on_progress = on_progress  # Called with the response after each job
+    self._local = threading.local()
+
+  def run(self, job_ids):
+    """
+    Returns the number of requests and errors, the error messages and the result of each job, in the order of job_ids.
+    """
+    job_ids = list(dict.fromkeys(job_ids))
+    response = {'totalRequests': len(job_ids), 'totalErrors': 0, 'messages': '', 'done': 0, 'results': []}
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='OozieBulkOperation') as executor:
+      jobs = self._get_jobs(executor, job_ids)
+
+      futures = {}
+      for job_id in job_ids:
+        error = self._check_permission(job_id, jobs.get(job_id))
+        if error:
+          results[job_id] = self._add_result(response, job_id, error)
+        else:
+          futures[executor.submit(self._control, job_id)] = job_id
+
+      for future in as_completed(futures):
+        job_id = futures[future]
+        results[job_id] = self._add_result(response, job_id, future.result())
+
+    response['results'] = [results[job_id] for job_id in job_ids]
+    response['messages'] = ' '.join(result['message'] for result in response['results'] if result['message'])
+    return response
+
+  def _get_api(self):
+    if not hasattr(self._local, 'api'):
+      self._local.api = get_oozie(self.user)  # One connection pool per thread
+    return self._local.api
+
+  def _get_jobs(self, executor, job_ids):
+    """
+    Returns the jobs by id, fetched by batches of the same type.
+    """
+    batches = []
+    for job_type in ('wf', 'coord', 'bundle'):
+      ids = [job_id for job_id in job_ids if get_job_type(job_id) == job_type]
+      batches.extend((job_type, ids[i:i + self.batch_size]) for i in range(0, len(ids), self.batch_size))
+
+    jobs = {}
+    for batch_jobs in executor.map(lambda batch: self._get_batch(*batch), batches):
+      jobs.update(batch_jobs)
+    return jobs
+
+  def _get_batch(self, job_type, job_ids):
+    api = self._get_api()
+    try:
+      job_list = api.get_jobs(job_type, cnt=len(job_ids), filters=[('id', job_id) for job_id in job_ids])
+      return dict((job.id, job) for job in job_list.jobs if job.id in job_ids)
+    except RestException as ex:
+      LOG.warning('Failed to get the Oozie jobs %s with one call, getting them one by one: %s' % (', '.join(job_ids), ex))
+
+    jobs = {}
+    for job_id in job_ids:
+      try:
+        if job_type == 'wf':
+          jobs[job_id] = api.get_job(job_id)
+        elif job_type == 'coord':
+          jobs[job_id] = api.get_coordinator(job_id)
+        else:
+          jobs[job_id] = api.get_bundle(job_id)
+      except RestException:
+        LOG.exception('Error accessing Oozie job %s' % job_id)
+    return jobs
+
+  def _check_permission(self, job_id, job):
+    """
+    Returns why the user cannot control the job, if so.
+    """
+    from oozie.views.dashboard import has_dashboard_jobs_access, has_job_edition_permission
+
+    if job is None:
+      return _("Error accessing Oozie job %s.") % (job_id,)
+
+    if not (is_admin(self.user) or job.user == self.user.username or has_dashboard_jobs_access(self.user)):
+      message = _("Permission denied. %(username)s does not have the permissions to access job %(id)s.") % \
+          {'username': self.user.username, 'id': job_id}
+      if self.request is not None:
+        access_warn(self.request, message)
+      return message
+
+    if not has_job_edition_permission(job, self.user):
+      return _("Permission denied. %(username)s does not have the permissions to modify job %(id)s.") % \
+          {'username': self.user.username, 'id': job_id}
+
+  def _control(self, job_id):
+    try:
+      self._get_api().job_control(job_id, self.action)
+    except RestException as ex:
+      LOG.exception("Error performing bulk operation for job_id=%s", job_id)
+      return ex._headers.get('oozie-error-message') or str(ex)
+
+  def _add_result(self, response, job_id, error):
+    response['done'] += 1
+    if error:
+      response['totalErrors'] += 1
+    result = {'id': job_id, 'status': -1 if error else 0, 'message': error or ''}
+
+    if self.on_progress is not None:
+      self.on_progress(response)
+    return result
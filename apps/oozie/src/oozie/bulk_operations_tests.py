@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from desktop.lib.exceptions_renderable import PopupException
+from desktop.lib.rest.http_client import RestException
+from oozie.bulk_operations import BulkJobControl
+from oozie.tasks import BulkJobControlError
+from oozie.views.dashboard import bulk_manage_oozie_jobs_status
+
+
+class MockOozieApi(object):
+
+  def __init__(self, jobs, failing=(), batch_error=False):
+    self.jobs = jobs
+    self.failing = failing
+    self.batch_error = batch_error
+    self.get_jobs_calls = []
+    self.controlled = []
+    self.lock = threading.Lock()
+
+  def get_jobs(self, jobtype, offset=None, cnt=None, filters=None):
+    ids = [value for key, value in filters if key == 'id']
+    with self.lock:
+      self.get_jobs_calls.append((jobtype, ids))
+    if self.batch_error:
+      raise RestException('Filter not supported')
+    return Mock(jobs=[self.jobs[job_id] for job_id in ids if job_id in self.jobs])
+
+  def get_job(self, jobid):
+    if jobid not in self.jobs:
+      raise RestException('Job %s not found' % jobid)
+    return self.jobs[jobid]
+
+  get_coordinator = get_bundle = get_job
+
+  def job_control(self, jobid, action, properties=None, parameters=None):
+    if jobid in self.failing:
+      raise RestException('Could not %s %s' % (action, jobid))
+    with self.lock:
+      self.controlled.append((jobid, action))
+
+
+def make_job(job_id, user='test'):
+  return Mock(id=job_id, user=user, group=None, acl=None)
+
+
+class TestBulkJobControl(object):
+
+  def setup_method(self):
+    self.user = Mock(username='test', is_superuser=False)
+    self.patchers = [
+      patch('oozie.bulk_operations.is_admin', return_value=False),
+      patch('oozie.views.dashboard.is_admin', return_value=False),
+      patch('oozie.views.dashboard.has_dashboard_jobs_access', return_value=False),
+    ]
+    for patcher in self.patchers:
+      patcher.start()
+
+  def teardown_method(self):
+    for patcher in self.patchers:
+      patcher.stop()
+
+  def _run(self, api, job_ids, **kwargs):
+    with patch('oozie.bulk_operations.get_oozie', return_value=api):
+      return BulkJobControl(self.user, 'kill', workers=4, batch_size=2, **kwargs).run(job_ids)
+
+  def test_run(self):
+    job_ids = ['000000%d-oozie-oozi-%s' % (i, 'WCB'[i % 3]) for i in range(7)]
+    api = MockOozieApi(dict((job_id, make_job(job_id)) for job_id in job_ids))
+    progress = []
+
+    response = self._run(api, job_ids, on_progress=lambda response: progress.append(response['done']))
+
+    assert 7 == response['totalRequests']
+    assert 0 == response['totalErrors']
+    assert job_ids == [result['id'] for result in response['results']]
+    assert sorted((job_id, 'kill') for job_id in job_ids) == sorted(api.controlled)
+    assert list(range(1, 8)) == progress
+
+    # Permissions checked by batches of the same type
+    assert 4 == len(api.get_jobs_calls)
+    assert all(len(ids) <= 2 for jobtype, ids in api.get_jobs_calls)
+
+  def test_run_errors(self):
+    jobs = {
+      '0000000-oozie-oozi-W': make_job('0000000-oozie-oozi-W'),
+      '0000001-oozie-oozi-W': make_job('0000001-oozie-oozi-W', user='other'),
+      '0000002-oozie-oozi-W': make_job('0000002-oozie-oozi-W'),
+    }
+    api = MockOozieApi(jobs, failing=['0000002-oozie-oozi-W'])
+
+    response = self._run(api, ['0000000-oozie-oozi-W', '0000001-oozie-oozi-W', '0000002-oozie-oozi-W', '0000003-oozie-oozi-W'])
+
+    assert 3 == response['totalErrors']
+    assert [0, -1, -1, -1] == [result['status'] for result in response['results']]
+    assert 'Permission denied' in response['results'][1]['message']
+    assert 'Could not kill' in response['results'][2]['message']
+    assert 'Error accessing Oozie job 0000003-oozie-oozi-W' in response['results'][3]['message']
+    assert [('0000000-oozie-oozi-W', 'kill')] == [call for call in api.controlled if call[0] != '0000002-oozie-oozi-W']
+
+  def test_run_without_batches(self):
+    job_ids = ['0000000-oozie-oozi-W', '0000001-oozie-oozi-C']
+    api = MockOozieApi(dict((job_id, make_job(job_id)) for job_id in job_ids), batch_error=True)
+
+    response = self._run(api, job_ids)
+
+    assert 0 == response['totalErrors']
+    assert sorted((job_id, 'kill') for job_id in job_ids) == sorted(api.controlled)
+
+
+class TestBulkManageOozieJobsStatus(object):
+
+  def _get_status(self, state, info, username='test'):
+    request = Mock(user=Mock(username=username))
+    with patch('oozie.tasks.bulk_manage_oozie_jobs_task.AsyncResult', return_value=Mock(state=state, info=info)):
+      return json.loads(bulk_manage_oozie_jobs_status(request, 'task-id').content)
+
+  def test_status(self):
+    assert {'state': 'PENDING', 'username': 'test'} == self._get_status('PENDING', {'username': 'test'})
+    assert {'state': 'FAILURE', 'username': 'test', 'messages': 'Oozie is down'} == self._get_status(
+      'FAILURE', BulkJobControlError('test', 'Oozie is down')
+    )
+    assert {'state': 'FAILURE'} == self._get_status('FAILURE', Exception('Worker lost'))  # Owner unknown
+
+  def test_status_of_other_user(self):
+    with pytest.raises(PopupException):
+      self._get_status('PENDING', {'username': 'test'}, username='other')
+
+    with pytest.raises(PopupException):
+      self._get_status('FAILURE', BulkJobControlError('test', 'Oozie is down'), username='other')
@@ -116,6 +116,20 @@ ENABLE_ALTUS_ACTION = Config(
   default=False
 )
 
+BULK_OPERATION_WORKERS = Config(
+  key="bulk_operation_workers",
+  help=_t("Number of jobs killed, suspended or resumed concurrently by the bulk operations of the dashboard."),
+  type=int,
+  default=10
+)
+
+BULK_OPERATION_BATCH_SIZE = Config(
+  key="bulk_operation_batch_size",
+  help=_t("Number of jobs whose permissions are checked with one Oozie API call by the bulk operations of the dashboard."),
+  type=int,
+  default=50
+)
+
 
 def config_validator(user):
   res = []
@@ -20,6 +20,7 @@ from __future__ import division
 import os
 import re
 import sys
+import copy
 import json
 import math
 import time
@@ -220,6 +221,7 @@ class Workflow(Job):
   def __init__(self, data=None, document=None, workflow=None, user=None):
     self.document = document
     self.user = user
+    self._parsed = None
 
     if document is not None:
       self.data = document.data
@@ -259,6 +261,15 @@ class Workflow(Job):
           'workflow': workflow
       })
 
+  @property
+  def data(self):
+    return self._data
+
+  @data.setter
+  def data(self, data):
+    self._data = data
+    self._parsed = None
+
   @classmethod
   def get_application_path_key(cls):
     return 'oozie.wf.application.path'
@@ -366,23 +377,19 @@ class Workflow(Job):
 
   @property
   def name(self):
-    _data = self.get_data()
-    return _data['workflow']['name']
+    return self._get_parsed().data['workflow']['name']
 
   @property
   def deployment_dir(self):
-    _data = self.get_data()
-    return _data['workflow']['properties']['deployment_dir']
+    return self._get_parsed().data['workflow']['properties']['deployment_dir']
 
   @property
   def parameters(self):
-    _data = self.get_data()
-    return _data['workflow']['properties']['parameters']
+    return copy.deepcopy(self._get_parsed().data['workflow']['properties']['parameters'])
 
   @property
   def sla_enabled(self):
-    _data = self.get_data()
-    return _data['workflow']['properties']['sla'][0].get('value')
+    return self._get_parsed().data['workflow']['properties']['sla'][0].get('value')
 
   @property
   def has_some_slas(self):
@@ -394,13 +401,14 @@ class Workflow(Job):
 
   @property
   def sla(self):
-    _data = self.get_data()
-    return _data['workflow']['properties']['sla']
+    return copy.deepcopy(self._get_parsed().data['workflow']['properties']['sla'])
 
   @property
   def nodes(self):
-    _data = self.get_data()
-    return [Node(node, self.user) for node in _data['workflow']['nodes']]
+    """
+    The nodes of the workflow, built once per version of its data: they are shared and must not be modified.
+    """
+    return self._get_parsed().nodes
 
   def find_parameters(self):
     params = set()
@@ -441,6 +449,17 @@ class Workflow(Job):
     return json.dumps(_data)
 
   def get_data(self):
+    """
+    Returns a copy of the data of the workflow, upgraded to the current format of the nodes.
+    """
+    return json.loads(self._get_parsed().json)
+
+  def _get_parsed(self):
+    if self._parsed is None or self._parsed.document is not self.document:
+      self._parsed = ParsedWorkflow(self.document, self._parse_data(), self.user)
+    return self._parsed
+
+  def _parse_data(self):
     _data = json.loads(self.data)
 
     if self.document is not None:
@@ -474,7 +493,8 @@ class Workflow(Job):
     tmpl = 'editor2/gen/workflow.xml.mako'
 
     data = self.get_data()
-    nodes = [node for node in self.nodes if node.name != 'End'] + [node for node in self.nodes if node.name == 'End']  # End at the end
+    nodes = [Node(node, self.user) for node in data['workflow']['nodes']]  # Node.to_xml() modifies its data
+    nodes = [node for node in nodes if node.name != 'End'] + [node for node in nodes if node.name == 'End']  # End at the end
     node_mapping = dict([(node.id, node) for node in nodes])
     sub_wfs_ids = [node.data['properties']['workflow'] for node in nodes if node.data['type'] == 'subworkflow']
     workflow_mapping = dict(
@@ -567,6 +587,25 @@ class Workflow(Job):
     })
 
 
+class ParsedWorkflow(object):
+  """
+  The data of a workflow once parsed and upgraded, with its nodes built lazily.
+  """
+
+  def __init__(self, document, data, user=None):
+    self.document = document
+    self.data = data
+    self.json = json.dumps(data)
+    self.user = user
+    self._nodes = None
+
+  @property
+  def nodes(self):
+    if self._nodes is None:
+      self._nodes = [Node(node, self.user) for node in json.loads(self.json)['workflow']['nodes']]
+    return self._nodes
+
+
 # Updates node_list to lowercase names
 # To avoid case-sensitive failures
 def _to_lowercase(node_list):
@@ -21,6 +21,7 @@ import sys
 import json
 import logging
 from builtins import object, str
+from unittest.mock import patch
 
 import pytest
 from django.db.models import Q
@@ -452,6 +453,27 @@ LIMIT $limit""")
     assert 'parameters' in data['workflow']['nodes'][3]['properties'], wf.data
     assert 'arguments' in data['workflow']['nodes'][3]['properties'], wf.data  # New field transparently added
 
+  def test_workflow_parsed_once(self):
+    wf = Workflow()
+
+    with patch.object(Workflow, '_parse_data', autospec=True, side_effect=Workflow._parse_data) as parse_data:
+      nodes = wf.nodes
+      assert nodes is wf.nodes
+      assert 'My Workflow' == wf.name
+
+      data = wf.get_data()
+      data['workflow']['name'] = 'Changed'
+      assert 'My Workflow' == wf.name  # A copy
+
+      wf.to_xml()
+      wf.find_parameters()
+      assert 1 == parse_data.call_count
+
+      wf.update_name('New name')
+      assert 'New name' == wf.name
+      assert nodes is not wf.nodes
+      assert 2 == parse_data.call_count
+
   def test_action_gen_xml_java_opts(self):
     # Contains java_opts
     data = {
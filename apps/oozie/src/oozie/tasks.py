@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import logging
+
+from desktop.auth.backend import rewrite_user
+from desktop.celery import app
+from oozie.bulk_operations import BulkJobControl
+from useradmin.models import User
+
+LOG = logging.getLogger()
+
+PROGRESS_INTERVAL = 2  # Seconds between the progress updates of a bulk operation
+
+
+class BulkJobControlError(Exception):
+  """
+  Failure of a bulk operation, which keeps the username of its owner as Celery replaces the state of the task by the error.
+  """
+
+  def __init__(self, username, message):
+    super(BulkJobControlError, self).__init__(username, message)
+    self.username = username
+    self.message = message
+
+
+@app.task()
+def bulk_manage_oozie_jobs_task(user_id, job_ids, action):
+  user = rewrite_user(User.objects.get(id=user_id))
+  task_id = bulk_manage_oozie_jobs_task.request.id
+  last_update = [0]
+
+  def on_progress(response):
+    now = time.time()
+    if now - last_update[0] >= PROGRESS_INTERVAL:
+      last_update[0] = now
+      meta = {
+        'username': user.username,
+        'totalRequests': response['totalRequests'],
+        'totalErrors': response['totalErrors'],
+        'done': response['done']
+      }
+      bulk_manage_oozie_jobs_task.update_state(task_id=task_id, state='PROGRESS', meta=meta)
+
+  try:
+    response = BulkJobControl(user, action, on_progress=on_progress).run(job_ids)
+  except Exception as e:
+    LOG.exception('Bulk %s of %d Oozie jobs by %s failed' % (action, len(job_ids), user.username))
+    raise BulkJobControlError(user.username, str(e))
+
+  response['username'] = user.username
+  LOG.info(
+    'Bulk %s of %d Oozie jobs by %s done with %d errors' % (action, response['totalRequests'], user.username, response['totalErrors'])
+  )
+
+  return response
@@ -176,6 +176,11 @@ urlpatterns += [
     name='manage_oozie_jobs'
   ),
   re_path(r'^bulk_manage_oozie_jobs/?$', oozie_views_dashboard.bulk_manage_oozie_jobs, name='bulk_manage_oozie_jobs'),
+  re_path(
+    r'^bulk_manage_oozie_jobs/(?P<task_id>[-\w]+)/status/?$',
+    oozie_views_dashboard.bulk_manage_oozie_jobs_status,
+    name='bulk_manage_oozie_jobs_status'
+  ),
 
   re_path(r'^submit_external_job/(?P<application_path>.+?)$', oozie_views_dashboard.submit_external_job, name='submit_external_job'),
   re_path(r'^get_oozie_job_log/(?P<job_id>[-\w]+)$', oozie_views_dashboard.get_oozie_job_log, name='get_oozie_job_log'),
@@ -20,6 +20,7 @@ import re
 import sys
 import json
 import time
+import uuid
 import logging
 import urllib.error
 import urllib.parse
@@ -35,7 +36,7 @@ from django.utils.translation import gettext as _
 
 from azure.abfs.__init__ import abfspath
 from desktop.auth.backend import is_admin
-from desktop.conf import TIME_ZONE
+from desktop.conf import TASK_SERVER_V2, TIME_ZONE
 from desktop.lib import django_mako
 from desktop.lib.django_util import JsonResponse, render
 from desktop.lib.exceptions_renderable import PopupException
@@ -51,6 +52,7 @@ from liboozie.credentials import Credentials
 from liboozie.oozie_api import get_oozie
 from liboozie.submission2 import Submission
 from liboozie.utils import catch_unicode_time
+from oozie.bulk_operations import BulkJobControl
 from oozie.conf import ENABLE_CRON_SCHEDULING, ENABLE_OOZIE_BACKEND_FILTERING, ENABLE_V2, OOZIE_JOBS_COUNT
 from oozie.forms import ParameterForm, RerunBundleForm, RerunCoordForm, RerunForm, UpdateCoordinatorForm
 from oozie.models import Bundle, Coordinator, History as OldHistory, Job, Workflow as OldWorkflow, get_link, utc_datetime_format
@@ -157,22 +159,38 @@ def bulk_manage_oozie_jobs(request):
 
   if 'job_ids' in request.POST and 'action' in request.POST:
     jobs = request.POST.get('job_ids').split()
-    response = {'totalRequests': len(jobs), 'totalErrors': 0, 'messages': ''}
+    action = request.POST.get('action')
+
+    if request.POST.get('background') == 'true' and TASK_SERVER_V2.ENABLED.get():
+      from oozie.tasks import bulk_manage_oozie_jobs_task
+      task_id = str(uuid.uuid4())
+      # The owner is recorded before the task is sent for bulk_manage_oozie_jobs_status() to check it while the task is pending
+      bulk_manage_oozie_jobs_task.update_state(task_id=task_id, state='PENDING', meta={'username': request.user.username})
+      bulk_manage_oozie_jobs_task.apply_async(kwargs={'user_id': request.user.id, 'job_ids': jobs, 'action': action}, task_id=task_id)
+      response = {'totalRequests': len(jobs), 'status': 'Scheduled', 'task_id': task_id}
+    else:
+      response = BulkJobControl(request.user, action, request=request).run(jobs)
 
-    oozie_api = get_oozie(request.user)
+  return JsonResponse(response)
 
-    for job_id in jobs:
-      job = check_job_access_permission(request, job_id)
-      check_job_edition_permission(job, request.user)
-      try:
-        oozie_api.job_control(job_id, request.POST.get('action'))
-      except RestException as ex:
-        LOG.exception("Error performing bulk operation for job_id=%s", job_id)
 
-        response['totalErrors'] = response['totalErrors'] + 1
-        response['messages'] += str(ex)
+def bulk_manage_oozie_jobs_status(request, task_id):
+  from oozie.tasks import BulkJobControlError, bulk_manage_oozie_jobs_task
 
-  return JsonResponse(response)
+  result = bulk_manage_oozie_jobs_task.AsyncResult(task_id)
+  if isinstance(result.info, BulkJobControlError):
+    info = {'username': result.info.username, 'messages': result.info.message}
+  elif isinstance(result.info, dict):
+    info = result.info
+  else:
+    info = {}  # Unknown task or failure without owner, e.g. a lost worker, of which only the state is returned
+
+  if info.get('username', request.user.username) != request.user.username:
+    raise PopupException(_('Permission denied. %(username)s does not have the permissions to access task %(id)s.') % {
+      'username': request.user.username, 'id': task_id
+    })
+
+  return JsonResponse(dict(info, state=result.state))
 
 
 def show_oozie_error(view_func):
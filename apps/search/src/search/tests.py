@@ -504,7 +504,7 @@ class TestWithMockedSolr(TestSearchBase):
         'collection': json.dumps(self._get_collection_param(self.collection)),
         'query': json.dumps(QUERY)
     })
-    xls_response_content = bytes(xls_response.content)
+    xls_response_content = b''.join(xls_response.streaming_content)
     assert 0 != len(xls_response_content)
     assert 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' == xls_response['Content-Type']
     assert 'attachment; filename="query_result.xlsx"' == xls_response['Content-Disposition']
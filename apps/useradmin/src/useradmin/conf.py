@@ -43,6 +43,14 @@ DEFAULT_USER_GROUP = Config(
     type=str,
     default='default')
 
+PERMISSION_CACHE_TIMEOUT = Config(
+    key="permission_cache_timeout",
+    help=_("Number of seconds the permissions granted to a user through their groups are cached. Changes of groups or "
+           "permissions are seen right away by the server process where they are made, and by all of them when the cache "
+           "is shared."),
+    type=int,
+    default=60)
+
 PASSWORD_POLICY = ConfigSection(
   key="password_policy",
   help=_("Configuration options for user password policy"),
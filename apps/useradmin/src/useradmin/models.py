@@ -39,6 +39,7 @@ elaborations to manipulate this row by row. This does not map nicely onto action
 """
 import sys
 import json
+import time
 import logging
 import collections
 from datetime import datetime
@@ -57,7 +58,7 @@ from desktop.lib.connectors.models import Connector, _get_installed_connectors
 from desktop.lib.exceptions_renderable import PopupException
 from desktop.lib.idbroker.conf import is_idbroker_enabled
 from desktop.monkey_patches import monkey_patch_username_validator
-from useradmin.conf import DEFAULT_USER_GROUP
+from useradmin.conf import DEFAULT_USER_GROUP, PERMISSION_CACHE_TIMEOUT
 from useradmin.permissions import GroupPermission, HuePermission, LdapGroup
 
 if ENABLE_ORGANIZATIONS.get():
@@ -73,6 +74,21 @@ else:
 
 LOG = logging.getLogger()
 
+PERMISSIONS_VERSION_KEY = 'perms_version'
+
+
+def user_permissions_key(user_id, version):
+  return 'user_perms_%s_%s' % (user_id, version)
+
+
+def get_permissions_version():
+  version = cache.get(PERMISSIONS_VERSION_KEY)
+  if version is None:
+    # Not starting from 0, as the permissions cached for a previous version could still be there if it was evicted
+    cache.add(PERMISSIONS_VERSION_KEY, int(time.time() * 1000), None)
+    version = cache.get(PERMISSIONS_VERSION_KEY)
+  return version
+
 
 class UserProfile(models.Model):
   """
@@ -116,8 +132,29 @@ class UserProfile(models.Model):
       else:
         return True
 
-    group_ids = self.user.groups.values_list('id', flat=True)
-    return GroupPermission.objects.filter(group__id__in=group_ids, hue_permission=perm).exists()
+    return perm is not None and perm.id in self._get_permission_ids()
+
+  def _get_permission_ids(self):
+    """
+    Ids of the permissions granted to the groups of the user. They are cached until the groups of a user or the permissions
+    of a group change, and kept on the profile for as long as they are valid, e.g. during a request.
+    """
+    version = get_permissions_version()
+    cached = getattr(self, '_permission_ids', None)
+    if cached is not None and cached[0] == version:
+      return cached[1]
+
+    key = user_permissions_key(self.user.id, version)
+    permission_ids = cache.get(key)
+    if permission_ids is None:
+      group_ids = self.user.groups.values_list('id', flat=True)
+      permission_ids = frozenset(
+        GroupPermission.objects.filter(group__id__in=group_ids).values_list('hue_permission_id', flat=True)
+      )
+      cache.set(key, permission_ids, PERMISSION_CACHE_TIMEOUT.get())
+
+    self._permission_ids = (version, permission_ids)
+    return permission_ids
 
   def get_permissions(self):
     return HuePermission.objects.filter(groups__user=self.user)
@@ -313,6 +350,24 @@ if not ENABLE_CONNECTORS.get():
 # models.signals.post_migrate.connect(get_default_user_group)
 
 
+def invalidate_permissions(**kwargs):
+  """
+  Discards the cached permissions of all the users, as a change of a group can affect any of them.
+  """
+  if not kwargs.get('action', 'post_').startswith('post_'):  # m2m_changed is also sent before the change
+    return
+
+  try:
+    cache.incr(PERMISSIONS_VERSION_KEY)
+  except ValueError:
+    get_permissions_version()
+
+
+models.signals.m2m_changed.connect(invalidate_permissions, sender=User.groups.through)
+models.signals.post_save.connect(invalidate_permissions, sender=GroupPermission)
+models.signals.post_delete.connect(invalidate_permissions, sender=GroupPermission)
+
+
 def install_sample_user(django_user=None):
   """
   Setup the de-activated sample user with a certain id. Do not create a user profile.
@@ -31,9 +31,11 @@ import ldap
 import pytest
 from django.conf import settings
 from django.contrib.sessions.models import Session
+from django.db import connection
 from django.db.models import Q
 from django.test import override_settings
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 import desktop.conf
@@ -45,7 +47,7 @@ from desktop.auth.backend import create_user, is_admin
 from desktop.conf import APP_BLACKLIST, ENABLE_ORGANIZATIONS, ENABLE_PROMETHEUS
 from desktop.lib.django_test_util import make_logged_in_client
 from desktop.lib.i18n import smart_str
-from desktop.lib.test_utils import grant_access
+from desktop.lib.test_utils import add_permission, grant_access, revoke_permission
 from desktop.views import home, samlgroup_check
 from hadoop import pseudo_hdfs4
 from hadoop.pseudo_hdfs4 import is_live_cluster
@@ -363,6 +365,29 @@ class TestUserProfile(BaseUserAdminTests):
     userprofile = get_profile(user)
     assert 'es' == userprofile.data['language_preference']
 
+  def test_permissions_cache(self):
+    make_logged_in_client(username='test', password='test', is_superuser=False, recreate=True)
+    grant_access('test', 'test-permissions-cache', 'useradmin')
+
+    user = User.objects.get(username='test')
+    profile = get_profile(user)
+    assert profile.has_hue_permission(action='access', app='useradmin')
+
+    with CaptureQueriesContext(connection) as queries:
+      assert profile.has_hue_permission(action='access', app='useradmin')
+      assert not profile.has_hue_permission(action='superuser', app='useradmin')
+      assert UserProfile.objects.get(user=user).has_hue_permission(action='access', app='useradmin')
+    assert 1 == len(queries)  # Only the profile
+
+    revoke_permission('test-permissions-cache', 'useradmin', 'access')
+    assert not profile.has_hue_permission(action='access', app='useradmin')
+
+    add_permission('test', 'test-permissions-cache', 'access', 'useradmin')
+    assert profile.has_hue_permission(action='access', app='useradmin')
+
+    user.groups.clear()
+    assert not profile.has_hue_permission(action='access', app='useradmin')
+
 
 @pytest.mark.django_db
 class TestSAMLGroupsCheck(BaseUserAdminTests):
@@ -62,6 +62,16 @@ def setup_test_environment(debug=None):
   teardown_test_environment()
 
 
+@pytest.fixture(autouse=True)
+def invalidate_cached_permissions():
+  """
+  The database is rolled back after each test without sending any signal, so the permissions cached for its users are
+  discarded.
+  """
+  from useradmin.models import invalidate_permissions
+  invalidate_permissions()
+
+
 def teardown_test_environment():
   # Teardown test environment
   """
@@ -359,7 +359,7 @@ def _search(user, perms='both', include_history=False, include_trashed=False, in
   )
 
   type_filters = None
-  sort = '-last_modified'
+  sort = '-search_rank' if search_text else '-last_modified'
   search_text = search_text
   flatten = True
 
@@ -1087,6 +1087,28 @@ ENABLE_SMART_THRIFT_POOL = Config(
   default=False
 )
 
+THRIFT_POOL_MAX_IDLE = Config(
+  key="thrift_pool_max_idle",
+  help=_("Number of seconds after which an unused Thrift connection is closed and removed from its pool. 0 to never evict them."),
+  type=int,
+  default=300
+)
+
+THRIFT_POOL_MAX_LIFETIME = Config(
+  key="thrift_pool_max_lifetime",
+  help=_("Number of seconds after which a Thrift connection is closed and replaced when returned to its pool. 0 to keep it forever."),
+  type=int,
+  default=0
+)
+
+THRIFT_POOL_VALIDATION_INTERVAL = Config(
+  key="thrift_pool_validation_interval",
+  help=_("Interval in seconds at which the idle Thrift connections are checked in the background and the ones closed by the "
+         "server or expired are evicted. 0 to disable the background validation."),
+  type=int,
+  default=30
+)
+
 
 # See python's documentation for time.tzset for valid values.
 TIME_ZONE = Config(
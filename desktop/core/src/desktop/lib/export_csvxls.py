@@ -17,17 +17,21 @@
 
 """
 Common library to export either CSV or XLS.
+
+Both formats are written incrementally: each batch of rows from the content generator is encoded and yielded right away,
+so the memory used is bounded by the size of a batch and not by the size of the whole result.
 """
-import gc
 import re
+import csv
 import logging
 import numbers
-from io import BytesIO as string_io
+import zipfile
+from io import StringIO
 from urllib.parse import quote
+from xml.sax.saxutils import escape
 
 import six
 import tablib
-import openpyxl
 from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.encoding import smart_str
 
@@ -36,7 +40,8 @@ from desktop.lib import i18n
 LOG = logging.getLogger()
 
 DOWNLOAD_CHUNK_SIZE = 1 * 1024 * 1024  # 1MB
-ILLEGAL_CHARS = r'[\000-\010]|[\013-\014]|[\016-\037]'
+ILLEGAL_CHARS_TRANSLATION = str.maketrans(dict.fromkeys(list(range(0o0, 0o11)) + [0o13, 0o14] + list(range(0o16, 0o40)), '?'))
+EXCEL_LINK_RE = re.compile('^(https?://.+)', re.IGNORECASE)
 FORMAT_TO_CONTENT_TYPE = {
     'csv': 'application/csv',
     'xls': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
@@ -64,9 +69,9 @@ def encode_row(row, encoding=None, make_excel_links=False):
 
   for cell in row:
     if isinstance(cell, six.string_types):
-      cell = re.sub(ILLEGAL_CHARS, '?', cell)
+      cell = cell.translate(ILLEGAL_CHARS_TRANSLATION)
       if make_excel_links:
-        cell = re.compile('^(https?://.+)', re.IGNORECASE).sub(r'=HYPERLINK("\1")', cell)
+        cell = EXCEL_LINK_RE.sub(r'=HYPERLINK("\1")', cell)
     cell = nullify(cell)
     if not isinstance(cell, numbers.Number):
       cell = smart_str(cell, encoding, strings_only=True, errors='replace')
@@ -91,42 +96,152 @@ def dataset(headers, data, encoding=None):
   return dataset
 
 
-class XlsWrapper(object):
-  def __init__(self, xls):
-    self.xls = xls
+class CsvWriter(object):
+  """
+  Encodes rows into CSV text, returning the text of each batch of rows and then forgetting it.
+  """
+
+  def __init__(self, encoding=None):
+    self.encoding = encoding or i18n.get_site_encoding()
+    self._buffer = StringIO()
+    self._writer = csv.writer(self._buffer)
+
+  def write_rows(self, rows):
+    encoding = self.encoding
+    self._writer.writerows(encode_row(row, encoding) for row in rows)
+
+  def drain(self):
+    content = self._buffer.getvalue()
+    self._buffer.seek(0)
+    self._buffer.truncate()
+    return content
+
+
+class _ChunkSink(object):
+  """Non seekable file object collecting what the zip archive writes until it is drained."""
+
+  def __init__(self):
+    self._chunks = []
+
+  def write(self, data):
+    self._chunks.append(bytes(data))
+    return len(data)
+
+  def flush(self):
+    pass
+
+  def drain(self):
+    content = b''.join(self._chunks)
+    self._chunks = []
+    return content
 
 
-def xls_dataset(workbook):
-  output = string_io()
-  workbook.save(output)
-  output.seek(0)
-  return XlsWrapper(output.read())
+class XlsxWriter(object):
+  """
+  Streams a single sheet XLSX workbook: the rows are appended to the deflated sheet of a zip archive written to a non
+  seekable sink, so the compressed bytes can be sent as soon as they are produced.
+
+  Strings are written inline instead of in a shared strings table so that nothing needs to be kept until the end.
+  """
+
+  SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+  )
+  SHEET_FOOTER = '</sheetData></worksheet>'
+  STATIC_PARTS = (
+    ('[Content_Types].xml',
+      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+      '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+      '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+      '<Default Extension="xml" ContentType="application/xml"/>'
+      '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+      '<Override PartName="/xl/worksheets/sheet1.xml" '
+      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+      '</Types>'),
+    ('_rels/.rels',
+      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+      '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+      '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+      'Target="xl/workbook.xml"/>'
+      '</Relationships>'),
+    ('xl/workbook.xml',
+      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+      '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+      'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+      '<sheets><sheet name="Sheet" sheetId="1" r:id="rId1"/></sheets>'
+      '</workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+      '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+      '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+      'Target="worksheets/sheet1.xml"/>'
+      '</Relationships>'),
+  )
+
+  def __init__(self, encoding=None):
+    self.encoding = encoding or i18n.get_site_encoding()
+    self._sink = _ChunkSink()
+    self._zip = zipfile.ZipFile(self._sink, mode='w', compression=zipfile.ZIP_DEFLATED)
+    for name, content in self.STATIC_PARTS:
+      self._zip.writestr(name, content)
+    self._sheet = self._zip.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True)
+    self._sheet.write(self.SHEET_HEADER.encode('utf-8'))
+
+  def write_rows(self, rows, make_excel_links=True):
+    encoding = self.encoding
+    self._sheet.write(''.join(
+      '<row>%s</row>' % ''.join(self._cell(cell) for cell in encode_row(row, encoding, make_excel_links=make_excel_links))
+      for row in rows
+    ).encode('utf-8'))
+
+  def close(self):
+    self._sheet.write(self.SHEET_FOOTER.encode('utf-8'))
+    self._sheet.close()
+    self._zip.close()
+
+  def drain(self):
+    return self._sink.drain()
+
+  @classmethod
+  def _cell(cls, value):
+    if isinstance(value, bool):
+      return '<c t="b"><v>%d</v></c>' % value
+    elif isinstance(value, numbers.Number):
+      return '<c t="n"><v>%s</v></c>' % value
+    value = value if isinstance(value, six.string_types) else smart_str(value)
+    if value.startswith('='):
+      return '<c><f>%s</f></c>' % escape(value[1:])
+    return '<c t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>' % escape(value)
 
 
 def create_generator(content_generator, format, encoding=None):
   if format == 'csv':
+    writer = CsvWriter(encoding)
     show_headers = True
     for headers, data in content_generator:
-      yield dataset(show_headers and headers or None, data, encoding).csv
+      if show_headers and headers:
+        writer.write_rows([headers])
       show_headers = False
+      writer.write_rows(data)
+      yield writer.drain()
   elif format == 'xls':
-    workbook = openpyxl.Workbook(write_only=True)
-    worksheet = workbook.create_sheet()
-    row_ctr = 0
+    writer = XlsxWriter(encoding)
+    show_headers = True
 
     for _headers, _data in content_generator:
       # Write headers to workbook once
-      if _headers and row_ctr == 0:
-        worksheet.append(encode_row(_headers, encoding))
-        row_ctr += 1
+      if show_headers and _headers:
+        writer.write_rows([_headers], make_excel_links=False)
+      show_headers = False
 
-      # Write row data to workbook
-      for row in _data:
-        worksheet.append(encode_row(row, encoding, make_excel_links=True))
-        row_ctr += 1
+      writer.write_rows(_data)
+      chunk = writer.drain()
+      if chunk:
+        yield chunk
 
-    yield xls_dataset(workbook).xls
-    gc.collect()
+    writer.close()
+    yield writer.drain()
   else:
     raise Exception("Unknown format: %s" % format)
 
@@ -147,7 +262,7 @@ def make_response(generator, format, name, encoding=None, user_agent=None):  # T
       pass
   elif format == 'xls':
     format = 'xlsx'
-    resp = HttpResponse(next(generator), content_type=content_type)
+    resp = StreamingHttpResponse(generator, content_type=content_type)
   elif format == 'json' or format == 'txt':
     resp = HttpResponse(generator, content_type=content_type)
   else:
@@ -80,8 +80,23 @@ def test_export_xls():
   assert 'attachment; filename="foo.xlsx"' == response["content-disposition"]
 
 
+def test_export_streams_each_batch():
+  def batches():
+    yield ["x", "y"], [["1", "2"]]
+    yield ["x", "y"], [["3\x01", 4]]
+
+  assert ['x,y\r\n1,2\r\n', '3?,4\r\n'] == list(create_generator(batches(), "csv"))
+
+  chunks = list(create_generator(batches(), "xls"))
+  assert len(chunks) > 1
+  assert all(isinstance(chunk, bytes) for chunk in chunks)
+
+  response = make_response(iter(chunks), "xls", "foo")
+  assert [["x", "y"], ["1", "2"], ["3?", 4]] == _read_xls_sheet_data(response)
+
+
 def _read_xls_sheet_data(response):
-  content = bytes(response.content)
+  content = b''.join(response.streaming_content)
 
   data = string_io()
   data.write(content)
@@ -149,6 +149,12 @@ class ProxyFS(object):
   def listdir_stats(self, path, **kwargs):
     return self._get_fs(path).listdir_stats(path, **kwargs)
 
+  def listdir_stats_paged(self, path, page_size, marker=None):
+    fs = self._get_fs(path)
+    if not hasattr(fs, 'listdir_stats_paged'):
+      raise NotImplementedError('Listing in pages is not supported by %s' % fs.__class__.__name__)
+    return fs.listdir_stats_paged(path, page_size, marker=marker)
+
   def listdir(self, path, glob=None):
     return self._get_fs(path).listdir(path, glob)
 
@@ -200,6 +206,9 @@ class ProxyFS(object):
   def get_content_summary(self, path):
     return self._get_fs(path).get_content_summary(path)
 
+  def get_file_checksum(self, path):
+    return self._get_fs(path).get_file_checksum(path)
+
   def trash_path(self, path):
     return self._get_fs(path).trash_path(path)
 
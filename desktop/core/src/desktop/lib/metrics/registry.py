@@ -23,8 +23,10 @@ import functools
 import pyformance
 import logging
 import os
+import threading
+import time
 
-from multiprocessing import Manager
+from desktop.lib.metrics.shared import SharedMetrics
 
 LOG = logging.getLogger()
 
@@ -79,16 +81,28 @@ AUTH_LDAP_AUTH_TIME_KEY = 'auth.ldap.auth-time'
 AUTH_PAM_AUTH_TIME_KEY = 'auth.pam.auth-time'
 AUTH_SPNEGO_AUTH_TIME_KEY = 'auth.spnego.auth-time'
 
+# Metrics aggregated over the workers of Gunicorn
+SHARED_COUNTERS = (REQUESTS_ACTIVE_KEY, REQUESTS_EXCEPTIONS_KEY)
+SHARED_GAUGES = (REQUESTS_ACTIVE_KEY,)
+SHARED_TIMERS = (
+  REQUESTS_RESPONSE_TIME_KEY,
+  AUTH_OAUTH_AUTH_TIME_KEY,
+  AUTH_SAML2_AUTH_TIME_KEY,
+  AUTH_LDAP_AUTH_TIME_KEY,
+  AUTH_PAM_AUTH_TIME_KEY,
+  AUTH_SPNEGO_AUTH_TIME_KEY,
+)
+SHARED_METRICS_SUFFIX = '.workers'
+
 class MetricsRegistry(object):
   def __init__(self, registry=None):
-    import sys
     if registry is None:
       registry = pyformance.global_registry()
     self._registry = registry
     self._schemas = []
-    global metrics_dict
-    metrics_dict = Manager().dict() if 'rungunicornserver' in sys.argv else None
-    self._metrics_dict = metrics_dict
+    self._shared = None
+    self._shared_lock = threading.Lock()
+    self._shared_rates = {}
 
   def _register_schema(self, schema):
     self._schemas.append(schema)
@@ -99,7 +113,8 @@ class MetricsRegistry(object):
 
   def counter(self, name, **kwargs):
     self._schemas.append(CounterDefinition(name, **kwargs))
-    return self._registry.counter(name)
+    counter = self._registry.counter(name)
+    return Counter(counter, self, name) if name in SHARED_COUNTERS else counter
 
   def histogram(self, name, **kwargs):
     self._schemas.append(HistogramDefinition(name, **kwargs))
@@ -119,108 +134,60 @@ class MetricsRegistry(object):
 
   def timer(self, name, **kwargs):
     self._schemas.append(TimerDefinition(name, **kwargs))
-    return Timer(self._registry.timer(name))
+    return Timer(self._registry.timer(name), self if name in SHARED_TIMERS else None, name)
+
+  def get_shared_metrics(self):
+    """
+    Returns the metrics shared by the Gunicorn workers, or None when they are not reported.
+    """
+    if self._shared is None:
+      with self._shared_lock:
+        if self._shared is None:
+          self._shared = self._open_shared_metrics() or False
+    return self._shared or None
+
+  def _open_shared_metrics(self):
+    from desktop.conf import METRICS, is_gunicorn_report_enabled
+
+    if not is_gunicorn_report_enabled():
+      return None
+
+    path = METRICS.LOCATION.get() + SHARED_METRICS_SUFFIX
+    try:
+      return SharedMetrics(path, counters=SHARED_COUNTERS, timers=SHARED_TIMERS, gauges=SHARED_GAUGES)
+    except (IOError, OSError) as e:
+      LOG.warning('Metrics of the Gunicorn workers are not aggregated, failed to open %s: %s' % (path, e))
+      return None
 
-  def update_metrics_shared_data(self):
-    # Update from middleware in Gunicorn worker process
+  def get_metrics_shared_data(self):
+    # Metrics of this worker, with the ones of all the workers of Gunicorn where they are shared
     metrics = self.dump_metrics()
-    if self._metrics_dict is not None:
-      self._metrics_dict[os.getpid()] = metrics
+    shared = self.get_shared_metrics()
+    if shared is None:
+      return metrics
 
-  def get_metrics_shared_data(self):
-    # Getting from reporter in Gunicorn main process
-    metrics_data = self._metrics_dict.values() if self._metrics_dict is not None else []
-    size = len(metrics_data)
-
-    if size > 0:
-      active_requests_list = []
-      active_exceptions_list = []
-      requests_response_time_list = []
-      auth_oauth_auth_time_list = []
-      auth_saml2_auth_time_list = []
-      auth_ldap_auth_time_list = []
-      auth_pam_auth_time_list = []
-      auth_spnego_auth_time_list = []
-
-      for value in metrics_data:
-        active_requests_list.append(value['requests.active'])
-        active_exceptions_list.append(value['requests.exceptions'])
-        requests_response_time_list.append(value[REQUESTS_RESPONSE_TIME_KEY])
-        auth_oauth_auth_time_list.append(value[AUTH_OAUTH_AUTH_TIME_KEY])
-        auth_saml2_auth_time_list.append(value[AUTH_SAML2_AUTH_TIME_KEY])
-        auth_ldap_auth_time_list.append(value[AUTH_LDAP_AUTH_TIME_KEY])
-        auth_pam_auth_time_list.append(value[AUTH_PAM_AUTH_TIME_KEY])
-        auth_spnego_auth_time_list.append(value[AUTH_SPNEGO_AUTH_TIME_KEY])
-
-      metrics_master = self.dump_metrics()
-      self.calculate_count(metrics_master[REQUESTS_ACTIVE_KEY], active_requests_list)
-      self.calculate_count(metrics_master[REQUESTS_EXCEPTIONS_KEY], active_exceptions_list)
-      self.calculate_time_series(metrics_master[REQUESTS_RESPONSE_TIME_KEY], requests_response_time_list, size)
-      self.calculate_time_series(metrics_master[AUTH_OAUTH_AUTH_TIME_KEY], auth_oauth_auth_time_list, size)
-      self.calculate_time_series(metrics_master[AUTH_SAML2_AUTH_TIME_KEY], auth_saml2_auth_time_list, size)
-      self.calculate_time_series(metrics_master[AUTH_LDAP_AUTH_TIME_KEY], auth_ldap_auth_time_list, size)
-      self.calculate_time_series(metrics_master[AUTH_PAM_AUTH_TIME_KEY], auth_pam_auth_time_list, size)
-      self.calculate_time_series(metrics_master[AUTH_SPNEGO_AUTH_TIME_KEY], auth_spnego_auth_time_list, size)
-
-      return metrics_master
-    else:
-      return self.dump_metrics()
-
-  def calculate_count(self, count_obj, count_list):
-    value = 0
-    for count in count_list:
-      value += count['count']
-    count_obj['count'] = value
-
-  def calculate_time_series(self, time_obj, time_list, size):
-    avg_list = []
-    sum_list = []
-    count_list = []
-    max_lit = []
-    min_list = []
-    std_dev_list = []
-    rate_15m_list = []
-    rate_5m_list = []
-    rate_1m_list = []
-    mean_rate_list = []
-    # percentile_50_list = []
-    percentile_75_list = []
-    percentile_95_list = []
-    percentile_99_list = []
-    percentile_999_list = []
-
-    for time in time_list:
-      avg_list.append(time['avg'])
-      sum_list.append(time['sum'])
-      count_list.append(time['count'])
-      max_lit.append(time['max'])
-      min_list.append(time['min'])
-      std_dev_list.append(time['std_dev'])
-      rate_15m_list.append(time['15m_rate'])
-      rate_5m_list.append(time['5m_rate'])
-      rate_1m_list.append(time['1m_rate'])
-      mean_rate_list.append(time['mean_rate'])
-      # percentile_50_list.append(time['50_percentile'])
-      percentile_75_list.append(time['75_percentile'])
-      percentile_95_list.append(time['95_percentile'])
-      percentile_99_list.append(time['99_percentile'])
-      percentile_999_list.append(time['999_percentile'])
-
-    time_obj['avg'] = sum(avg_list) / size
-    time_obj['sum'] = sum(sum_list) / size
-    time_obj['count'] = sum(count_list)
-    time_obj['max'] = sum(max_lit) / size
-    time_obj['min'] = sum(min_list) / size
-    time_obj['std_dev'] = sum(std_dev_list) / size
-    time_obj['15m_rate'] = sum(rate_15m_list) / size
-    time_obj['5m_rate'] = sum(rate_5m_list) / size
-    time_obj['1m_rate'] = sum(rate_1m_list) / size
-    time_obj['mean_rate'] = sum(mean_rate_list) / size
-    # time_obj['50_percentile'] = sum(percentile_50_list) / size
-    time_obj['75_percentile'] = sum(percentile_75_list) / size
-    time_obj['95_percentile'] = sum(percentile_95_list) / size
-    time_obj['99_percentile'] = sum(percentile_99_list) / size
-    time_obj['999_percentile'] = sum(percentile_999_list) / size
+    for name, values in shared.snapshot().items():
+      if name in metrics:
+        metrics[name].update(values)
+        if name in SHARED_TIMERS:
+          metrics[name].update(self._get_shared_rates(name, values['count'], shared.created))
+
+    return metrics
+
+  def _get_shared_rates(self, name, count, created):
+    # The rates of the workers add up, they are derived from the merged count at each report instead
+    meter, last_count = self._shared_rates.get(name, (None, 0))
+    if meter is None:
+      meter = pyformance.meters.Meter()
+    meter.mark(count - last_count)
+    self._shared_rates[name] = (meter, count)
+
+    return {
+      '15m_rate': meter.get_fifteen_minute_rate(),
+      '5m_rate': meter.get_five_minute_rate(),
+      '1m_rate': meter.get_one_minute_rate(),
+      'mean_rate': count / max(time.time() - created, 1),
+    }
 
   def get_hue_metrics(self, key):
     return self._registry.get_metrics(key)
@@ -494,27 +461,78 @@ class TimerDefinition(MetricDefinition):
     ]
 
 
+class Counter(object):
+  """
+  Wrapper around the pyformance Counter object to also count in the metrics
+  shared by the Gunicorn workers.
+  """
+
+  def __init__(self, counter, registry, name):
+    self._counter = counter
+    self._registry = registry
+    self._name = name
+
+  def inc(self, val=1):
+    self._counter.inc(val)
+    shared = self._registry.get_shared_metrics()
+    if shared is not None:
+      shared.inc(self._name, val)
+
+  def dec(self, val=1):
+    self.inc(-val)
+
+  def __getattr__(self, *args, **kwargs):
+    return getattr(self._counter, *args, **kwargs)
+
+
 class Timer(object):
   """
   Wrapper around the pyformance Timer object to allow it to be used in an
-  annotation.
+  annotation, and to also record the timings in the metrics shared by the
+  Gunicorn workers when a registry is provided.
   """
 
-  def __init__(self, timer):
+  def __init__(self, timer, registry=None, name=None):
     self._timer = timer
+    self._registry = registry
+    self._name = name
 
   def __call__(self, fn, *args, **kwargs):
     @functools.wraps(fn)
     def wrapper(*args, **kwargs):
-      with self._timer.time():
+      with self.time():
         return fn(*args, **kwargs)
 
     return wrapper
 
+  def time(self, *args, **kwargs):
+    context = self._timer.time(*args, **kwargs)
+    shared = self._registry.get_shared_metrics() if self._registry is not None else None
+    return context if shared is None else SharedTimerContext(context, shared, self._name)
+
   def __getattr__(self, *args, **kwargs):
     return getattr(self._timer, *args, **kwargs)
 
 
+class SharedTimerContext(object):
+
+  def __init__(self, context, shared, name):
+    self._context = context
+    self._shared = shared
+    self._name = name
+
+  def stop(self):
+    elapsed = self._context.stop()
+    self._shared.add(self._name, elapsed)
+    return elapsed
+
+  def __enter__(self):
+    pass
+
+  def __exit__(self, t, v, tb):
+    self.stop()
+
+
 _global_registry = MetricsRegistry()
 
 
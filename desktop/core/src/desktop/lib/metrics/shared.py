@@ -0,0 +1,305 @@
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Metrics shared by the worker processes of a server through a memory-mapped file.
+
+Each process records its counters and timings in its own slot of the file, so that recording never waits for the other
+processes. Timings are kept as counts of log-linear buckets instead of samples: the buckets of all the slots add up to the
+exact distribution of the server, from which percentiles are read with a relative error of less than BUCKET_GROWTH.
+
+The slots of processes that died are reused, after adding their cumulative values to the first slot.
+"""
+
+import os
+import math
+import mmap
+import time
+import zlib
+import fcntl
+import struct
+import logging
+import threading
+
+LOG = logging.getLogger()
+
+MAGIC = b'HUEM'
+VERSION = 1
+SLOTS = 64
+
+BUCKET_MIN = 1e-6
+BUCKET_GROWTH = 2 ** (1 / 16.0)
+BUCKETS = 512  # Up to about an hour in seconds
+
+PERCENTILES = (
+  ('75_percentile', 0.75),
+  ('95_percentile', 0.95),
+  ('99_percentile', 0.99),
+  ('999_percentile', 0.999),
+)
+
+_HEADER = struct.Struct('<4siqqd')  # Magic, version, layout checksum, owner pid, creation time
+_PID = struct.Struct('<q')
+_COUNT = struct.Struct('<q')
+_TIMING = struct.Struct('<qdddd')  # Count, sum, sum of squares, min, max
+_BUCKETS = struct.Struct('<%dq' % BUCKETS)
+
+_RETIRED_PID = -1
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def get_bucket(value):
+  if value < BUCKET_MIN:
+    return 0
+  return min(int(math.log(value / BUCKET_MIN) / _LOG_GROWTH) + 1, BUCKETS - 1)
+
+
+def get_bucket_value(bucket):
+  """Returns the geometric middle of the values of a bucket."""
+  if bucket == 0:
+    return 0.0
+  return BUCKET_MIN * BUCKET_GROWTH ** (bucket - 0.5)
+
+
+class SharedMetrics(object):
+  """
+  Counters and timers of a group of processes, stored in the file at path.
+
+  The file is reset when it was created by another owner, e.g. the previous master process of the workers, or with
+  another list of metrics. Gauges are counters which are not carried over from dead processes, e.g. active requests.
+  """
+
+  def __init__(self, path, counters, timers, gauges=(), owner=None, slots=SLOTS):
+    self.path = path
+    self.counters = list(counters)
+    self.timers = list(timers)
+    self.gauges = set(gauges)
+    self.owner = os.getppid() if owner is None else owner
+    self.slots = slots
+
+    self._offsets = {}
+    offset = _PID.size
+    for name in self.counters:
+      self._offsets[name] = offset
+      offset += _COUNT.size
+    for name in self.timers:
+      self._offsets[name] = offset
+      offset += _TIMING.size + _BUCKETS.size
+    self.slot_size = offset
+
+    self._lock = threading.Lock()
+    self._pid = None
+    self._slot = None
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+      fcntl.flock(fd, fcntl.LOCK_EX)
+      try:
+        if not self._is_initialized(fd):
+          self._initialize(fd)
+        self._mmap = mmap.mmap(fd, self._size())
+      finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+      os.close(fd)
+
+    self.created = _HEADER.unpack_from(self._mmap, 0)[4]
+
+  def inc(self, name, value=1):
+    offset = self._get_slot_offset()
+    if offset is None:
+      return
+    offset += self._offsets[name]
+
+    with self._lock:
+      _COUNT.pack_into(self._mmap, offset, _COUNT.unpack_from(self._mmap, offset)[0] + value)
+
+  def dec(self, name, value=1):
+    self.inc(name, -value)
+
+  def add(self, name, value):
+    """Records a timing of a timer."""
+    offset = self._get_slot_offset()
+    if offset is None:
+      return
+    offset += self._offsets[name]
+    bucket_offset = offset + _TIMING.size + get_bucket(value) * _COUNT.size
+
+    with self._lock:
+      count, total, squares, minimum, maximum = _TIMING.unpack_from(self._mmap, offset)
+      if not count:
+        minimum = maximum = value
+      _TIMING.pack_into(
+        self._mmap, offset, count + 1, total + value, squares + value * value, min(minimum, value), max(maximum, value)
+      )
+      _COUNT.pack_into(self._mmap, bucket_offset, _COUNT.unpack_from(self._mmap, bucket_offset)[0] + 1)
+
+  def snapshot(self):
+    """
+    Returns the merged values of all the processes, as {counter: {'count': ...}, timer: {'count': ..., 'avg': ...}}.
+
+    The slots are read without waiting for their processes, so a value being recorded might be only partially counted.
+    """
+    counts = dict((name, 0) for name in self.counters)
+    timings = dict((name, [0, 0.0, 0.0, None, None, [0] * BUCKETS]) for name in self.timers)
+
+    for slot in range(self.slots):
+      start = self._get_offset(slot)
+      pid = _PID.unpack_from(self._mmap, start)[0]
+      if not pid:
+        continue
+      alive = pid == _RETIRED_PID or _is_alive(pid)
+
+      for name in self.counters:
+        if alive or name not in self.gauges:
+          counts[name] += _COUNT.unpack_from(self._mmap, start + self._offsets[name])[0]
+
+      for name in self.timers:
+        self._merge_timing(timings[name], start + self._offsets[name])
+
+    metrics = dict((name, {'count': count}) for name, count in counts.items())
+    for name, (count, total, squares, minimum, maximum, buckets) in timings.items():
+      metrics[name] = _get_timing_metrics(count, total, squares, minimum, maximum, buckets)
+    return metrics
+
+  def close(self):
+    self._mmap.close()
+
+  def _merge_timing(self, timing, offset):
+    count, total, squares, minimum, maximum = _TIMING.unpack_from(self._mmap, offset)
+    if not count:
+      return
+
+    timing[0] += count
+    timing[1] += total
+    timing[2] += squares
+    timing[3] = minimum if timing[3] is None else min(timing[3], minimum)
+    timing[4] = maximum if timing[4] is None else max(timing[4], maximum)
+    for bucket, bucket_count in enumerate(_BUCKETS.unpack_from(self._mmap, offset + _TIMING.size)):
+      timing[5][bucket] += bucket_count
+
+  def _get_slot_offset(self):
+    pid = os.getpid()
+    if self._pid != pid:  # First use, or in a forked process
+      with self._lock:
+        if self._pid != pid:
+          self._slot = self._claim_slot(pid)
+          self._pid = pid
+    return None if self._slot is None else self._get_offset(self._slot)
+
+  def _claim_slot(self, pid):
+    with open(self.path, 'rb') as f:
+      fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+      try:
+        pids = [_PID.unpack_from(self._mmap, self._get_offset(slot))[0] for slot in range(self.slots)]
+        if pids[0] != _RETIRED_PID:
+          _PID.pack_into(self._mmap, self._get_offset(0), _RETIRED_PID)
+
+        for slot in range(1, self.slots):
+          if not pids[slot]:
+            break
+        else:
+          for slot in range(1, self.slots):
+            if not _is_alive(pids[slot]):
+              self._retire(slot)
+              break
+          else:
+            LOG.warning('All the %d slots of the shared metrics %s are used, not sharing the metrics of process %d.' % (
+              self.slots - 1, self.path, pid)
+            )
+            return None
+
+        self._mmap[self._get_offset(slot):self._get_offset(slot + 1)] = bytes(self.slot_size)
+        _PID.pack_into(self._mmap, self._get_offset(slot), pid)
+        return slot
+      finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+  def _retire(self, slot):
+    retired = self._get_offset(0)
+    start = self._get_offset(slot)
+
+    for name in self.counters:
+      if name not in self.gauges:
+        offset = self._offsets[name]
+        count = _COUNT.unpack_from(self._mmap, retired + offset)[0] + _COUNT.unpack_from(self._mmap, start + offset)[0]
+        _COUNT.pack_into(self._mmap, retired + offset, count)
+
+    for name in self.timers:
+      offset = self._offsets[name]
+      count, total, squares, minimum, maximum = _TIMING.unpack_from(self._mmap, start + offset)
+      if not count:
+        continue
+      timing = [0, 0.0, 0.0, None, None, list(_BUCKETS.unpack_from(self._mmap, retired + offset + _TIMING.size))]
+      self._merge_timing(timing, retired + offset)
+      self._merge_timing(timing, start + offset)
+      _TIMING.pack_into(self._mmap, retired + offset, *timing[:5])
+      _BUCKETS.pack_into(self._mmap, retired + offset + _TIMING.size, *timing[5])
+
+  def _get_offset(self, slot):
+    return _HEADER.size + slot * self.slot_size
+
+  def _size(self):
+    return self._get_offset(self.slots)
+
+  def _get_checksum(self):
+    layout = [VERSION, self.slots, BUCKETS, BUCKET_MIN, BUCKET_GROWTH, self.counters, self.timers]
+    return zlib.crc32(repr(layout).encode('utf-8'))
+
+  def _is_initialized(self, fd):
+    if os.fstat(fd).st_size != self._size():
+      return False
+    header = os.pread(fd, _HEADER.size, 0)
+    magic, version, checksum, owner, created = _HEADER.unpack(header)
+    return magic == MAGIC and version == VERSION and checksum == self._get_checksum() and owner == self.owner
+
+  def _initialize(self, fd):
+    os.ftruncate(fd, 0)
+    os.ftruncate(fd, self._size())
+    os.pwrite(fd, _HEADER.pack(MAGIC, VERSION, self._get_checksum(), self.owner, time.time()), 0)
+
+
+def _is_alive(pid):
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except PermissionError:
+    pass
+  return True
+
+
+def _get_timing_metrics(count, total, squares, minimum, maximum, buckets):
+  metrics = {
+    'count': count,
+    'sum': total,
+    'avg': total / count if count else 0.0,
+    'min': minimum or 0.0,
+    'max': maximum or 0.0,
+    'std_dev': math.sqrt(max(squares - total * total / count, 0) / (count - 1)) if count > 1 else 0.0,
+  }
+
+  ranks = [(key, percentile * count) for key, percentile in PERCENTILES]
+  seen = 0
+  for bucket, bucket_count in enumerate(buckets):
+    seen += bucket_count
+    while ranks and seen and seen >= ranks[0][1]:
+      key, rank = ranks.pop(0)
+      metrics[key] = min(max(get_bucket_value(bucket), metrics['min']), metrics['max'])
+  for key, rank in ranks:
+    metrics[key] = 0.0
+
+  return metrics
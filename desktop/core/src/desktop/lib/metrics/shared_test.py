@@ -0,0 +1,129 @@
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+import shutil
+import tempfile
+import multiprocessing
+
+from desktop.lib.metrics.shared import BUCKET_GROWTH, SharedMetrics, get_bucket, get_bucket_value
+
+
+def _record(path, values, slots=64):
+  shared = SharedMetrics(path, counters=['requests', 'active'], timers=['time'], gauges=['active'], owner=1, slots=slots)
+  shared.inc('active')
+  for value in values:
+    shared.inc('requests')
+    shared.add('time', value)
+
+
+class TestSharedMetrics(object):
+
+  def setup_method(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmpdir, 'metrics.workers')
+
+  def teardown_method(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _open(self, owner=1, timers=('time',), slots=64):
+    return SharedMetrics(
+      self.path, counters=['requests', 'active'], timers=timers, gauges=['active'], owner=owner, slots=slots
+    )
+
+  def test_bucket_resolution(self):
+    for value in (1e-5, 0.001, 0.25, 1, 42, 600):
+      assert abs(get_bucket_value(get_bucket(value)) - value) / value < BUCKET_GROWTH - 1
+
+    assert 0 == get_bucket(0)
+
+  def test_counters_and_timers(self):
+    shared = self._open()
+    shared.inc('requests', 3)
+    shared.dec('requests')
+    for value in (0.1, 0.2, 0.3, 0.4):
+      shared.add('time', value)
+
+    metrics = shared.snapshot()
+
+    assert 2 == metrics['requests']['count']
+    assert 4 == metrics['time']['count']
+    assert abs(metrics['time']['sum'] - 1.0) < 1e-9
+    assert abs(metrics['time']['avg'] - 0.25) < 1e-9
+    assert 0.1 == metrics['time']['min']
+    assert 0.4 == metrics['time']['max']
+    assert abs(metrics['time']['std_dev'] - 0.1291) < 1e-3
+
+  def test_percentiles(self):
+    values = [random.lognormvariate(-3, 1.5) for i in range(10000)]
+    shared = self._open()
+    for value in values:
+      shared.add('time', value)
+
+    metrics = shared.snapshot()
+
+    values.sort()
+    for key, percentile in (('75_percentile', 0.75), ('95_percentile', 0.95), ('99_percentile', 0.99)):
+      expected = values[int(percentile * len(values)) - 1]
+      assert abs(metrics['time'][key] - expected) / expected < BUCKET_GROWTH - 1, key
+
+  def test_merge_processes(self):
+    self._open()
+    values = [[0.01 * i for i in range(1, 101)], [1.0 + 0.01 * i for i in range(1, 101)]]
+
+    processes = [multiprocessing.Process(target=_record, args=(self.path, worker_values)) for worker_values in values]
+    for process in processes:
+      process.start()
+    for process in processes:
+      process.join()
+      assert 0 == process.exitcode
+
+    metrics = self._open().snapshot()
+
+    assert 200 == metrics['requests']['count']
+    assert 0 == metrics['active']['count']  # The workers are dead
+    assert 200 == metrics['time']['count']
+    assert 0.01 == metrics['time']['min']
+    assert 2.0 == metrics['time']['max']
+    # Averaging the 75th percentiles of the workers would give about 1.0
+    assert abs(metrics['time']['75_percentile'] - 1.5) / 1.5 < BUCKET_GROWTH - 1
+
+  def test_reuse_slots_of_dead_processes(self):
+    self._open(slots=3)
+    for i in range(3):
+      process = multiprocessing.Process(target=_record, args=(self.path, [0.5], 3))
+      process.start()
+      process.join()
+
+    shared = self._open(slots=3)
+    shared.inc('active')
+    shared.add('time', 2.0)
+
+    metrics = shared.snapshot()
+
+    assert 3 == metrics['requests']['count']
+    assert 1 == metrics['active']['count']
+    assert 4 == metrics['time']['count']
+    assert 2.0 == metrics['time']['max']
+
+  def test_reset_for_new_owner(self):
+    shared = self._open(owner=1)
+    shared.inc('requests')
+    assert 1 == self._open(owner=1).snapshot()['requests']['count']
+
+    assert 0 == self._open(owner=2).snapshot()['requests']['count']
+    assert 0 == self._open(owner=2, timers=('time', 'other')).snapshot()['requests']['count']
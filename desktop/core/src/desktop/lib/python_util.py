@@ -41,6 +41,17 @@ __all__ = ['CaseInsensitiveDict', 'create_synchronous_io_multiplexer']
 
 LOG = logging.getLogger()
 
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+# Positions of the bits set in each possible byte of a bitmap, least significant bit first.
+BYTE_SET_BIT_POSITIONS = [tuple(i for i in range(8) if byte & (1 << i)) for byte in range(256)]
+
+# From this number of bytes on, NumPy expands a bitmap faster than the lookup table.
+NUMPY_BITMAP_MIN_BYTES = 1024
+
 
 class CaseInsensitiveDict(dict):
   def __setitem__(self, key, value):
@@ -171,6 +182,66 @@ def get_bytes_from_bits(bit_string):
   return list(int(padded_bits, 2).to_bytes(len(padded_bits) // 8, 'big'))
 
 
+def get_bitmap_bytes(bitmap):
+  """
+  Returns the bytes of a bitmap received either as bytes or as a str, e.g. the nulls of a TColumn.
+  """
+  if isinstance(bitmap, (bytes, bytearray)):
+    return bitmap
+  try:
+    return bitmap.encode('latin-1')
+  except UnicodeEncodeError:
+    return bytes(get_bytes_from_bits(from_string_to_bits(bitmap)))
+
+
+def get_set_bit_positions(bitmap, size=None):
+  """
+  Returns the sorted positions of the bits set in a bitmap whose bytes are filled least significant bit first,
+  i.e. the null bitmaps of the TColumns of HiveServer2 and Impala. Positions from size on are ignored.
+
+  Only the non zero bytes are expanded, through a lookup table, so that sparse bitmaps are cheap. Large bitmaps are
+  unpacked with NumPy when it is available.
+  """
+  mask = get_bitmap_bytes(bitmap)
+  if size is not None:
+    mask = mask[:(size + 7) // 8]
+
+  if numpy is not None and len(mask) >= NUMPY_BITMAP_MIN_BYTES:
+    positions = numpy.flatnonzero(numpy.unpackbits(numpy.frombuffer(mask, dtype=numpy.uint8), bitorder='little')).tolist()
+  else:
+    positions = []
+    for index, byte in enumerate(mask):
+      if byte:
+        offset = index * 8
+        positions.extend(offset + position for position in BYTE_SET_BIT_POSITIONS[byte])
+
+  if size is not None:
+    while positions and positions[-1] >= size:
+      positions.pop()
+  return positions
+
+
+def set_nulls(values, nulls):
+  """
+  Returns a copy of the values with None at the positions flagged in the null bitmap, or the values themselves when no
+  position is flagged.
+
+  The bitmap can be shorter than the values, as HiveServer2 can omit the trailing zero bytes, or longer, as Impala can
+  send extra zero bytes.
+  """
+  if not nulls:
+    return values
+
+  mask = get_bitmap_bytes(nulls)
+  if not mask.strip(b'\x00'):
+    return values
+
+  _values = list(values)
+  for position in get_set_bit_positions(mask, len(_values)):
+    _values[position] = None
+  return _values
+
+
 def isASCII(data):
   try:
     data.decode('ASCII')
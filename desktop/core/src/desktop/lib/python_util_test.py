@@ -18,9 +18,21 @@
 # limitations under the License.
 
 from builtins import object
+import random
 import datetime
+from unittest.mock import patch
 
-from desktop.lib.python_util import CaseInsensitiveDict, force_dict_to_strings, force_list_to_strings, check_encoding
+import pytest
+
+from desktop.lib import python_util
+from desktop.lib.python_util import (
+  CaseInsensitiveDict,
+  check_encoding,
+  force_dict_to_strings,
+  force_list_to_strings,
+  get_set_bit_positions,
+  set_nulls,
+)
 
 
 class TestPythonUtil(object):
@@ -278,3 +290,34 @@ Rank,City/town,Russian,Federal subject,Federal district,Population,Change
     for key in test_dict:
       enc_code = check_encoding(test_dict[key])
       assert key == enc_code, "compare target encoding %s with tested encoding %s" % (key, enc_code)
+
+  def test_get_set_bit_positions(self):
+    assert [] == get_set_bit_positions(b'')
+    assert [] == get_set_bit_positions(b'\x00\x00')
+    assert [0, 1] == get_set_bit_positions(b'\x03')
+    assert [2, 4, 5, 6] == get_set_bit_positions('t')  # 0b1110100
+    assert [0, 6, 8, 9, 10, 11, 12, 13, 14, 15] == get_set_bit_positions(b'\x41\xff')
+    assert [0, 6, 8, 9] == get_set_bit_positions(b'\x41\xff', size=10)
+    assert [0] == get_set_bit_positions(b'\x41\xff', size=6)
+
+  def test_get_set_bit_positions_with_numpy(self):
+    if python_util.numpy is None:
+      pytest.skip('NumPy is not installed')
+
+    bitmap = bytes(random.getrandbits(8) for i in range(2000))
+    size = 2000 * 8 - 3
+
+    with patch('desktop.lib.python_util.NUMPY_BITMAP_MIN_BYTES', 10 ** 9):
+      expected = get_set_bit_positions(bitmap, size)
+    with patch('desktop.lib.python_util.NUMPY_BITMAP_MIN_BYTES', 1):
+      assert expected == get_set_bit_positions(bitmap, size)
+
+  def test_set_nulls(self):
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+
+    assert values is set_nulls(values, b'')
+    assert values is set_nulls(values, '\x00\x00\x00')
+    assert [None, 2, 3, 4, 5, 6, 7, 8, None] == set_nulls(values, b'\x01\x01')
+    assert [1, 2, 3, 4, 5, 6, 7, 8, None] == set_nulls(values, '\x00\x01\x00\x00')
+    assert [None, 2, 3, 4, 5, 6, 7, 8, 9] == set_nulls(values, '\x01')
+    assert [1, 2, 3, 4, 5, 6, 7, 8, 9] == values
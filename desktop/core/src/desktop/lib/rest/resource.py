@@ -19,7 +19,9 @@ import time
 import urllib
 import logging
 import posixpath
+import threading
 from builtins import object
+from urllib.parse import urlparse
 
 from django.utils.encoding import iri_to_uri
 from django.utils.http import urlencode
@@ -27,9 +29,15 @@ from django.utils.http import urlencode
 from desktop import conf
 from desktop.lib.apputil import INFO_LEVEL_CALL_DURATION_MS, WARN_LEVEL_CALL_DURATION_MS
 from desktop.lib.i18n import smart_str
+from desktop.lib.metrics import global_registry
 
 LOG = logging.getLogger()
 
+MAX_CALL_METRICS_ENDPOINTS = 100
+
+_call_metrics = {}
+_call_metrics_lock = threading.Lock()
+
 
 class Resource(object):
   """
@@ -113,30 +121,15 @@ class Resource(object):
           clear_cookies=clear_cookies
       )
     finally:
-      # Output duration without content
-      log_length = conf.REST_RESPONSE_SIZE.get() != -1 and conf.REST_RESPONSE_SIZE.get() if log_response else 0
       duration = time.time() - start_time
-      try:
-        req_data = smart_str(data, errors='replace')
-        resp_content = smart_str(resp.content, errors='replace') if resp and resp.content else ''
-        message = u'%s %s %s%s%s %s%s returned in %dms %s %s %s%s' % (
-          method,
-          type(self._client._session.auth) if self._client._session and self._client._session.auth else None,
-          self._client._base_url,
-          smart_str(path, errors='replace'),
-          iri_to_uri('?' + urlencode(params)) if params else '',
-          req_data[:log_length] if data else '',
-          log_length and len(req_data) > log_length and '...' or '' if data else '',
-          (duration * 1000),
-          resp.status_code if resp else 0,
-          len(resp_content) if resp else 0,
-          resp_content[:log_length] if resp else '',
-          log_length and len(resp_content) > log_length and '...' or '' if resp else ''
-        )
-      except Exception:
-        short_call_name = '%s %s' % (method, self._client._base_url)
-        LOG.exception('Error logging return call %s' % short_call_name)
-        message = '%s returned in %dms' % (short_call_name, duration)
+      response_time, response_size = get_call_metrics(self._client._base_url)
+      response_time.add(duration * 1000)
+      if resp is not None:
+        response_size.add(len(resp.content or b''))
+
+      # Output duration without content
+      log_length = conf.REST_RESPONSE_SIZE.get() if log_response else 0
+      message = CallLog(self._client, method, path, params, data, resp, duration, None if log_length == -1 else log_length)
       self._client.logger.disabled = 0
 
       log_if_slow_call(duration=duration, message=message, logger=self._client.logger)
@@ -229,6 +222,89 @@ class Resource(object):
     return resp.url.encode("utf-8")
 
 
+class CallLog(object):
+  """
+  Log message of a call, only formatted when it is logged.
+
+  At most log_length characters of the request data and of the response content are shown, all of them if it is None.
+  """
+
+  def __init__(self, client, method, path, params, data, resp, duration, log_length):
+    self._client = client
+    self._method = method
+    self._path = path
+    self._params = params
+    self._data = data
+    self._resp = resp
+    self._duration = duration
+    self._log_length = log_length
+
+  def __str__(self):
+    try:
+      resp = self._resp
+      return u'%s %s %s%s%s %s returned in %dms %s %s %s' % (
+        self._method,
+        type(self._client._session.auth) if self._client._session and self._client._session.auth else None,
+        self._client._base_url,
+        smart_str(self._path, errors='replace'),
+        iri_to_uri('?' + urlencode(self._params)) if self._params else '',
+        self._truncate(self._data) if self._data else '',
+        self._duration * 1000,
+        resp.status_code if resp is not None else 0,
+        len(resp.content) if resp is not None and resp.content else 0,
+        self._truncate(resp.content) if resp is not None and resp.content else '',
+      )
+    except Exception:
+      short_call_name = '%s %s' % (self._method, self._client._base_url)
+      LOG.exception('Error logging return call %s' % short_call_name)
+      return '%s returned in %dms' % (short_call_name, self._duration * 1000)
+
+  def _truncate(self, value):
+    log_length = self._log_length
+    if log_length is None:
+      return smart_str(value, errors='replace')
+    if not log_length:
+      return ''
+    if isinstance(value, bytes):
+      value = value[:(log_length + 1) * 4]  # Decoding only the bytes of the shown characters, at most 4 per character in UTF-8
+    text = smart_str(value, errors='replace')
+    return text[:log_length] + '...' if len(text) > log_length else text
+
+
+def get_call_metrics(base_url):
+  """
+  Returns the histograms of the durations in milliseconds and of the response sizes in bytes of the calls to the host of base_url.
+
+  The metrics are kept by host and port instead of by URL as some clients are created for the URL of a single object, e.g. a job.
+  Past MAX_CALL_METRICS_ENDPOINTS hosts, the calls to the new ones are all recorded under rest.other.
+  """
+  endpoint = urlparse(str(base_url)).netloc or 'other'
+  metrics = _call_metrics.get(endpoint)
+  if metrics is None:
+    with _call_metrics_lock:
+      if endpoint not in _call_metrics and len(_call_metrics) >= MAX_CALL_METRICS_ENDPOINTS:
+        endpoint = 'other'
+      metrics = _call_metrics.get(endpoint)
+      if metrics is None:
+        metrics = _call_metrics[endpoint] = (
+          global_registry().histogram(
+            name='rest.%s.response-time' % endpoint,
+            label='REST Response Time: %s' % endpoint,
+            description='Time taken by the REST calls to %s' % endpoint,
+            numerator='ms',
+            counter_numerator='calls',
+          ),
+          global_registry().histogram(
+            name='rest.%s.response-size' % endpoint,
+            label='REST Response Size: %s' % endpoint,
+            description='Size of the responses of the REST calls to %s' % endpoint,
+            numerator='bytes',
+            counter_numerator='calls',
+          ),
+        )
+  return metrics
+
+
 # Same in thrift_util.py for not losing the trace class
 def log_if_slow_call(duration, message, logger):
   if duration >= math.floor(WARN_LEVEL_CALL_DURATION_MS / 1000):
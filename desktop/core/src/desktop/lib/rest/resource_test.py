@@ -20,7 +20,7 @@ import json
 from unittest.mock import Mock, patch
 
 from desktop.lib.i18n import smart_str
-from desktop.lib.rest.resource import Resource
+from desktop.lib.rest.resource import CallLog, Resource, get_call_metrics
 
 
 def test_concat_unicode_with_ascii_python2():
@@ -82,3 +82,47 @@ def test_avoid_concat_unicode_with_ascii():
 
       assert client.execute.called
       assert not exception.called
+
+
+def test_call_log():
+  with patch('desktop.lib.rest.http_client.HttpClient') as HttpClient:
+    with patch('desktop.lib.rest.resource.LOG.exception') as exception:
+      client = HttpClient()
+      client._base_url = 'http://localhost:14000/webhdfs/v1'
+      client._session = None
+      client.execute = Mock(
+        return_value=Mock(
+          headers={},
+          status_code=200,
+          content=u'Джейкоб'.encode('utf-8') * 1000
+        )
+      )
+
+      with patch('desktop.lib.rest.resource.log_if_slow_call') as log_if_slow_call:
+        Resource(client).get('/user/domain/')
+        assert isinstance(log_if_slow_call.call_args[1]['message'], CallLog)  # Only formatted when logged
+
+      response_time, response_size = get_call_metrics('http://localhost:14000/webhdfs/v1')
+      assert 1 <= response_time.get_count()
+      assert 14000 == response_size.get_max()
+
+      resp = client.execute.return_value
+      assert u'200 14000 Джейк...' in str(CallLog(client, 'GET', '/user/domain/', None, b'data', resp, 0.1, 5))
+      assert u'200 14000 ' + u'Джейкоб' * 1000 in str(CallLog(client, 'GET', '/user/domain/', None, b'data', resp, 0.1, None))
+      assert str(CallLog(client, 'GET', '/user/domain/', None, b'data', resp, 0.1, 0)).endswith('200 14000 ')
+      assert not exception.called
+
+
+def test_call_metrics_by_host():
+  with patch('desktop.lib.rest.resource._call_metrics', {}):
+    with patch('desktop.lib.rest.resource.global_registry') as global_registry:
+      global_registry.return_value.histogram.side_effect = lambda name, **kwargs: name
+
+      assert ('rest.rm:8088.response-time', 'rest.rm:8088.response-size') == get_call_metrics('http://rm:8088/proxy/application_1/')
+      assert get_call_metrics('http://rm:8088/proxy/application_1/') == get_call_metrics('http://rm:8088/proxy/application_2/')
+      assert 2 == global_registry.return_value.histogram.call_count
+
+      with patch('desktop.lib.rest.resource.MAX_CALL_METRICS_ENDPOINTS', 2):
+        assert ('rest.nn:9870.response-time', 'rest.nn:9870.response-size') == get_call_metrics('http://nn:9870/webhdfs/v1')
+        assert ('rest.other.response-time', 'rest.other.response-size') == get_call_metrics('http://host1:80/')
+        assert get_call_metrics('http://host2:80/') == get_call_metrics('http://host1:80/')
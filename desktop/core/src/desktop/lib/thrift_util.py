@@ -38,9 +38,19 @@ from thrift.Thrift import TApplicationException, TType
 from thrift.transport.TSocket import TSocket
 from thrift.transport.TTransport import TBufferedTransport, TFramedTransport, TMemoryBuffer, TTransportException
 
-from desktop.conf import CHERRYPY_SERVER_THREADS, ENABLE_ORGANIZATIONS, ENABLE_SMART_THRIFT_POOL, SASL_MAX_BUFFER, USE_THRIFT_HTTP_JWT
+from desktop.conf import (
+  CHERRYPY_SERVER_THREADS,
+  ENABLE_ORGANIZATIONS,
+  ENABLE_SMART_THRIFT_POOL,
+  SASL_MAX_BUFFER,
+  THRIFT_POOL_MAX_IDLE,
+  THRIFT_POOL_MAX_LIFETIME,
+  THRIFT_POOL_VALIDATION_INTERVAL,
+  USE_THRIFT_HTTP_JWT,
+)
 from desktop.lib.apputil import INFO_LEVEL_CALL_DURATION_MS, WARN_LEVEL_CALL_DURATION_MS
 from desktop.lib.exceptions import StructuredException, StructuredThriftTransportException
+from desktop.lib.metrics import global_registry
 from desktop.lib.python_util import create_synchronous_io_multiplexer
 from desktop.lib.thrift_.http_client import THttpClient
 from desktop.lib.thrift_.TSSLSocketWithWildcardSAN import TSSLSocketWithWildcardSAN
@@ -161,6 +171,187 @@ class ConnectionConfig(object):
     return self.coordinator_host
 
 
+class ConnectionPool(object):
+  """
+  Pool of the SuperClients of one endpoint.
+
+  Clients are created on demand up to maxsize, so that an unused endpoint does not hold maxsize sockets, and are evicted
+  when they have been unused for more than max_idle seconds, open for more than max_lifetime seconds or closed by the server.
+  A pool created with grow=False never opens connections itself and only serves the clients handed over to it, which is how
+  the coordinator specific pools of the smart Impala pool work.
+  """
+
+  def __init__(self, conf, maxsize, max_idle=0, max_lifetime=0, grow=True):
+    self.conf = conf
+    self.maxsize = maxsize
+    self.max_idle = max_idle
+    self.max_lifetime = max_lifetime
+    self.grow = grow
+
+    self.size = 0
+    self.in_use = 0
+    self._next_cid = 0
+    self._idle = LifoQueue(maxsize)
+    self._lock = threading.Lock()
+
+    klass, host, port, coordinator_host = _get_pool_key(conf)
+    klass_name = '%s.%s' % (klass.__module__, klass.__name__)  # Most Thrift clients are named Client
+    name = 'thrift.pool.%s' % re.sub(r'[^\w]+', '_', '%s_%s_%s_%s' % (klass_name, host, port, coordinator_host or ''))
+    description = ' of the Thrift pool of %s to %s:%s' % (klass_name, host, port)
+    global_registry().gauge_callback(
+        name=name + '.in-use',
+        callback=lambda: self.in_use,
+        label='Thrift Connections In Use',
+        description='Number of connections in use' + description,
+        numerator='connections',
+    )
+    global_registry().gauge_callback(
+        name=name + '.idle',
+        callback=self.idle_count,
+        label='Idle Thrift Connections',
+        description='Number of idle connections' + description,
+        numerator='connections',
+    )
+    self.wait_time = global_registry().histogram(
+        name=name + '.wait-time',
+        label='Thrift Connection Wait Time',
+        description='Time in seconds spent waiting for a connection' + description,
+        numerator='seconds',
+        counter_numerator='connections',
+    )
+    self.creations = global_registry().counter(
+        name=name + '.creations',
+        label='Thrift Connection Creations',
+        description='Number of connections created' + description,
+        numerator='connections',
+    )
+    self.evictions = global_registry().counter(
+        name=name + '.evictions',
+        label='Thrift Connection Evictions',
+        description='Number of connections closed because they were idle, too old or closed by the server' + description,
+        numerator='connections',
+    )
+
+  def idle_count(self):
+    return self._idle.qsize()
+
+  def get(self, timeout=None):
+    """
+    Returns an idle client, or a new one if the pool can still grow, or waits up to timeout seconds for one to be returned.
+
+    Raises queue.Empty if none became available in time.
+    """
+    while True:
+      try:
+        client = self._idle.get(block=False)
+      except queue.Empty:
+        client = self._create()
+        if client is None:
+          client = self._idle.get(block=True, timeout=timeout)
+
+      if self._is_expired(client):
+        self._evict(client)
+        continue
+
+      with self._lock:
+        self.in_use += 1
+      return client
+
+  def put(self, client):
+    pool = getattr(client, 'pool', self)
+    if pool is not self:
+      # Handed over by another pool: it now counts in this one.
+      pool._remove(in_use=True)
+      with self._lock:
+        self.size += 1
+        self.in_use += 1
+      client.pool = self
+
+    with self._lock:
+      self.in_use -= 1
+      shrink = self.size > self.maxsize
+
+    client.last_used = time.time()
+    if shrink or self._is_expired(client):
+      self._evict(client)
+      return
+
+    try:
+      self._idle.put(client, block=False)
+    except queue.Full:
+      self._evict(client)
+
+  def validate(self):
+    """
+    Evicts the idle clients that expired or that the server closed, e.g. after a restart, so that they are not handed out.
+    """
+    clients = []
+    while True:
+      try:
+        clients.append(self._idle.get(block=False))
+      except queue.Empty:
+        break
+
+    # Put back the oldest first so that the most recently used stay on top of the LIFO.
+    for client in reversed(clients):
+      if self._is_expired(client) or _is_closed_by_server(self.conf, client):
+        self._evict(client)
+      else:
+        try:
+          self._idle.put(client, block=False)
+        except queue.Full:
+          self._evict(client)
+
+    return len(clients) - self._idle.qsize()
+
+  def _create(self):
+    if not self.grow:
+      return None
+
+    with self._lock:
+      if self.size >= self.maxsize:
+        return None
+      self.size += 1
+      cid = self._next_cid
+      self._next_cid += 1
+
+    try:
+      client = construct_superclient(self.conf)
+    except Exception:
+      self._remove()
+      raise
+
+    client.CID = cid
+    client.pool = self
+    client.created = client.last_used = time.time()
+    self.creations.inc()
+
+    return client
+
+  def _is_expired(self, client):
+    now = time.time()
+    created = getattr(client, 'created', now)
+    last_used = getattr(client, 'last_used', now)
+    return bool(
+      (self.max_lifetime and now - created > self.max_lifetime) or
+      (self.max_idle and now - last_used > self.max_idle)
+    )
+
+  def _evict(self, client):
+    self._remove()
+    self.evictions.inc()
+    try:
+      client.transport.close()
+    except Exception as e:
+      LOG.debug('Failed to close the evicted Thrift connection %s: %s' % (getattr(client, 'CID', None), e))
+
+  def _remove(self, in_use=False):
+    with self._lock:
+      self.size -= 1
+      if in_use:
+        self.in_use -= 1
+
+
 class ConnectionPooler(object):
   """
   Thread-safe connection pooling for thrift. (With about 3 changes,
@@ -173,61 +364,60 @@ class ConnectionPooler(object):
   A connection is a 'SuperClient', which deals with timeout errors
   automatically so we don't have to worry about refreshing a stale pool.
 
-  We could be fancier here - we could reclaim clients ourselves without
-  relying on them to be returned but that would increase complexity. The
-  benefit would be not having to hit the connection pool on every client call.
+  When a validation interval is set, a daemon thread periodically evicts
+  the idle connections which expired or were closed by the server.
   """
 
-  def __init__(self, poolsize=10):
+  def __init__(self, poolsize=10, max_idle=0, max_lifetime=0, validation_interval=0):
     self.pooldict = {}
     self.poolsize = poolsize
+    self.max_idle = max_idle
+    self.max_lifetime = max_lifetime
+    self.validation_interval = validation_interval
     self.dictlock = threading.Lock()
+    self._validator = None
 
   def create_pool_impala(self, conf):
     self.dictlock.acquire()
     try:
       if _get_pool_key(conf) not in self.pooldict:
-        q = LifoQueue(self.poolsize)
-        self.pooldict[_get_pool_key(conf)] = q
+        self.pooldict[_get_pool_key(conf)] = self._new_pool(conf, grow=False)
     finally:
       self.dictlock.release()
 
   def create_pool(self, conf):
     # First up, check to see if we have a pool for this endpoint
     if _get_pool_key(conf) not in self.pooldict:
-      # Uh-oh, we need to initialise the queue. Take the dict lock.
-      # Note that this is 'double-checked locking'.
-
-      # The reason this pattern doesn't work in Java is that the write to the dict
-      # may get issued before the construction of the Queue due to new Queue(..) not
-      # being atomic. However in Python this becomes CALL_FUNCTION and STORE_FAST,
-      # therefore as long as a) the function doesn't get inlined b) Python's bytecode
-      # generator doesn't move the write to q before the function completes there's no
-      # way for another thread to observe a partially constructed queue.
-
-      # I haven't found a reference for the Python memory model, so I'm leaving this comment
-      # here in case unladen-swallow or something breaks this assumption of correctness.
-
+      # Uh-oh, we need to initialise the pool. Take the dict lock.
+      # Note that this is 'double-checked locking', which is safe in CPython
+      # as the pool is fully constructed before being stored in the dict.
+      # Connections are then opened on demand by the pool.
       self.dictlock.acquire()
       try:
         if _get_pool_key(conf) not in self.pooldict:
-          q = LifoQueue(self.poolsize)
-          for i in range(self.poolsize):
-            client = construct_superclient(conf)
-            client.CID = i
-            q.put(client, False)
-
-          # Wait until the queue has been filled with connections before adding
-          # it to the pool. This is done last because any exceptions thrown
-          # by the client construction could result in there being no
-          # connections available in this pool. When `get_client` is called next,
-          # it would skip this block because the key has a value, but then it
-          # would deadlock later because there are no connections for it to
-          # fetch from the pool.
-          self.pooldict[_get_pool_key(conf)] = q
+          self.pooldict[_get_pool_key(conf)] = self._new_pool(conf)
       finally:
         self.dictlock.release()
 
+  def _new_pool(self, conf, grow=True):
+    if self.validation_interval and self._validator is None:
+      self._validator = threading.Thread(target=self._validate_pools, name='ThriftPoolValidator')
+      self._validator.daemon = True
+      self._validator.start()
+
+    return ConnectionPool(conf, self.poolsize, max_idle=self.max_idle, max_lifetime=self.max_lifetime, grow=grow)
+
+  def _validate_pools(self):
+    while True:
+      time.sleep(self.validation_interval)
+      for pool in list(self.pooldict.values()):
+        try:
+          evicted = pool.validate()
+          if evicted:
+            LOG.info('Evicted %d idle Thrift connections to %s:%s' % (evicted, pool.conf.host, pool.conf.port))
+        except Exception:
+          LOG.exception('Failed to validate the Thrift connections to %s:%s' % (pool.conf.host, pool.conf.port))
+
   def get_client(self, conf, get_client_timeout=None):
     """
     Could block while we wait for the pool to become non-empty.
@@ -241,22 +431,24 @@ class ConnectionPooler(object):
     has_waited_for = 0
 
     self.create_pool(conf)
+    pool = self.pooldict[_get_pool_key(conf)]
 
     while connection is None:
       if get_client_timeout is not None:
         this_round_timeout = max(min(get_client_timeout - has_waited_for, 1), 0)
       else:
-        this_round_timeout = None
+        this_round_timeout = 1
 
       try:
-        connection = self.pooldict[_get_pool_key(conf)].get(block=True, timeout=this_round_timeout)
-        if connection is not None:
-          duration = time.time() - start_pool_get_time
-          message = "Thrift client %s got connection %s after %.2f seconds" % (self, connection.CID, duration)
-          log_if_slow_call(duration=duration, message=message)
+        connection = pool.get(timeout=this_round_timeout)
+        duration = time.time() - start_pool_get_time
+        pool.wait_time.add(duration)
+        message = "Thrift client %s got connection %s after %.2f seconds" % (self, connection.CID, duration)
+        log_if_slow_call(duration=duration, message=message)
       except queue.Empty:
         has_waited_for = time.time() - start_pool_get_time
         if get_client_timeout is not None and has_waited_for > get_client_timeout:
+          pool.wait_time.add(has_waited_for)
           raise socket.timeout(
             ("Timed out after %.2f seconds waiting to retrieve a %s client from the pool.") % (has_waited_for, conf.service_name))
         else:
@@ -375,7 +567,12 @@ def connect_to_thrift(conf):
   return service, protocol, transport
 
 
-_connection_pool = ConnectionPooler(poolsize=CHERRYPY_SERVER_THREADS.get())
+_connection_pool = ConnectionPooler(
+  poolsize=CHERRYPY_SERVER_THREADS.get(),
+  max_idle=THRIFT_POOL_MAX_IDLE.get(),
+  max_lifetime=THRIFT_POOL_MAX_LIFETIME.get(),
+  validation_interval=THRIFT_POOL_VALIDATION_INTERVAL.get()
+)
 
 
 def get_client(klass, host, port, service_name, **kwargs):
@@ -394,6 +591,19 @@ def _grab_transport_from_wrapper(outer_transport):
     raise Exception("Unknown transport type: " + outer_transport.__class__)
 
 
+def _is_closed_by_server(conf, superclient):
+  """
+  Returns True when the socket of the client is readable while no call is in flight, meaning there is either data from a
+  previous call (i.e our protocol is out of sync), or the connection was shut down on the remote side. Either way, the
+  connection needs to be reopened.
+
+  If the socket was closed remotely, btw, socket.read() will return an empty string. This is a fairly normal condition,
+  btw, since there are timeouts on both the server and client sides.
+  """
+  sock = conf.transport_mode != 'http' and _grab_transport_from_wrapper(superclient.transport).handle
+  return bool(sock and create_synchronous_io_multiplexer().read([sock]))
+
+
 class PooledClient(object):
   """
   A wrapper for a SuperClient
@@ -432,14 +642,7 @@ class PooledClient(object):
         try:
           # Poke it to see if it's closed on the other end. This can happen if a connection
           # sits in the connection pool longer than the read timeout of the server.
-          sock = self.conf.transport_mode != 'http' and _grab_transport_from_wrapper(superclient.transport).handle
-          if sock and create_synchronous_io_multiplexer().read([sock]):
-            # the socket is readable, meaning there is either data from a previous call
-            # (i.e our protocol is out of sync), or the connection was shut down on the
-            # remote side. Either way, we need to reopen the connection.
-            # If the socket was closed remotely, btw, socket.read() will return
-            # an empty string.  This is a fairly normal condition, btw, since
-            # there are timeouts on both the server and client sides.
+          if _is_closed_by_server(self.conf, superclient):
             superclient.transport.close()
             superclient.transport.open()
 
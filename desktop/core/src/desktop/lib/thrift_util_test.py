@@ -17,6 +17,7 @@
 import os
 import sys
 import time
+import queue
 import socket
 import logging
 import unittest
@@ -166,6 +167,32 @@ class TestWithThriftServer(object):
       racer.join()
       assert 0 == len(racer.errors)
 
+  def test_pool_under_load(self):
+    pooler = thrift_util.ConnectionPooler(poolsize=4, max_idle=60, validation_interval=0)
+    pooler.create_pool(self.client.conf)
+    pool = pooler.pooldict[thrift_util._get_pool_key(self.client.conf)]
+    creations, waits = pool.creations.get_count(), pool.wait_time.get_count()  # The metrics are shared with the previous pools
+    errors = []
+
+    def ping(begin):
+      for i in range(begin, begin + 25):
+        if i * 2 != self.client.ping(i):
+          errors.append(i)
+
+    with patch('desktop.lib.thrift_util._connection_pool', pooler):
+      threads = [threading.Thread(target=ping, args=(i * 100,)) for i in range(16)]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+
+    assert [] == errors
+    assert 4 >= pool.size
+    assert 0 == pool.in_use
+    assert pool.size == pool.idle_count()
+    assert pool.size == pool.creations.get_count() - creations
+    assert 16 * 25 == pool.wait_time.get_count() - waits
+
 
 class ThriftUtilTest(TestCase):
   def test_simpler_string(self):
@@ -344,6 +371,79 @@ class TestSuperClient(TestCase):
       # Could check output for several "Thrift exception; retrying: some error"
 
 
+class TestConnectionPool(object):
+
+  def setup_method(self):
+    self.conf = thrift_util.ConnectionConfig(TestService.Client, 'localhost', 1, 'Hue Unit Test Client')
+    self.construct_superclient = patch('desktop.lib.thrift_util.construct_superclient', side_effect=lambda conf: Mock()).start()
+    self.is_closed_by_server = patch('desktop.lib.thrift_util._is_closed_by_server', return_value=False).start()
+
+  def teardown_method(self):
+    patch.stopall()
+
+  def test_grows_on_demand(self):
+    pool = thrift_util.ConnectionPool(self.conf, maxsize=2)
+    assert 0 == pool.size
+
+    first = pool.get()
+    second = pool.get()
+    assert 2 == pool.size
+    assert 2 == pool.in_use
+
+    with pytest.raises(queue.Empty):
+      pool.get(timeout=0)
+
+    pool.put(first)
+    assert first is pool.get(timeout=0)
+    assert 2 == self.construct_superclient.call_count
+
+  def test_evicts_idle_and_old_clients(self):
+    pool = thrift_util.ConnectionPool(self.conf, maxsize=2, max_idle=60, max_lifetime=3600)
+    evictions = pool.evictions.get_count()  # The metrics are shared with the pools of the other tests
+    idle, old = pool.get(), pool.get()
+    pool.put(idle)
+    pool.put(old)
+    idle.last_used -= 120
+    old.created -= 7200
+
+    client = pool.get(timeout=0)
+
+    assert client not in (idle, old)
+    assert 2 == pool.evictions.get_count() - evictions
+    assert 1 == pool.size
+    idle.transport.close.assert_called_once_with()
+    old.transport.close.assert_called_once_with()
+
+  def test_validate_evicts_clients_closed_by_server(self):
+    pool = thrift_util.ConnectionPool(self.conf, maxsize=3)
+    clients = [pool.get() for i in range(3)]
+    for client in clients:
+      pool.put(client)
+    self.is_closed_by_server.side_effect = lambda conf, client: client is clients[1]
+
+    assert 1 == pool.validate()
+
+    assert 2 == pool.size
+    assert 2 == pool.idle_count()
+    assert clients[2] is pool.get(timeout=0)
+    assert clients[0] is pool.get(timeout=0)
+
+  def test_hand_over_to_pool_without_growth(self):
+    source = thrift_util.ConnectionPool(self.conf, maxsize=2)
+    target = thrift_util.ConnectionPool(self.conf, maxsize=2, grow=False)
+    client = source.get()
+
+    target.put(client)
+
+    assert 0 == source.size
+    assert 0 == source.in_use
+    assert 1 == target.size
+    assert 0 == target.in_use
+    assert client is target.get(timeout=0)
+    with pytest.raises(queue.Empty):
+      target.get(timeout=0)
+
+
 @pytest.mark.django_db
 class TestThriftJWT():
   def setup_method(self):
@@ -28,7 +28,7 @@ from django.db.utils import DatabaseError
 
 import desktop.conf
 from beeswax.models import SavedQuery, Session
-from desktop.models import Document2
+from desktop.models import Document2, SearchTerm
 from desktop.settings import INSTALLED_APPS
 
 if 'oozie' in INSTALLED_APPS:
@@ -145,6 +145,9 @@ class Command(BaseCommand):
     # Clean out history Doc2 objects
     self.objectCleanup(Document2, 'is_history', True, 'last_modified')
 
+    # Clean out the search terms of the deleted documents
+    LOG.info("Deleted %s unused search terms" % SearchTerm.objects.delete_unused())
+
     # Clean out expired sessions
     LOG.debug("Cleaning out expired sessions from django_session table")
 
@@ -66,14 +66,12 @@ from desktop.conf import (
   SECURE_CONTENT_SECURITY_POLICY,
   SERVER_USER,
   has_connectors,
-  is_gunicorn_report_enabled,
 )
 from desktop.context_processors import get_app_name
 from desktop.lib import apputil, fsmanager, i18n
 from desktop.lib.django_util import JsonResponse, render, render_json
 from desktop.lib.exceptions import StructuredException
 from desktop.lib.exceptions_renderable import PopupException
-from desktop.lib.metrics import global_registry
 from desktop.lib.view_util import is_ajax
 from desktop.log import get_audit_logger
 from desktop.log.access import access_log, access_warn, log_page_hit
@@ -848,8 +846,6 @@ class MetricsMiddleware(MiddlewareMixin):
     # LOG.debug("===> MetricsMiddleware pid: %d thread: %d" % (os.getpid(), threading.get_ident()))
     self._response_timer = metrics.response_time.time()
     metrics.active_requests.inc()
-    if is_gunicorn_report_enabled():
-      global_registry().update_metrics_shared_data()
 
   def process_exception(self, request, exception):
     self._response_timer.stop()
@@ -858,8 +854,6 @@ class MetricsMiddleware(MiddlewareMixin):
   def process_response(self, request, response):
     self._response_timer.stop()
     metrics.active_requests.dec()
-    if is_gunicorn_report_enabled():
-      global_registry().update_metrics_shared_data()
     return response
 
 
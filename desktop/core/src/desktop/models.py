@@ -16,10 +16,12 @@
 # limitations under the License.
 
 import os
+import re
 import json
 import uuid
 import logging
 import calendar
+import unicodedata
 from builtins import next, object
 from collections import OrderedDict
 from itertools import chain
@@ -30,7 +32,7 @@ from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelatio
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.staticfiles.storage import staticfiles_storage
 from django.db import connection, models, transaction
-from django.db.models import Q
+from django.db.models import Case, Q, Value, When
 from django.db.models.query import QuerySet
 from django.urls import NoReverseMatch, reverse
 from django.utils.translation import gettext as _, gettext_lazy as _t
@@ -79,6 +81,13 @@ SAMPLE_USER_INSTALL = 'hue'
 SAMPLE_USER_OWNERS = ['hue', 'sample']
 
 UTC_TIME_FORMAT = "%Y-%m-%dT%H:%M"
+ANCESTORS_BATCH_SIZE = 500
+SEARCH_FIELDS = ('name', 'description', 'search')
+SEARCH_TERM_MIN_LENGTH = 3
+SEARCH_TERM_MAX_LENGTH = 64
+SEARCH_MAX_MATCHING_TERMS = 500
+SEARCH_MAX_CANDIDATES = 10000
+SEARCH_TERMS_BATCH_SIZE = 500
 HUE_VERSION = None
 IMAGE_VERSION = None
 
@@ -986,7 +995,7 @@ class Document2QueryMixin(object):
     Search for documents based on type filters, search_text or order_by and return a queryset of document objects
     :param types: list of Document2 types (e.g. - query-hive, directory, etc)
     :param search_text: text to search on in the name and description fields
-    :param order_by: order by field (e.g. -last_modified, type)
+    :param order_by: order by field (e.g. -last_modified, type, or -search_rank for the best matches of search_text first)
     """
     documents = self
 
@@ -994,17 +1003,47 @@ class Document2QueryMixin(object):
       documents = documents.filter(type__in=types)
 
     if search_text:
+      # The index narrows the documents down to the ones having a word of the text, which is then matched as before
+      doc_ids = Document2SearchTerm.objects.search(search_text)
+      if doc_ids is not None:
+        documents = documents.filter(id__in=doc_ids)
       documents = documents.filter(Q(name__icontains=search_text) | Q(description__icontains=search_text) |
                                    Q(search__icontains=search_text))
+      documents = documents.annotate(
+        search_rank=Case(When(name__icontains=search_text, then=Value(4)), default=Value(0)) +
+        Case(When(description__icontains=search_text, then=Value(2)), default=Value(0)) +
+        Case(When(search__icontains=search_text, then=Value(1)), default=Value(0))
+      )
 
     if order_by:  # TODO: Validate that order_by is a valid sort parameter
-      documents = documents.order_by(order_by)
+      if order_by.lstrip('-') == 'search_rank':
+        documents = documents.order_by(order_by, '-last_modified')
+      else:
+        documents = documents.order_by(order_by)
 
     return documents
 
 
 class Document2QuerySet(QuerySet, Document2QueryMixin):
-  pass
+
+  def update(self, **kwargs):
+    is_moved = 'parent_directory' in kwargs or 'parent_directory_id' in kwargs
+    is_renamed = any(field in kwargs for field in SEARCH_FIELDS)
+    if not is_moved and not is_renamed:
+      return super(Document2QuerySet, self).update(**kwargs)
+
+    # Updating documents in bulk bypasses save(), so their ancestors and search terms are indexed here
+    with transaction.atomic():
+      doc_ids = list(self.values_list('id', flat=True))
+      rows = super(Document2QuerySet, self).update(**kwargs)
+      documents = Document2.objects.filter(id__in=doc_ids)
+      if is_moved:
+        for doc_id, parent_id in documents.values_list('id', 'parent_directory_id'):
+          Document2Ancestor.objects.index(doc_id, parent_id)
+      if is_renamed:
+        for values in documents.values_list('id', *SEARCH_FIELDS):
+          Document2SearchTerm.objects.index(values[0], values[1:])
+    return rows
 
 
 class Document2Manager(models.Manager, Document2QueryMixin):
@@ -1443,13 +1482,11 @@ class Document2(models.Model):
     """
     Returns the list of all children ids for a given directory id recursively, excluding history documents
     """
-    directory = Directory.objects.get(id=directory_id)
-    children_ids = []
-    for child in directory.children.filter(is_history=False).filter(is_managed=False):
-      children_ids.append(child.id)
-      if child.is_directory:
-        children_ids.extend(self._get_child_ids_recursively(child.id))
-    return children_ids
+    return list(
+      Document2.objects.filter(
+        ancestor_links__ancestor_id=directory_id, ancestor_links__depth__gt=0, is_history=False, is_managed=False
+      ).values_list('id', flat=True)
+    )
 
   def can_read(self, user):
     return \
@@ -1465,11 +1502,20 @@ class Document2(models.Model):
       raise PopupException(_("Document does not exist or you don't have the permission to access it."), error_code=401)
 
   def can_write(self, user):
-    return \
-        self.owner == user \
-        or is_admin(user) \
-        or any([perm.user_has_access(user) for perm in self.get_permissions('write')]) \
-        or (self.parent_directory and self.parent_directory.can_write(user))
+    if self.owner == user or is_admin(user):
+      return True
+    if self.id is None:
+      return bool(self.parent_directory and self.parent_directory.can_write(user))
+
+    # Owning or having write access to the document or to any of its parent directories
+    write_perms = Document2Permission.objects.filter(
+      Q(perms=Document2Permission.WRITE_PERM) | Q(perms=Document2Permission.LINK_WRITE_PERM, is_link_on=True)
+    ).filter(
+      Q(is_link_on=True) | Q(users=user) | Q(groups__in=user.groups.all())
+    )
+    return Document2Ancestor.objects.filter(descendant_id=self.id).filter(
+      Q(ancestor__owner=user) | Q(ancestor__document2permission__in=write_perms)
+    ).exists()
 
   def can_write_or_exception(self, user):
     if self.can_write(user):
@@ -1614,34 +1660,16 @@ class Document2(models.Model):
 
   def _contains_cycle(self):
     """
-    Uses Floyd's cycle-detection algorithm to detect a cycle (aka Tortoise and Hare)
-    https://en.wikipedia.org/wiki/Cycle_detection#Tortoise_and_hare
+    The new parent directory creates a cycle if it is the document itself or one of its descendants.
     """
-    # Test base case where self.uuid == self.parent_directory.uuid first
-    if self.parent_directory is not None and self.parent_directory.uuid == self.uuid:
+    if self.parent_directory is None:
+      return False
+    if self.parent_directory.uuid == self.uuid:
       return True
+    if self.id is None:
+      return False
 
-    slow = self
-    fast = self
-
-    while True:
-      slow = slow.parent_directory
-      if slow and slow.uuid == self.uuid:
-        slow = self
-
-      if fast.parent_directory is not None:
-        if fast.parent_directory.uuid == self.uuid:
-          fast = self.parent_directory.parent_directory
-        else:
-          fast = fast.parent_directory.parent_directory
-      else:
-        return False
-
-      if slow is None or fast is None:
-        return False
-
-      if slow == fast:
-        return True
+    return Document2Ancestor.objects.filter(ancestor_id=self.id, descendant_id=self.parent_directory_id).exists()
 
 
 class DirectoryManager(Document2Manager):
@@ -1747,6 +1775,223 @@ class Document2Permission(models.Model):
     return self.is_link_on or user in self.users.all() or self.groups.filter(id__in=user.groups.all()).exists()
 
 
+class Document2AncestorManager(models.Manager):
+
+  def index(self, doc_id, parent_id, raw=False, _indexing=None):
+    """
+    Records the ancestors of a document and of all its descendants after it was created or moved under parent_id.
+    Does nothing if the document is already indexed under this parent.
+
+    Raw saves, e.g. of loaddata, can save a document before its parent directory, so the children already saved are
+    indexed along with a new document.
+    """
+    indexed = dict(self.filter(descendant_id=doc_id, depth__lte=1).values_list('depth', 'ancestor_id'))
+    if 0 in indexed and indexed.get(1) == parent_id:
+      return
+
+    _indexing = (_indexing or set()) | {doc_id}
+
+    with transaction.atomic():
+      if 0 in indexed:
+        subtree = list(self.filter(ancestor_id=doc_id).values_list('descendant_id', 'depth'))
+        old_ancestor_ids = list(self.filter(descendant_id=doc_id, depth__gt=0).values_list('ancestor_id', flat=True))
+        if old_ancestor_ids:
+          for chunk in _chunks([descendant_id for descendant_id, depth in subtree]):
+            self.filter(ancestor_id__in=old_ancestor_ids, descendant_id__in=chunk).delete()
+      else:
+        self.create(ancestor_id=doc_id, descendant_id=doc_id, depth=0)
+        subtree = [(doc_id, 0)]
+
+      if parent_id is not None and parent_id not in _indexing:
+        ancestors = list(self.filter(descendant_id=parent_id).values_list('ancestor_id', 'depth'))
+        if not ancestors:
+          grandparent_id = Document2.objects.filter(id=parent_id).values_list('parent_directory_id', flat=True).first()
+          self.index(parent_id, grandparent_id, raw, _indexing)
+          ancestors = list(self.filter(descendant_id=parent_id).values_list('ancestor_id', 'depth'))
+
+        self.bulk_create([
+            Document2Ancestor(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + depth + 1)
+            for ancestor_id, ancestor_depth in ancestors
+            for descendant_id, depth in subtree
+          ],
+          batch_size=ANCESTORS_BATCH_SIZE
+        )
+
+      if raw and 0 not in indexed:
+        for child_id in Document2.objects.filter(parent_directory_id=doc_id).values_list('id', flat=True):
+          if child_id not in _indexing:
+            self.index(child_id, doc_id, raw, _indexing)
+
+
+class Document2Ancestor(models.Model):
+  """
+  Closure table of the directory tree of the documents: one row for each document and each of its ancestors, including
+  itself at depth 0. This selects a whole subtree or all the parent directories of a document in a single query.
+  """
+  ancestor = models.ForeignKey(Document2, on_delete=models.CASCADE, related_name='descendant_links')
+  descendant = models.ForeignKey(Document2, on_delete=models.CASCADE, related_name='ancestor_links')
+  depth = models.PositiveSmallIntegerField()
+
+  objects = Document2AncestorManager()
+
+  class Meta(object):
+    unique_together = ('ancestor', 'descendant')
+
+
+def _chunks(values, size=ANCESTORS_BATCH_SIZE):
+  for i in range(0, len(values), size):
+    yield values[i:i + size]
+
+
+def _index_document_ancestors(sender, instance, raw=False, **kwargs):
+  Document2Ancestor.objects.index(instance.id, instance.parent_directory_id, raw=raw)
+
+
+models.signals.post_save.connect(_index_document_ancestors, sender=Document2)
+models.signals.post_save.connect(_index_document_ancestors, sender=Directory)
+
+
+def get_search_terms(text):
+  """
+  Returns the set of the words of text, case folded and without accents. Numbers are left out, as the many ids and literals
+  of the statements would bloat the vocabulary for words nobody looks for.
+
+  Words longer than SEARCH_TERM_MAX_LENGTH are split into parts overlapping by half of it, so that any fragment of up to
+  SEARCH_TERM_MAX_LENGTH // 2 characters of a word is still within one of its terms.
+  """
+  text = unicodedata.normalize('NFKD', text.casefold())
+  text = ''.join(char for char in text if not unicodedata.combining(char))
+
+  terms = set()
+  step = SEARCH_TERM_MAX_LENGTH // 2
+  for word in re.findall(r'\w+', text):
+    if word.isdigit():
+      continue
+    elif len(word) <= SEARCH_TERM_MAX_LENGTH:
+      terms.add(word)
+    else:
+      terms.update(word[i:i + SEARCH_TERM_MAX_LENGTH] for i in range(0, len(word) - step, step))
+  return terms
+
+
+class SearchTermManager(models.Manager):
+
+  def get_ids(self, terms):
+    """
+    Returns the ids of terms as a {term: id} dict, adding the missing terms.
+    """
+    terms = sorted(terms)
+    ids = {}
+    for chunk in _chunks(terms, SEARCH_TERMS_BATCH_SIZE):
+      ids.update(self.filter(term__in=chunk).values_list('term', 'id'))
+
+    missing = [term for term in terms if term not in ids]
+    if missing:
+      if connection.features.supports_ignore_conflicts:
+        self.bulk_create([SearchTerm(term=term) for term in missing], batch_size=SEARCH_TERMS_BATCH_SIZE, ignore_conflicts=True)
+        for chunk in _chunks(missing, SEARCH_TERMS_BATCH_SIZE):
+          ids.update(self.filter(term__in=chunk).values_list('term', 'id'))
+      else:
+        for term in missing:
+          ids[term] = self.get_or_create(term=term)[0].id
+
+    return ids
+
+  def delete_unused(self):
+    """
+    Deletes the terms of no document anymore, e.g. of the cleaned up query history, so that the vocabulary looked up by
+    Document2SearchTerm.objects.search() does not keep growing. Returns the number of deleted terms.
+    """
+    deleted = 0
+    while True:
+      term_ids = list(self.filter(documents__isnull=True).values_list('id', flat=True)[:SEARCH_TERMS_BATCH_SIZE])
+      if not term_ids:
+        return deleted
+      deleted += self.filter(id__in=term_ids, documents__isnull=True).delete()[0]
+
+
+class SearchTerm(models.Model):
+  """
+  Vocabulary of the words of the documents.
+  """
+  term = models.CharField(max_length=SEARCH_TERM_MAX_LENGTH, unique=True)
+
+  objects = SearchTermManager()
+
+
+class Document2SearchTermManager(models.Manager):
+
+  def index(self, doc_id, texts, created=False):
+    """
+    Records the words of the texts of a document, i.e. of its SEARCH_FIELDS, in place of its previous ones.
+    """
+    terms = get_search_terms(' '.join(text for text in texts if text))
+    indexed = {} if created else dict(self.filter(document_id=doc_id).values_list('term__term', 'term_id'))
+    if terms == set(indexed):
+      return
+
+    with transaction.atomic():
+      removed_ids = [term_id for term, term_id in indexed.items() if term not in terms]
+      for chunk in _chunks(removed_ids, SEARCH_TERMS_BATCH_SIZE):
+        self.filter(document_id=doc_id, term_id__in=chunk).delete()
+
+      added = terms.difference(indexed)
+      if added:
+        # Terms equal for the collation of the database have the same id
+        kept_ids = set(term_id for term, term_id in indexed.items() if term in terms)
+        added_ids = set(SearchTerm.objects.get_ids(added).values()).difference(kept_ids)
+        self.bulk_create(
+          [Document2SearchTerm(document_id=doc_id, term_id=term_id) for term_id in added_ids],
+          batch_size=SEARCH_TERMS_BATCH_SIZE,
+          ignore_conflicts=connection.features.supports_ignore_conflicts,  # e.g. when the document is saved twice concurrently
+        )
+
+  def search(self, search_text):
+    """
+    Returns a queryset of the ids of at most SEARCH_MAX_CANDIDATES documents, including all the ones containing
+    search_text in one of their SEARCH_FIELDS, or None if its words are too common to narrow the documents down.
+
+    The candidates are the documents having the longest word of search_text, or the next one if it matches more than
+    SEARCH_MAX_MATCHING_TERMS terms or SEARCH_MAX_CANDIDATES documents. Only the first SEARCH_TERM_MAX_LENGTH // 2
+    characters of the words are looked up, and words shorter than SEARCH_TERM_MIN_LENGTH are not.
+    """
+    fragments = set(
+      term[:SEARCH_TERM_MAX_LENGTH // 2] for term in get_search_terms(search_text) if len(term) >= SEARCH_TERM_MIN_LENGTH
+    )
+
+    for fragment in sorted(fragments, key=lambda fragment: (-len(fragment), fragment)):
+      term_ids = list(SearchTerm.objects.filter(term__contains=fragment).values_list('id', flat=True)[:SEARCH_MAX_MATCHING_TERMS + 1])
+      if len(term_ids) > SEARCH_MAX_MATCHING_TERMS:
+        continue
+      candidates = self.filter(term_id__in=term_ids)
+      if candidates[:SEARCH_MAX_CANDIDATES + 1].count() <= SEARCH_MAX_CANDIDATES:
+        return candidates.values('document_id')
+
+    return None
+
+
+class Document2SearchTerm(models.Model):
+  """
+  Inverted index of the words of the documents, to find the documents containing a text without scanning all of them.
+  """
+  document = models.ForeignKey(Document2, on_delete=models.CASCADE, related_name='search_terms')
+  term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='documents')
+
+  objects = Document2SearchTermManager()
+
+  class Meta(object):
+    unique_together = ('document', 'term')
+
+
+def _index_document_search_terms(sender, instance, created=False, update_fields=None, **kwargs):
+  if update_fields is None or any(field in update_fields for field in SEARCH_FIELDS):
+    Document2SearchTerm.objects.index(instance.id, [getattr(instance, field) for field in SEARCH_FIELDS], created=created)
+
+
+models.signals.post_save.connect(_index_document_search_terms, sender=Document2)
+models.signals.post_save.connect(_index_document_search_terms, sender=Directory)
+
+
 def get_cluster_config(user):
   return Cluster(user).get_app_config().get_config()
 
@@ -33,7 +33,16 @@ from desktop.lib.connectors.models import Connector
 from desktop.lib.django_test_util import make_logged_in_client
 from desktop.lib.fs import ProxyFS
 from desktop.lib.test_utils import grant_access
-from desktop.models import ClusterConfig, Directory, Document, Document2, Document2Permission, get_remote_home_storage
+from desktop.models import (
+  ClusterConfig,
+  Directory,
+  Document,
+  Document2,
+  Document2Ancestor,
+  Document2Permission,
+  SearchTerm,
+  get_remote_home_storage,
+)
 from filebrowser.conf import REMOTE_STORAGE_HOME
 from notebook.models import import_saved_beeswax_query
 from useradmin.models import User, get_default_user_group
@@ -385,6 +394,35 @@ class TestDocument2(object):
     data = json.loads(response.content)
     assert '/test_mv_dst/test_mv/query1.sql' == data['document']['path']
 
+  def test_directory_ancestors_index(self):
+    dir1 = Directory.objects.create(name='dir1', owner=self.user, parent_directory=self.home_dir)
+    dir2 = Directory.objects.create(name='dir2', owner=self.user, parent_directory=dir1)
+    doc = Document2.objects.create(name='query1.sql', type='query-hive', owner=self.user, data={}, parent_directory=dir2)
+    target_dir = Directory.objects.create(name='target', owner=self.user, parent_directory=self.home_dir)
+
+    assert [self.home_dir.id, dir1.id, dir2.id, doc.id] == list(
+      Document2Ancestor.objects.filter(descendant=doc).order_by('-depth').values_list('ancestor_id', flat=True)
+    )
+    assert {dir2.id, doc.id} == set(dir1._get_child_ids_recursively(dir1.id))
+
+    # Moving a directory moves its whole sub-tree
+    dir2.parent_directory = target_dir
+    dir2.save()
+
+    assert [self.home_dir.id, target_dir.id, dir2.id, doc.id] == list(
+      Document2Ancestor.objects.filter(descendant=doc).order_by('-depth').values_list('ancestor_id', flat=True)
+    )
+    assert not dir1._get_child_ids_recursively(dir1.id)
+    assert {dir2.id, doc.id} == set(target_dir._get_child_ids_recursively(target_dir.id))
+
+    # Write permissions are inherited from any ancestor
+    assert not Document2.objects.get(id=doc.id).can_write(self.user_not_me)
+    target_dir.share(user=self.user, name='write', users=[self.user_not_me], groups=[])
+    assert Document2.objects.get(id=doc.id).can_write(self.user_not_me)
+
+    target_dir.parent_directory = dir2
+    assert target_dir._contains_cycle()
+
   def test_directory_children(self):
     # Creates 2 directories and 2 queries and saves to home directory
     dir1 = Directory.objects.create(name='test_dir1', owner=self.user)
@@ -424,6 +462,43 @@ class TestDocument2(object):
     assert 5 == data['count']
     assert 2 == len(data['children'])
 
+  def test_search_documents_index(self):
+    query1 = Document2.objects.create(
+      name='Sales report', description='Monthly revenue', type='query-hive', owner=self.user, data={}, parent_directory=self.home_dir
+    )
+    query2 = Document2.objects.create(
+      name='revenue_by_region.sql', type='query-hive', owner=self.user, data={}, search='SELECT * FROM customers',
+      parent_directory=self.home_dir
+    )
+
+    assert {'sales', 'report', 'monthly', 'revenue'} == set(query1.search_terms.values_list('term__term', flat=True))
+
+    # Fragments of words still match, best matches first
+    documents = Document2.objects.filter(owner=self.user).search_documents(search_text='REVENU', order_by='-search_rank')
+    assert [query2, query1] == list(documents)
+
+    documents = Document2.objects.filter(owner=self.user).search_documents(search_text='from cust')
+    assert [query2] == list(documents)
+
+    # Renamed documents are re-indexed
+    query2.name = 'customers.sql'
+    query2.save()
+    Document2.objects.filter(id=query1.id).update(description='Yearly costs')
+
+    assert not Document2.objects.filter(owner=self.user).search_documents(search_text='revenue').exists()
+    assert [query1] == list(Document2.objects.filter(owner=self.user).search_documents(search_text='costs'))
+
+  def test_delete_unused_search_terms(self):
+    query = Document2.objects.create(
+      name='Churn 2024 forecast', type='query-hive', owner=self.user, data={}, is_history=True, parent_directory=self.home_dir
+    )
+    assert {'churn', 'forecast'} == set(query.search_terms.values_list('term__term', flat=True))
+
+    query.delete()
+
+    assert 2 <= SearchTerm.objects.delete_unused()
+    assert not SearchTerm.objects.filter(term__in=['churn', 'forecast']).exists()
+
   def test_update_document(self):
     doc = Document2.objects.create(
       name='initial', description='initial desc', type='query-hive', owner=self.user, data={}, parent_directory=self.home_dir
@@ -0,0 +1,66 @@
+import logging
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LOG = logging.getLogger()
+
+BATCH_SIZE = 500
+
+
+def get_ancestors(parents):
+  """
+  Yields (document id, ancestor id, depth) of all the documents of a {document id: parent directory id} dict. The documents
+  in a cycle of parent directories are only indexed as their own ancestor.
+  """
+  for doc_id in parents:
+    yield doc_id, doc_id, 0
+
+    chain = [doc_id]
+    parent_id = parents[doc_id]
+    while parent_id is not None and parent_id in parents:
+      if parent_id in chain:
+        LOG.warning('Document %s is in a cycle of parent directories: %s' % (doc_id, chain))
+        break
+      chain.append(parent_id)
+      parent_id = parents[parent_id]
+    else:
+      for depth, ancestor_id in enumerate(chain[1:], 1):
+        yield doc_id, ancestor_id, depth
+
+
+def index_ancestors(apps, schema_editor):
+  Document2 = apps.get_model('desktop', 'Document2')
+  Document2Ancestor = apps.get_model('desktop', 'Document2Ancestor')
+
+  parents = dict(Document2.objects.values_list('id', 'parent_directory_id'))
+  Document2Ancestor.objects.bulk_create(
+    (
+      Document2Ancestor(ancestor_id=ancestor_id, descendant_id=doc_id, depth=depth)
+      for doc_id, ancestor_id, depth in get_ancestors(parents)
+    ),
+    batch_size=BATCH_SIZE
+  )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('desktop', '0003_connector_interface'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Document2Ancestor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='desktop.document2')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='desktop.document2')),
+            ],
+            options={
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(index_ancestors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+SEARCH_TERM_MAX_LENGTH = 64
+
+
+def get_search_terms(text):
+  text = unicodedata.normalize('NFKD', text.casefold())
+  text = ''.join(char for char in text if not unicodedata.combining(char))
+
+  terms = set()
+  step = SEARCH_TERM_MAX_LENGTH // 2
+  for word in re.findall(r'\w+', text):
+    if word.isdigit():
+      continue
+    elif len(word) <= SEARCH_TERM_MAX_LENGTH:
+      terms.add(word)
+    else:
+      terms.update(word[i:i + SEARCH_TERM_MAX_LENGTH] for i in range(0, len(word) - step, step))
+  return terms
+
+
+def get_document_terms(Document2):
+  documents = Document2.objects.order_by('id').values_list('id', 'name', 'description', 'search')
+  for values in documents.iterator(chunk_size=BATCH_SIZE):
+    yield values[0], get_search_terms(' '.join(text for text in values[1:] if text))
+
+
+def index_search_terms(apps, schema_editor):
+  Document2 = apps.get_model('desktop', 'Document2')
+  SearchTerm = apps.get_model('desktop', 'SearchTerm')
+  Document2SearchTerm = apps.get_model('desktop', 'Document2SearchTerm')
+
+  vocabulary = set()
+  for doc_id, terms in get_document_terms(Document2):
+    vocabulary.update(terms)
+  SearchTerm.objects.bulk_create(
+    (SearchTerm(term=term) for term in sorted(vocabulary)),
+    batch_size=BATCH_SIZE,
+    ignore_conflicts=schema_editor.connection.features.supports_ignore_conflicts
+  )
+
+  term_ids = dict(SearchTerm.objects.values_list('term', 'id').iterator(chunk_size=BATCH_SIZE))
+  for term in vocabulary.difference(term_ids):  # Equal to another term for the collation of the database
+    term_ids[term] = SearchTerm.objects.get(term=term).id
+
+  Document2SearchTerm.objects.bulk_create(
+    (
+      Document2SearchTerm(document_id=doc_id, term_id=term_id)
+      for doc_id, terms in get_document_terms(Document2)
+      for term_id in set(term_ids[term] for term in terms)
+    ),
+    batch_size=BATCH_SIZE
+  )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('desktop', '0004_document2ancestor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Document2SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='desktop.document2')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='desktop.searchterm')),
+            ],
+            options={
+                'unique_together': {('document', 'term')},
+            },
+        ),
+        migrations.RunPython(index_search_terms, migrations.RunPython.noop),
+    ]
@@ -160,6 +160,36 @@ HAS_IAM_DETECTION = Config(
 )
 
 
+COPY_PARALLELISM = Config(
+  help=_('Number of keys copied or batches of keys deleted concurrently when copying, moving or deleting a directory.'),
+  key='copy_parallelism',
+  default=10,
+  type=int
+)
+
+UPLOAD_PARALLELISM = Config(
+  help=_('Number of parts of a file uploaded concurrently to S3.'),
+  key='upload_parallelism',
+  default=4,
+  type=int
+)
+
+UPLOAD_MAX_INFLIGHT_SIZE = Config(
+  help=_('Maximum number of bytes of the parts of a file being uploaded to S3 at the same time. Reading the file waits '
+         'for parts to complete beyond it.'),
+  key='upload_max_inflight_size',
+  default=512 * 1024 * 1024,
+  type=int
+)
+
+UPLOAD_PART_RETRIES = Config(
+  help=_('Number of times the upload of a part of a file to S3 is retried before failing the upload.'),
+  key='upload_part_retries',
+  default=3,
+  type=int
+)
+
+
 def get_default_get_environment_credentials():
   '''Allow to check if environment credentials are present or not'''
   return not get_raz_api_url()
@@ -23,6 +23,7 @@ import posixpath
 import urllib.error
 import urllib.request
 from builtins import object, str
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse as lib_urlparse
 
 from boto.exception import BotoClientError, S3ResponseError
@@ -33,12 +34,14 @@ from django.http.multipartparser import MultiPartParser
 from django.utils.translation import gettext as _
 
 from aws import s3
-from aws.conf import AWS_ACCOUNTS, PERMISSION_ACTION_S3, get_default_region, get_locations, is_raz_s3
+from aws.conf import AWS_ACCOUNTS, COPY_PARALLELISM, PERMISSION_ACTION_S3, get_default_region, get_locations, is_raz_s3
 from aws.s3 import S3A_ROOT, normpath, s3file, translate_s3_error
 from aws.s3.s3stat import S3Stat
 from filebrowser.conf import REMOTE_STORAGE_HOME
+from hadoop.fs import CopyProgress
 
 DEFAULT_READ_SIZE = 1024 * 1024  # 1MB
+KEYS_BATCH_SIZE = 1000  # Maximum number of keys of a listing page and of a multi-object delete request
 BUCKET_NAME_PATTERN = re.compile(
   r"^((?:(?:[a-zA-Z0-9]|[a-zA-Z0-9][a-zA-Z0-9_\-]*[a-zA-Z0-9])\.)*(?:[A-Za-z0-9]|[A-Za-z0-9][A-Za-z0-9_\-]*[A-Za-z0-9]))$")
 
@@ -79,6 +82,23 @@ def auth_error_handler(view_fn):
   return decorator
 
 
+def _batches(iterable, size=KEYS_BATCH_SIZE):
+  iterator = iter(iterable)
+  batch = list(itertools.islice(iterator, size))
+  while batch:
+    yield batch
+    batch = list(itertools.islice(iterator, size))
+
+
+def _wait_all(futures):
+  try:
+    return [future.result() for future in futures]
+  except Exception:
+    for future in futures:
+      future.cancel()
+    raise
+
+
 def get_s3_home_directory(user=None):
   from desktop.models import _handle_user_dir_raz
 
@@ -336,8 +356,30 @@ class S3FileSystem(object):
     bucket_name, prefix = s3.parse_uri(path)[:2]
     bucket = self._get_bucket(bucket_name)
     prefix = self._append_separator(prefix)
+    return self._stats_items(bucket.list(prefix=prefix, delimiter='/', headers=self.header_values), prefix)
+
+  @translate_s3_error
+  def listdir_stats_paged(self, path, page_size, marker=None):
+    """
+    Returns a page of at most page_size stats of the directory listing, starting after the key marker, and the marker of
+    the next page, None on the last page.
+    """
+    if S3FileSystem.isroot(path):
+      raise NotImplementedError(_('Listing the buckets in pages is not supported'))
+
+    bucket_name, prefix = s3.parse_uri(path)[:2]
+    bucket = self._get_bucket(bucket_name)
+    prefix = self._append_separator(prefix)
+    items = bucket.get_all_keys(prefix=prefix, delimiter='/', marker=marker, max_keys=page_size, headers=self.header_values)
+
+    next_marker = None
+    if items.is_truncated:
+      next_marker = items.next_marker or items[-1].name
+    return self._stats_items(items, prefix), next_marker
+
+  def _stats_items(self, items, prefix):
     res = []
-    for item in bucket.list(prefix=prefix, delimiter='/', headers=self.header_values):
+    for item in items:
       if isinstance(item, Prefix):
         res.append(S3Stat.from_key(Key(item.bucket, item.name), is_dir=True, fs=self.fs))
       else:
@@ -360,31 +402,41 @@ class S3FileSystem(object):
     if bucket_name and not key_name:
       self._delete_bucket(bucket_name)
     else:
-      if self.isdir(path):
+      is_dir = self.isdir(path)
+      if is_dir:
         path = self._append_separator(path)  # Really need to make sure we end with a '/'
 
       key = self._get_key(path, validate=False)
 
       if key.exists():
-        dir_keys = []
+        errors = []
+        has_dir_keys = False
 
-        if self.isdir(path):
+        if is_dir:
           _, dir_key_name = s3.parse_uri(path)[:2]
-          dir_keys = key.bucket.list(prefix=dir_key_name)
 
-        if not dir_keys:
+          # Keys are listed and deleted by pages of 1000 while the previous page is still being deleted
+          with ThreadPoolExecutor(max_workers=max(COPY_PARALLELISM.get(), 1)) as executor:
+            pending = []
+            for batch in _batches(key.bucket.list(prefix=dir_key_name)):
+              has_dir_keys = True
+              pending.append(executor.submit(key.bucket.delete_keys, batch))
+              if len(pending) >= COPY_PARALLELISM.get():
+                errors.extend(error for result in _wait_all(pending) for error in result.errors)
+                pending = []
+            errors.extend(error for result in _wait_all(pending) for error in result.errors)
+
+        if not has_dir_keys:
           # Avoid Raz bulk delete issue
           deleted_key = key.delete()
           if deleted_key.exists():
             raise S3FileSystemException('Could not delete key %s' % deleted_key)
-        else:
-          result = key.bucket.delete_keys(list(dir_keys))
-          if result.errors:
-            msg = "%d errors occurred while attempting to delete the following S3 paths:\n%s" % (
-              len(result.errors), '\n'.join(['%s: %s' % (error.key, error.message) for error in result.errors])
-            )
-            LOG.error(msg)
-            raise S3FileSystemException(msg)
+        elif errors:
+          msg = "%d errors occurred while attempting to delete the following S3 paths:\n%s" % (
+            len(errors), '\n'.join(['%s: %s' % (error.key, error.message) for error in errors])
+          )
+          LOG.error(msg)
+          raise S3FileSystemException(msg)
 
   @translate_s3_error
   @auth_error_handler
@@ -441,7 +493,7 @@ class S3FileSystem(object):
   @translate_s3_error
   @auth_error_handler
   def copy(self, src, dst, recursive=False, *args, **kwargs):
-    self._copy(src, dst, recursive=recursive, use_src_basename=True)
+    self._copy(src, dst, recursive=recursive, use_src_basename=True, progress_callback=kwargs.get('progress_callback'))
 
   @translate_s3_error
   @auth_error_handler
@@ -453,9 +505,9 @@ class S3FileSystem(object):
   @translate_s3_error
   @auth_error_handler
   def copy_remote_dir(self, src, dst, *args, **kwargs):
-    self._copy(src, dst, recursive=True, use_src_basename=False)
+    self._copy(src, dst, recursive=True, use_src_basename=False, progress_callback=kwargs.get('progress_callback'))
 
-  def _copy(self, src, dst, recursive, use_src_basename):
+  def _copy(self, src, dst, recursive, use_src_basename, progress_callback=None):
     src_st = self.stats(src)
     if src_st.isDir and not recursive:
       return  # omitting directory
@@ -491,15 +543,28 @@ class S3FileSystem(object):
     # resulting in 'test1/'.
     if src_st.isDir:
       src_key = self._append_separator(src_key)
-      for key in src_bucket.list(prefix=src_key):
-        if not key.name.startswith(src_key):
-          raise S3FileSystemException(_("Invalid key to transform: %s") % key.name)
-        dst_name = posixpath.normpath(s3.join(dst_key, key.name[cut:]))
+      progress = CopyProgress(progress_callback)
 
-        if self.isdir(normpath(self.join(S3A_ROOT, key.bucket.name, key.name))):
+      def copy_key(key):
+        dst_name = posixpath.normpath(s3.join(dst_key, key.name[cut:]))
+        if key.name.endswith('/'):  # Directory marker
           dst_name = self._append_separator(dst_name)
-
         key.copy(dst_bucket, dst_name)
+        progress.file_copied(key.size)
+
+      # Server side copies of a page of keys run while the next page is being listed
+      with ThreadPoolExecutor(max_workers=max(COPY_PARALLELISM.get(), 1)) as executor:
+        pending = []
+        for batch in _batches(src_bucket.list(prefix=src_key)):
+          for key in batch:
+            if not key.name.startswith(src_key):
+              raise S3FileSystemException(_("Invalid key to transform: %s") % key.name)
+            progress.add_file(key.size)
+          _wait_all(pending)
+          pending = [executor.submit(copy_key, key) for key in batch]
+        _wait_all(pending)
+
+      LOG.info('Copied %s to %s: %s' % (src, dst, progress))
     else:
       key = self._get_key(src)
       dst_name = posixpath.normpath(s3.join(dst_key, src_key[cut:]))
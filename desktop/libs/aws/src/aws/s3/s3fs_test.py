@@ -218,6 +218,73 @@ class TestS3FileSystem:
         key.bucket.list.assert_called_with(prefix='data/')
         key.bucket.delete_keys.assert_called()
 
+  def test_rmtree_dir_in_batches(self):
+    with patch('aws.s3.s3fs.S3FileSystem._get_key') as _get_key:
+      with patch('aws.s3.s3fs.S3FileSystem.isdir') as isdir:
+        keys = ['data/%d' % i for i in range(2500)]
+        key = Mock(
+          name='data',
+          exists=Mock(return_value=True),
+          bucket=Mock(list=Mock(return_value=iter(keys)), delete_keys=Mock(return_value=Mock(errors=[]))),
+        )
+        _get_key.return_value = key
+        isdir.return_value = True
+
+        fs = S3FileSystem(s3_connection=Mock())
+
+        fs.rmtree(path='s3a://gethue/data')
+
+        isdir.assert_called_once()
+        assert [1000, 1000, 500] == sorted([len(call.args[0]) for call in key.bucket.delete_keys.call_args_list], reverse=True)
+
+  def test_rmtree_dir_errors(self):
+    with patch('aws.s3.s3fs.S3FileSystem._get_key') as _get_key:
+      with patch('aws.s3.s3fs.S3FileSystem.isdir') as isdir:
+        error = Mock(key='data/1', message='Access Denied')
+        key = Mock(
+          name='data',
+          exists=Mock(return_value=True),
+          bucket=Mock(list=Mock(return_value=['data/1', 'data/2']), delete_keys=Mock(return_value=Mock(errors=[error]))),
+        )
+        _get_key.return_value = key
+        isdir.return_value = True
+
+        fs = S3FileSystem(s3_connection=Mock())
+
+        with pytest.raises(S3FileSystemException):
+          fs.rmtree(path='s3a://gethue/data')
+
+  def test_copy_dir_from_listing(self):
+    def make_key(name, size):
+      key = Mock(size=size)
+      key.name = name
+      return key
+
+    keys = [make_key('src/sub/', 0)] + [make_key('src/sub/file_%d' % i, 10) for i in range(1500)]
+    bucket = Mock(list=Mock(return_value=iter(keys)))
+    progress_updates = []
+
+    with patch('aws.s3.s3fs.S3FileSystem.stats') as stats:
+      with patch('aws.s3.s3fs.S3FileSystem._stats') as _stats:
+        with patch('aws.s3.s3fs.S3FileSystem._get_bucket') as _get_bucket:
+          with patch('aws.s3.s3fs.S3FileSystem.isdir') as isdir:
+            stats.return_value = Mock(isDir=True)
+            _stats.return_value = None
+            _get_bucket.return_value = bucket
+
+            fs = S3FileSystem(s3_connection=Mock())
+
+            fs.copy_remote_dir('s3a://gethue/src', 's3a://gethue/dst', progress_callback=progress_updates.append)
+
+            isdir.assert_not_called()  # Directory markers come from the listing
+            keys[0].copy.assert_called_once_with(bucket, 'dst/sub/')
+            keys[1].copy.assert_called_once_with(bucket, 'dst/sub/file_0')
+            assert all(key.copy.called for key in keys)
+
+            progress = progress_updates[-1]
+            assert 1501 == progress.files_copied == progress.files_total
+            assert 15000 == progress.bytes_copied
+
 
 class S3FSTest(S3TestBase):
   @classmethod
@@ -22,14 +22,18 @@ See http://docs.djangoproject.com/en/1.9/topics/http/file-uploads/
 """
 
 import os
+import time
 import logging
+import threading
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO as stream_io
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers, StopUpload, UploadFileException
 from django.utils.translation import gettext as _
 
+from aws.conf import UPLOAD_MAX_INFLIGHT_SIZE, UPLOAD_PARALLELISM, UPLOAD_PART_RETRIES
 from aws.s3 import parse_uri
 from aws.s3.s3fs import S3FileSystemException
 from desktop.conf import TASK_SERVER_V2
@@ -43,6 +47,81 @@ DEFAULT_WRITE_SIZE = 1024 * 1024 * 128  # TODO: set in configuration (currently
 LOG = logging.getLogger()
 
 
+class ParallelPartUploader(object):
+  """
+  Uploads the parts of a boto multipart upload on a thread pool, so that the next parts can be read meanwhile and
+  several parts are sent to S3 at the same time.
+
+  submit() blocks while the parts being uploaded hold max_inflight_size bytes, which bounds the memory of an upload.
+  Each part is retried with an exponential backoff before failing the upload.
+  """
+
+  def __init__(self, mp, parallelism=None, max_inflight_size=None, retries=None, backoff=1):
+    self._mp = mp
+    self.parallelism = parallelism or UPLOAD_PARALLELISM.get()
+    self.max_inflight_size = max_inflight_size or UPLOAD_MAX_INFLIGHT_SIZE.get()
+    self.retries = UPLOAD_PART_RETRIES.get() if retries is None else retries
+    self.backoff = backoff
+
+    self.inflight_size = 0
+    self._inflight = threading.Condition()
+    self._futures = []
+    self._executor = ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix='S3PartUploader')
+
+  def submit(self, part_num, data):
+    """
+    Schedules the upload of the bytes of a part. Raises the error of any part that already failed.
+    """
+    size = len(data)
+    with self._inflight:
+      # A part larger than the whole budget is still uploaded, alone
+      while self.inflight_size and self.inflight_size + size > self.max_inflight_size:
+        self._inflight.wait()
+      self.inflight_size += size
+
+    self._raise_failure()
+
+    future = self._executor.submit(self._upload_part, part_num, data)
+    future.add_done_callback(lambda future: self._release(size))
+    self._futures.append(future)
+
+  def wait(self):
+    """
+    Waits for all the parts to be uploaded and raises the error of the first failed one.
+    """
+    try:
+      for future in self._futures:
+        future.result()
+    finally:
+      self._executor.shutdown(wait=False)
+
+  def cancel(self):
+    for future in self._futures:
+      future.cancel()
+    self._executor.shutdown(wait=True)
+    self._mp.cancel_upload()
+
+  def _upload_part(self, part_num, data):
+    for attempt in range(self.retries + 1):
+      try:
+        return self._mp.upload_part_from_file(fp=stream_io(data), part_num=part_num)
+      except Exception as e:
+        if attempt == self.retries:
+          raise
+        LOG.warning('Retrying the upload of part %d to %s after error: %s' % (part_num, self._mp.key_name, e))
+        time.sleep(self.backoff * 2 ** attempt)
+
+  def _release(self, size):
+    with self._inflight:
+      self.inflight_size -= size
+      self._inflight.notify_all()
+
+  def _raise_failure(self):
+    for future in self._futures:
+      if future.done() and not future.cancelled() and future.exception() is not None:
+        raise future.exception()
+
+
 class S3FineUploaderChunkedUpload(object):
   def __init__(self, request, *args, **kwargs):
     self._mp = None
@@ -92,19 +171,21 @@ class S3FineUploaderChunkedUpload(object):
         self.request.META['upload_failed'] = e
         raise PopupException("S3FineUploaderChunkedUpload: Initiating S3 multipart upload to target path: %s failed" % self.filepath)
 
+    uploader = ParallelPartUploader(self._mp)
     try:
       for i, (chunk, total) in enumerate(generate_chunks(self.qquuid, self.qqtotalparts, default_write_size=self.chunk_size), 1):
         LOG.debug("S3FineUploaderChunkedUpload: uploading file %s, part %d, size %d, dest: %s" %
                   (self.file_name, i, total, self.destination))
-        self._mp.upload_part_from_file(fp=chunk, part_num=i)
+        uploader.submit(i, chunk.getvalue())  # The chunk is closed at the next iteration
+      uploader.wait()
     except Exception as e:
-      self._mp.cancel_upload()
+      uploader.cancel()
       LOG.exception('Failed to upload file to S3 at %s: %s' % (self.filepath, e))
       raise PopupException("S3FineUploaderChunkedUpload: uploading file %s failed with %s" % (self.filepath, e))
-    finally:
-      # Finish the upload
-      LOG.info("S3FineUploaderChunkedUpload: has completed file upload to S3, total file size is: %d." % self.totalfilesize)
-      self._mp.complete_upload()
+
+    # Finish the upload
+    LOG.info("S3FineUploaderChunkedUpload: has completed file upload to S3, total file size is: %d." % self.totalfilesize)
+    self._mp.complete_upload()
 
   def upload(self):
     self.check_access()
@@ -147,6 +228,7 @@ class S3FileUploadHandler(FileUploadHandler):
     self.file = None
     self._request = request
     self._mp = None
+    self._uploader = None
     self._part_num = 1
 
     if self._is_s3_upload():
@@ -187,12 +269,13 @@ class S3FileUploadHandler(FileUploadHandler):
     if self._is_s3_upload():
       try:
         LOG.debug("S3FileUploadHandler uploading file part: %d" % self._part_num)
-        fp = self._get_file_part(raw_data)
-        self._mp.upload_part_from_file(fp=fp, part_num=self._part_num)
+        if self._uploader is None:
+          self._uploader = ParallelPartUploader(self._mp)
+        self._uploader.submit(self._part_num, raw_data)
         self._part_num += 1
         return None
       except Exception as e:
-        self._mp.cancel_upload()
+        self._cancel_upload()
         LOG.exception('Failed to upload file to S3 at %s: %s' % (self.target_path, e))
         raise StopUpload()
     else:
@@ -200,6 +283,14 @@ class S3FileUploadHandler(FileUploadHandler):
 
   def file_complete(self, file_size):
     if self._is_s3_upload():
+      if self._uploader is not None:
+        try:
+          self._uploader.wait()
+        except Exception as e:
+          self._cancel_upload()
+          LOG.exception('Failed to upload file to S3 at %s: %s' % (self.target_path, e))
+          raise StopUpload()
+
       # Finish the upload
       LOG.info("S3FileUploadHandler has completed file upload to S3, total file size is: %d." % file_size)
       self._mp.complete_upload()
@@ -208,6 +299,12 @@ class S3FileUploadHandler(FileUploadHandler):
     else:
       return None
 
+  def _cancel_upload(self):
+    if self._uploader is not None:
+      self._uploader.cancel()
+    else:
+      self._mp.cancel_upload()
+
   def _is_s3_upload(self):
     return self._get_scheme() and self._get_scheme().startswith('S3')
 
@@ -225,12 +322,6 @@ class S3FileUploadHandler(FileUploadHandler):
     else:
       return None
 
-  def _get_file_part(self, raw_data):
-    fp = stream_io()
-    fp.write(raw_data)
-    fp.seek(0)
-    return fp
-
 
 class S3NewFileUploadHandler(S3FileUploadHandler):
   """
@@ -244,6 +335,7 @@ class S3NewFileUploadHandler(S3FileUploadHandler):
     self.target_path = None
     self.file = None
     self._mp = None
+    self._uploader = None
     self._part_num = 1
 
     # TODO: _is_s3_upload really required?
@@ -0,0 +1,132 @@
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import threading
+
+import pytest
+
+from aws.s3.upload import ParallelPartUploader
+
+
+class FakeMultiPartUpload(object):
+
+  def __init__(self, latency=0, failures=None):
+    self.key_name = 'data/file.csv'
+    self.latency = latency
+    self.failures = failures or {}
+    self.parts = {}
+    self.attempts = {}
+    self.active = 0
+    self.max_active = 0
+    self.canceled = False
+    self._lock = threading.Lock()
+
+  def upload_part_from_file(self, fp, part_num):
+    with self._lock:
+      self.attempts[part_num] = self.attempts.get(part_num, 0) + 1
+      self.active += 1
+      self.max_active = max(self.max_active, self.active)
+      failing = self.failures.get(part_num, 0) >= self.attempts[part_num]
+    try:
+      time.sleep(self.latency)
+      if failing:
+        raise IOError('Connection reset')
+      self.parts[part_num] = fp.read()
+    finally:
+      with self._lock:
+        self.active -= 1
+
+  def cancel_upload(self):
+    self.canceled = True
+
+
+def test_upload_parts_concurrently():
+  mp = FakeMultiPartUpload(latency=0.05)
+  uploader = ParallelPartUploader(mp, parallelism=4, max_inflight_size=1024)
+
+  for part_num in range(1, 9):
+    uploader.submit(part_num, b'%d' % part_num)
+  uploader.wait()
+
+  assert {part_num: b'%d' % part_num for part_num in range(1, 9)} == mp.parts
+  assert 1 < mp.max_active <= 4
+  assert 0 == uploader.inflight_size
+
+
+def test_inflight_size_is_bounded():
+  mp = FakeMultiPartUpload(latency=0.02)
+  uploader = ParallelPartUploader(mp, parallelism=8, max_inflight_size=30)
+  sizes = []
+
+  for part_num in range(1, 11):
+    uploader.submit(part_num, b'x' * 10)
+    sizes.append(uploader.inflight_size)
+  uploader.wait()
+
+  assert 10 == len(mp.parts)
+  assert max(sizes) <= 30
+  assert mp.max_active <= 3
+
+
+def test_part_larger_than_inflight_size():
+  mp = FakeMultiPartUpload()
+  uploader = ParallelPartUploader(mp, parallelism=2, max_inflight_size=10)
+
+  uploader.submit(1, b'x' * 100)
+  uploader.submit(2, b'y' * 100)
+  uploader.wait()
+
+  assert b'x' * 100 == mp.parts[1]
+  assert b'y' * 100 == mp.parts[2]
+
+
+def test_retry_failed_part():
+  mp = FakeMultiPartUpload(failures={2: 2})
+  uploader = ParallelPartUploader(mp, parallelism=2, retries=2, backoff=0)
+
+  for part_num in range(1, 4):
+    uploader.submit(part_num, b'data')
+  uploader.wait()
+
+  assert 3 == mp.attempts[2]
+  assert b'data' == mp.parts[2]  # Each attempt reads the part from its start
+
+
+def test_failed_part_fails_upload():
+  mp = FakeMultiPartUpload(failures={1: 10})
+  uploader = ParallelPartUploader(mp, parallelism=2, retries=1, backoff=0)
+
+  uploader.submit(1, b'data')
+  with pytest.raises(IOError):
+    uploader.wait()
+  uploader.cancel()
+
+  assert 2 == mp.attempts[1]
+  assert mp.canceled
+
+
+def test_submit_after_failed_part():
+  mp = FakeMultiPartUpload(failures={1: 10})
+  uploader = ParallelPartUploader(mp, parallelism=1, retries=0)
+
+  uploader.submit(1, b'data')
+  while not uploader._futures[0].done():
+    time.sleep(0.01)
+
+  with pytest.raises(IOError):
+    uploader.submit(2, b'data')
+  assert 2 not in mp.attempts
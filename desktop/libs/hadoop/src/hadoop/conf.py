@@ -51,6 +51,12 @@ UPLOAD_CHUNK_SIZE = Config(
   type=int,
   default=1024 * 1024 * 128)
 
+COPY_PARALLELISM = Config(
+  key="copy_parallelism",
+  help="Number of files copied concurrently when copying a directory. Default is 10.",
+  type=int,
+  default=10)
+
 
 def has_hdfs_enabled():
   if has_connectors():
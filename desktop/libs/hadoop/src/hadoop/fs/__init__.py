@@ -35,10 +35,12 @@ import grp
 import pwd
 import math
 import stat
+import time
 import errno
 import shutil
 import logging
 import posixpath
+import threading
 from builtins import map, object, open as builtins_open, range
 from functools import reduce
 
@@ -228,6 +230,59 @@ class LocalSubFileSystem(object):
     return "LocalFileSystem(%s)" % repr(self.root)
 
 
+class CopyProgress(object):
+  """
+  Thread safe counters of a copy of many files, reported to an optional callback after each copied file.
+  """
+
+  def __init__(self, callback=None):
+    self.callback = callback
+    self.files_total = 0
+    self.files_copied = 0
+    self.bytes_total = 0
+    self.bytes_copied = 0
+    self.start_time = time.time()
+    self._lock = threading.Lock()
+
+  def add_file(self, size):
+    with self._lock:
+      self.files_total += 1
+      self.bytes_total += size or 0
+
+  def file_copied(self, size):
+    with self._lock:
+      self.files_copied += 1
+      self.bytes_copied += size or 0
+    if self.callback is not None:
+      self.callback(self)
+
+  @property
+  def elapsed(self):
+    return time.time() - self.start_time
+
+  @property
+  def files_per_second(self):
+    return self.files_copied / self.elapsed if self.elapsed else 0
+
+  @property
+  def bytes_per_second(self):
+    return self.bytes_copied / self.elapsed if self.elapsed else 0
+
+  def to_json_dict(self):
+    return {
+      'files_total': self.files_total,
+      'files_copied': self.files_copied,
+      'bytes_total': self.bytes_total,
+      'bytes_copied': self.bytes_copied,
+      'elapsed': self.elapsed,
+    }
+
+  def __str__(self):
+    return '%d/%d files, %d/%d bytes in %.1fs (%.1f files/s, %.1f bytes/s)' % (
+      self.files_copied, self.files_total, self.bytes_copied, self.bytes_total, self.elapsed, self.files_per_second, self.bytes_per_second
+    )
+
+
 class FakeStatus(object):
   """
   A fake implementation of HDFS health RPCs.
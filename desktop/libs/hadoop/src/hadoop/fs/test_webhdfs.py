@@ -23,6 +23,7 @@ import logging
 import threading
 from builtins import map, object, range, zip
 from functools import reduce
+from unittest.mock import patch
 
 import pytest
 from django.test import TestCase
@@ -30,6 +31,8 @@ from django.test import TestCase
 from hadoop import pseudo_hdfs4
 from hadoop.fs.exceptions import WebHdfsException
 from hadoop.fs.hadoopfs import Hdfs
+from hadoop.fs.webhdfs import WebHdfs
+from hadoop.fs.webhdfs_types import WebHdfsStat
 from hadoop.pseudo_hdfs4 import is_live_cluster
 
 LOG = logging.getLogger()
@@ -616,3 +619,105 @@ class WebhdfsTests(TestCase):
     LOG.debug("%s" % resp)
     self.cluster.fs.remove(test_file)
     self.cluster.fs.remove(test_file2)
+
+
+class InMemoryWebHdfs(WebHdfs):
+  """
+  Stand-in of WebHDFS keeping the files in memory and counting the calls of each operation.
+  """
+
+  def __init__(self):
+    super(InMemoryWebHdfs, self).__init__(url='http://localhost:50070/webhdfs/v1', fs_defaultfs='hdfs://localhost:8020')
+    self.files = {}
+    self.dirs = set(['/'])
+    self.calls = {}
+    self.lock = threading.Lock()
+
+  def _count(self, op):
+    with self.lock:
+      self.calls[op] = self.calls.get(op, 0) + 1
+
+  def _status(self, path):
+    is_dir = path in self.dirs
+    return {
+      'pathSuffix': Hdfs.basename(path), 'type': 'DIRECTORY' if is_dir else 'FILE', 'accessTime': 0, 'modificationTime': 0,
+      'owner': 'test', 'group': 'test', 'length': 0 if is_dir else len(self.files[path]), 'blockSize': 128, 'replication': 1,
+      'permission': '755' if is_dir else '644'
+    }
+
+  def _stats(self, path):
+    self._count('GETFILESTATUS')
+    path = self.strip_normpath(path)
+    if path not in self.dirs and path not in self.files:
+      return None
+    return WebHdfsStat(self._status(path), Hdfs.dirname(path))
+
+  def listdir_stats(self, path, glob=None):
+    self._count('LISTSTATUS')
+    path = self.strip_normpath(path)
+    children = [child for child in sorted(self.dirs | set(self.files)) if child != path and Hdfs.dirname(child) == path]
+    return [WebHdfsStat(self._status(child), path) for child in children]
+
+  def mkdir(self, path, mode=None):
+    self._count('MKDIRS')
+    with self.lock:
+      self.dirs.add(self.strip_normpath(path))
+
+  def read(self, path, offset, length, bufsize=None):
+    self._count('OPEN')
+    return self.files[self.strip_normpath(path)][offset:offset + length]
+
+  def create(self, path, overwrite=False, blocksize=None, replication=None, permission=None, data=None):
+    self._count('CREATE')
+    with self.lock:
+      self.files[self.strip_normpath(path)] = data or b''
+
+  def append(self, path, data):
+    self._count('APPEND')
+    with self.lock:
+      self.files[self.strip_normpath(path)] += data
+
+
+class TestWebHdfsCopy(object):
+
+  def setup_method(self):
+    self.fs = InMemoryWebHdfs()
+    self.fs.dirs.update(['/src', '/src/a', '/src/a/b'])
+    self.fs.files.update({
+      '/src/one.txt': b'1' * 25,
+      '/src/a/two.txt': b'2' * 10,
+      '/src/a/b/three.txt': b'',
+    })
+
+  def test_copy_remote_dir(self):
+    progress_updates = []
+
+    with patch('hadoop.fs.webhdfs.WebHdfs.get_upload_chuck_size', return_value=10):
+      progress = self.fs.copy_remote_dir('/src', '/dst', progress_callback=lambda progress: progress_updates.append(progress.files_copied))
+
+    assert set(['/dst', '/dst/a', '/dst/a/b']) <= self.fs.dirs
+    assert b'1' * 25 == self.fs.files['/dst/one.txt']
+    assert b'2' * 10 == self.fs.files['/dst/a/two.txt']
+    assert b'' == self.fs.files['/dst/a/b/three.txt']
+
+    assert 3 == progress.files_copied == progress.files_total
+    assert 35 == progress.bytes_copied
+    assert [1, 2, 3] == sorted(progress_updates)
+
+    assert 'GETFILESTATUS' not in self.fs.calls  # Stats come from the listings
+    assert 3 == self.fs.calls['LISTSTATUS']
+    assert 3 == self.fs.calls['CREATE']
+    assert 2 == self.fs.calls['APPEND']
+
+  def test_copyfile_pipelined_chunks(self):
+    with patch('hadoop.fs.webhdfs.WebHdfs.get_upload_chuck_size', return_value=10):
+      self.fs.copyfile('/src/one.txt', '/dst_one.txt')
+
+    assert b'1' * 25 == self.fs.files['/dst_one.txt']
+    assert 3 == self.fs.calls['OPEN']
+
+  def test_copy_remote_dir_error(self):
+    with patch.object(InMemoryWebHdfs, 'append', side_effect=WebHdfsException('Quota exceeded')):
+      with patch('hadoop.fs.webhdfs.WebHdfs.get_upload_chuck_size', return_value=10):
+        with pytest.raises(WebHdfsException):
+          self.fs.copy_remote_dir('/src', '/dst')
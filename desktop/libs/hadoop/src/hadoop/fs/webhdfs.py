@@ -28,6 +28,7 @@ import threading
 import urllib.error
 import urllib.request
 from builtins import object, oct
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import unquote as urllib_unquote, urlparse
 
 from django.http.multipartparser import MultiPartParser
@@ -38,7 +39,7 @@ from past.builtins import long
 import hadoop.conf
 import desktop.conf
 from desktop.lib.rest import http_client, resource
-from hadoop.fs import SEEK_CUR, SEEK_END, SEEK_SET, normpath as fs_normpath
+from hadoop.fs import SEEK_CUR, SEEK_END, SEEK_SET, CopyProgress, normpath as fs_normpath
 from hadoop.fs.exceptions import WebHdfsException
 from hadoop.fs.hadoopfs import Hdfs
 from hadoop.fs.webhdfs_types import WebHdfsContentSummary, WebHdfsStat
@@ -266,6 +267,41 @@ class WebHdfs(Hdfs):
     filestatus_list = json['FileStatuses']['FileStatus']
     return [WebHdfsStat(st, path) for st in filestatus_list]
 
+  def listdir_stats_paged(self, path, page_size, marker=None):
+    """
+    listdir_stats_paged(path, page_size, marker=None) -> ([ WebHdfsStat ], next_marker)
+
+    Get a page of the directory listing with stats, starting after the entry named marker. next_marker is None on the
+    last page. Raises NotImplementedError if the NameNode does not list directories in batches.
+    """
+    path = self.strip_normpath(path)
+    headers = self._getheaders()
+    stats = []
+
+    while True:
+      params = self._getparams()
+      params['op'] = 'LISTSTATUS_BATCH'
+      if marker:
+        params['startAfter'] = marker
+      try:
+        json = self._root.get(path, params, headers)
+      except WebHdfsException as ex:
+        if 'LISTSTATUS_BATCH' in str(ex):  # Before Hadoop 2.8
+          raise NotImplementedError(_('Listing a directory in batches is not supported by HDFS'))
+        raise ex
+
+      listing = json['DirectoryListing']
+      filestatus_list = listing['partialListing']['FileStatuses']['FileStatus']
+      shown_list = filestatus_list[:page_size - len(stats)]
+      stats.extend(WebHdfsStat(st, path) for st in shown_list)
+
+      has_more = len(filestatus_list) > len(shown_list) or listing['remainingEntries'] > 0
+      if not shown_list or not has_more:
+        return stats, None
+      marker = shown_list[-1]['pathSuffix']
+      if len(stats) == page_size:
+        return stats, marker
+
   def listdir(self, path, glob=None):
     """
     listdir(path, glob=None) -> [ entry names ]
@@ -286,6 +322,20 @@ class WebHdfs(Hdfs):
     json = self._root.get(path, params, headers)
     return WebHdfsContentSummary(json['ContentSummary'])
 
+  def get_file_checksum(self, path):
+    """
+    get_file_checksum(path) -> {'algorithm': ..., 'bytes': ..., 'length': ...}
+
+    The checksum is computed by the DataNodes from the checksums of the blocks, without transferring the file.
+    """
+    path = self.strip_normpath(path)
+    params = self._getparams()
+    params['op'] = 'GETFILECHECKSUM'
+    self._add_delegation_token(params)  # Computed by a DataNode
+    headers = self._getheaders()
+    json = self._root.get(path, params, headers)
+    return json['FileChecksum']
+
   def _stats(self, path):
     """This version of stats returns None if the entry is not found"""
     path = self.strip_normpath(path)
@@ -547,16 +597,7 @@ class WebHdfs(Hdfs):
       params['length'] = long(length)
     if bufsize is not None:
       params['bufsize'] = bufsize
-    if self._security_enabled:
-      token = self.get_delegation_token(self.user)
-      if token:
-        params['delegation'] = token
-        # doas should not be present with delegation token as the token includes the username
-        # https://hadoop.apache.org/docs/r1.0.4/webhdfs.html
-        if 'doas' in params:
-          del params['doas']
-        if 'user.name' in params:
-          del params['user.name']
+    self._add_delegation_token(params)
     unquoted_path = urllib_unquote(smart_str(path))
     return self._client._make_url(unquoted_path, params)
 
@@ -703,52 +744,93 @@ class WebHdfs(Hdfs):
     if self.isdir(dst):
       raise IOError(errno.INVAL, _("Copy dst '%s' is a directory") % dst)
 
-    offset = 0
+    self._copyfile_data(src, dst, sb, skip_header=skip_header)
 
-    while True:
-      data = self.read(src, offset, self.get_upload_chuck_size())
+  def _copyfile_data(self, src, dst, sb, skip_header=False):
+    """
+    Copies the content of the file `src` of stats `sb` chunk by chunk. The next chunk is read in the background while
+    the current one is being appended to `dst`.
+    """
+    chunk_size = self.get_upload_chuck_size()
+    user = self.user
+    offset = 0
 
-      if skip_header:
-        data = '\n'.join(data.splitlines())
+    with ThreadPoolExecutor(max_workers=1) as reader:
+      next_data = None
+      data = self.read(src, offset, chunk_size)
 
-      cnt = len(data)
+      while True:
+        cnt = len(data)
+        if cnt >= chunk_size:
+          next_data = reader.submit(self.do_as_user, user, self.read, src, offset + cnt, chunk_size)
 
-      if offset == 0:
         if skip_header:
-          n = data.index('\n')
-          if n > 0:
-            data = data[n + 1:]
-        self.create(dst,
-                    overwrite=True,
-                    blocksize=sb.blockSize,
-                    replication=sb.replication,
-                    permission=oct(stat.S_IMODE(sb.mode)),
-                    data=data)
-      else:
-        self.append(dst, data)
-
-      if cnt < self.get_upload_chuck_size():
-        break
-
-      offset += cnt
+          data = '\n'.join(data.splitlines())
+
+        if offset == 0:
+          if skip_header:
+            n = data.index('\n')
+            if n > 0:
+              data = data[n + 1:]
+          self.create(dst,
+                      overwrite=True,
+                      blocksize=sb.blockSize,
+                      replication=sb.replication,
+                      permission=oct(stat.S_IMODE(sb.mode)),
+                      data=data)
+        elif data:
+          self.append(dst, data)
+
+        if cnt < chunk_size:
+          break
+
+        offset += cnt
+        data = next_data.result()
+
+  def copy_remote_dir(self, source, destination, dir_mode=None, owner=None, progress_callback=None):
+    """
+    Copies the content of the directory `source` into `destination`.
 
-  def copy_remote_dir(self, source, destination, dir_mode=None, owner=None):
+    The tree is walked with one listing per directory and the files are copied from the stats of these listings on a
+    bounded pool of `copy_parallelism` threads. `progress_callback` is called with a CopyProgress after each copied file.
+    """
     if owner is None:
       owner = self.DEFAULT_USER
 
     if dir_mode is None:
       dir_mode = self.getDefaultDirPerms()
 
-    if not self.exists(destination):
-      self.do_as_user(owner, self.mkdir, destination, mode=dir_mode)
+    progress = CopyProgress(progress_callback)
+    directories = [(source, destination)]
+    futures = []
 
-    for stat in self.listdir_stats(source):
-      source_file = stat.path
-      destination_file = posixpath.join(destination, stat.name)
-      if stat.isDir:
-        self.copy_remote_dir(source_file, destination_file, dir_mode, owner)
-      else:
-        self.do_as_user(owner, self.copyfile, source_file, destination_file)
+    def copy_file(stat, destination_file):
+      self.do_as_user(owner, self._copyfile_data, stat.path, destination_file, stat)
+      progress.file_copied(stat.size)
+
+    with ThreadPoolExecutor(max_workers=max(hadoop.conf.COPY_PARALLELISM.get(), 1)) as executor:
+      try:
+        while directories:
+          source_dir, destination_dir = directories.pop()
+          self.do_as_user(owner, self.mkdir, destination_dir, mode=dir_mode)  # No-op if it exists
+
+          for stat in self.listdir_stats(source_dir):
+            destination_file = posixpath.join(destination_dir, stat.name)
+            if stat.isDir:
+              directories.append((stat.path, destination_file))
+            else:
+              progress.add_file(stat.size)
+              futures.append(executor.submit(copy_file, stat, destination_file))
+
+        for future in as_completed(futures):
+          future.result()
+      except Exception:
+        for future in futures:
+          future.cancel()
+        raise
+
+    LOG.info('Copied %s to %s: %s' % (source, destination, progress))
+    return progress
 
   def copy(self, src, dest, recursive=False, dir_mode=None, owner=None):
     """
@@ -864,6 +946,21 @@ class WebHdfs(Hdfs):
       LOG.exception("Failed to read redirect from response: %s (%s)" % (webhdfs_ex, ex))
       raise webhdfs_ex
 
+  def _add_delegation_token(self, params):
+    """
+    Authenticates the requests redirected to the DataNodes, which do not accept the Kerberos credentials of Hue.
+    """
+    if self._security_enabled:
+      token = self.get_delegation_token(self.user)
+      if token:
+        params['delegation'] = token
+        # doas should not be present with delegation token as the token includes the username
+        # https://hadoop.apache.org/docs/r1.0.4/webhdfs.html
+        if 'doas' in params:
+          del params['doas']
+        if 'user.name' in params:
+          del params['user.name']
+
   def get_delegation_token(self, renewer):
     """get_delegation_token(user) -> Delegation token"""
     # Workaround for HDFS-3988
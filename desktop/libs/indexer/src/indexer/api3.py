@@ -634,13 +634,14 @@ def _small_indexing(user, fs, client, source, destination, index_name):
           rows=rows,
           start_over=start_over
       )
-      rows = searcher.update_data_from_hive(
+      rows, truncated = searcher.update_data_from_hive(
           index_name,
           columns,
           fetch_handle=fetch_handle,
           indexing_options=kwargs
       )
-      # TODO if rows == MAX_ROWS truncation warning
+      if truncated:
+        errors.append(_('Only the first %s rows of the query result were indexed.') % rows)
     elif source['inputFormat'] == 'manual':
       pass  # No need to do anything
     else:
@@ -144,6 +144,44 @@ ENABLE_DIRECT_UPLOAD = Config(
   default=False
 )
 
+LOCAL_FILE_INSERT_BATCH_SIZE = Config(
+  key="local_file_insert_batch_size",
+  help=_t("Maximum number of rows of each INSERT statement loading a file uploaded directly into a table."),
+  type=int,
+  default=1000
+)
+
+LOCAL_FILE_STAGING_THRESHOLD = Config(
+  key="local_file_staging_threshold",
+  help=_t(
+    "Size in bytes from which a file uploaded directly into a Hive or Impala table is copied to the home of the user on the file"
+    " system and loaded with LOAD DATA instead of INSERT statements. 0 disables it."
+  ),
+  type=int,
+  default=10 * 1024 * 1024
+)
+
+QUERY_INDEXING_BATCH_SIZE = Config(
+  key="query_indexing_batch_size",
+  help=_t("Number of rows fetched from a query result and sent to Solr with each update request when indexing the result."),
+  type=int,
+  default=1000
+)
+
+QUERY_INDEXING_WORKERS = Config(
+  key="query_indexing_workers",
+  help=_t("Number of concurrent Solr update requests when indexing a query result. The next rows are fetched meanwhile."),
+  type=int,
+  default=4
+)
+
+QUERY_INDEXING_MAX_ROWS = Config(
+  key="query_indexing_max_rows",
+  help=_t("Maximum number of rows of a query result to index. 0 indexes all of them."),
+  type=int,
+  default=0
+)
+
 # Unused
 BATCH_INDEXER_PATH = Config(
   key="batch_indexer_path",
@@ -21,17 +21,18 @@ import sys
 import json
 import shutil
 import logging
-import numbers
+import threading
 from builtins import object
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-import tablib
 from django.utils.translation import gettext as _
 
 from dashboard.models import Collection2
 from desktop.lib.exceptions_renderable import PopupException
-from indexer.conf import CORE_INSTANCE_DIR
+from indexer.conf import CORE_INSTANCE_DIR, QUERY_INDEXING_BATCH_SIZE, QUERY_INDEXING_MAX_ROWS, QUERY_INDEXING_WORKERS
 from indexer.solr_client import SolrClient
-from indexer.utils import copy_configs, field_values_from_log, field_values_from_separated_file
+from indexer.utils import copy_configs, field_values_from_log, field_values_from_separated_file, rows_to_csv
 from libsolr.api import SolrApi
 from libzookeeper.models import ZookeeperClient
 from search.conf import SECURITY_ENABLED, SOLR_URL
@@ -274,32 +275,54 @@ class CollectionManagerController(object):
       raise PopupException(_('Could not update index. Indexing strategy %s not supported.') % indexing_strategy)
 
   def update_data_from_hive(self, collection_or_core_name, columns, fetch_handle, indexing_options=None):
-    MAX_ROWS = 10000
-    FETCH_BATCH = 1000
+    """
+    Index the rows of a query result and return their number, and whether the result had more than QUERY_INDEXING_MAX_ROWS rows.
 
-    row_count = 0
-    has_more = True
+    The next batch of rows is fetched while the previous ones are sent to Solr by up to QUERY_INDEXING_WORKERS concurrent update
+    requests, so only a few batches are in memory whatever the size of the result.
+    """
+    batch_size = QUERY_INDEXING_BATCH_SIZE.get()
+    max_rows = QUERY_INDEXING_MAX_ROWS.get()
+    workers = max(1, QUERY_INDEXING_WORKERS.get())
     if indexing_options is None:
       indexing_options = {}
 
-    client = SolrClient(self.user)
+    local = threading.local()
 
-    try:
-      while row_count < MAX_ROWS and has_more:
-        result = fetch_handle(FETCH_BATCH, row_count == 0)
-        has_more = result['has_more']
+    def index(data):
+      if not hasattr(local, 'client'):
+        local.client = SolrClient(self.user)  # One connection pool per thread
+      if not local.client.index(name=collection_or_core_name, data=data, **indexing_options):
+        raise PopupException(_('Could not index the data. Check error logs for more info.'))
 
-        if result['data']:
-          dataset = tablib.Dataset()
-          dataset.append(columns)
-          for i, row in enumerate(result['data']):
-            dataset.append([cell if cell else (0 if isinstance(cell, numbers.Number) else '') for cell in row])
-
-          if not client.index(name=collection_or_core_name, data=dataset.csv, **indexing_options):
-            raise PopupException(_('Could not index the data. Check error logs for more info.'))
+    row_count = 0
+    start_over = True
+    has_more = True
+    truncated = False
+    pending = deque()
 
-        row_count += len(dataset)
+    try:
+      with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='SolrIndexing') as executor:
+        try:
+          while has_more and (not max_rows or row_count < max_rows):
+            result = fetch_handle(batch_size, start_over)
+            start_over = False
+            has_more = result['has_more']
+
+            rows = result['data'][:max_rows - row_count] if max_rows else result['data']
+            truncated = len(rows) < len(result['data']) or (has_more and bool(max_rows) and row_count + len(rows) >= max_rows)
+            if rows:
+              if len(pending) >= workers:
+                pending.popleft().result()
+              pending.append(executor.submit(index, rows_to_csv(columns, rows)))
+              row_count += len(rows)
+
+          while pending:
+            pending.popleft().result()
+        finally:
+          for future in pending:
+            future.cancel()
     except Exception as e:
       raise PopupException(_('Could not update index: %s') % e)
 
-    return row_count
+    return row_count, truncated
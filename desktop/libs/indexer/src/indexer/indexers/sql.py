@@ -14,6 +14,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.import logging
 
+import io
+import os
+import re
 import csv
 import uuid
 import logging
@@ -31,6 +34,7 @@ from desktop.lib import django_mako
 from desktop.lib.exceptions_renderable import PopupException
 from desktop.settings import BASE_DIR
 from hadoop.fs.hadoopfs import Hdfs
+from indexer.conf import LOCAL_FILE_INSERT_BATCH_SIZE, LOCAL_FILE_STAGING_THRESHOLD
 from notebook.connectors.base import get_interpreter
 from notebook.models import make_notebook
 from useradmin.models import User
@@ -49,6 +53,11 @@ except ImportError as e:
   LOG.warning("Impala app is not enabled")
   impala_conf = None
 
+STAGING_CHUNK_SIZE = 8 * 1024 * 1024  # Bytes of a local file copied to the file system at a time
+# Impala does not read CSV files with quoted values, the staged rows are separated by new lines and their values by \001
+IMPALA_STAGED_ROW_FORMAT = "\nROW FORMAT DELIMITED FIELDS TERMINATED BY '\\001' ESCAPED BY '\\\\'\nSTORED AS TEXTFILE"
+IMPALA_STAGED_ESCAPED_RE = re.compile('[\\\\\x01\n]')
+
 
 class SQLIndexer(object):
 
@@ -330,6 +339,9 @@ class SQLIndexer(object):
 
     dialect = get_interpreter(source_type, self.user)['dialect']
 
+    path = urllib_unquote(source['path'])
+    staged = bool(path) and dialect in ('hive', 'impala') and self._should_stage(path)  # Loaded with LOAD DATA
+
     if dialect in ('hive', 'mysql'):
 
       if dialect == 'mysql':
@@ -346,57 +358,37 @@ class SQLIndexer(object):
 
     elif dialect == 'impala':
       sql = '''CREATE TABLE IF NOT EXISTS %(database)s.%(table_name)s_tmp (
-%(columns)s);\n''' % {
+%(columns)s)%(row_format)s;\n''' % {
           'database': database,
           'table_name': table_name,
           'columns': ',\n'.join(['  `%(name)s` string' % col for col in columns]),
+          'row_format': IMPALA_STAGED_ROW_FORMAT if staged else '',
       }                                                 # Impala does not implicitly cast between string and numeric or Boolean types.
 
-    path = urllib_unquote(source['path'])
-
     if path:                                                  # data insertion
-      with open(path, 'r') as local_file:
-        reader = csv.reader(local_file)
-        _csv_rows = []
-
-        for count, row in enumerate(reader):
-          if (source['format']['hasHeader'] and count == 0) or not row:
-            continue
-          for col_index in cols_to_remove:
-            del row[col_index]
-          if dialect == 'impala':                         # for the boolean col updating csv_val to (1,0)
-            row = self.nomalize_booleans(row, columns)
-          _csv_rows.append(tuple(row))
-
-        if _csv_rows:  # sql for data insertion
-          csv_rows = str(_csv_rows)[1:-1]
-
-          if dialect in ('hive', 'mysql'):
-            sql += '''\nINSERT INTO %(database)s.%(table_name)s VALUES %(csv_rows)s;\n''' % {
-              'database': database,
-              'table_name': table_name,
-              'csv_rows': csv_rows
-            }
-          elif dialect == 'impala':
-            sql += '''\nINSERT INTO %(database)s.%(table_name)s_tmp VALUES %(csv_rows)s;\n''' % {
-              'database': database,
-              'table_name': table_name,
-              'csv_rows': csv_rows,
-            }
-
-        if dialect == 'impala':
-          # casting from string to boolean is not allowed in impala so string -> int -> bool
-          sql_ = ',\n'.join([
-            '  CAST ( `%(name)s` AS %(type)s ) `%(name)s`' % col if col['type'] != 'boolean'
-            else '  CAST ( CAST ( `%(name)s` AS TINYINT ) AS boolean ) `%(name)s`' % col for col in columns
-          ])
-
-          sql += '''\nCREATE TABLE IF NOT EXISTS %(database)s.%(table_name)s
+      if staged and dialect == 'hive':
+        sql += self._load_staged_local_file(path, source, database, table_name, columns, cols_to_remove)
+      elif staged:
+        sql += self._load_staged_local_file_rows(path, source, columns, cols_to_remove, database, table_name + '_tmp')
+      else:
+        with open(path, 'r') as local_file:
+          rows = self._iter_local_file_rows(local_file, source, columns, cols_to_remove, dialect)
+          insert_table_name = table_name + '_tmp' if dialect == 'impala' else table_name
+          sql += ''.join(self._iter_insert_statements(database, insert_table_name, rows))
+
+      if dialect == 'impala':
+        # casting from string to boolean is not allowed in impala so string -> int -> bool
+        sql_ = ',\n'.join([
+          '  CAST ( `%(name)s` AS %(type)s ) `%(name)s`' % col if col['type'] != 'boolean'
+          else '  CAST ( CAST ( `%(name)s` AS TINYINT ) AS boolean ) `%(name)s`' % col for col in columns
+        ])
+
+        sql += '''\nCREATE TABLE IF NOT EXISTS %(database)s.%(table_name)s
 AS SELECT\n%(sql_)s\nFROM  %(database)s.%(table_name)s_tmp;\n\nDROP TABLE IF EXISTS %(database)s.%(table_name)s_tmp;''' % {
-              'database': database,
-              'table_name': table_name,
-              'sql_': sql_
-            }
+            'database': database,
+            'table_name': table_name,
+            'sql_': sql_
+          }
 
     on_success_url = reverse('metastore:describe_table', kwargs={'database': database, 'table': final_table_name}) + \
         '?source_type=' + source_type
@@ -412,6 +404,158 @@ AS SELECT\n%(sql_)s\nFROM  %(database)s.%(table_name)s_tmp;\n\nDROP TABLE IF EXI
         is_task=True
     )
 
+  def _iter_local_file_rows(self, local_file, source, columns, cols_to_remove, dialect):
+    for count, row in enumerate(csv.reader(local_file)):
+      if (source['format']['hasHeader'] and count == 0) or not row:
+        continue
+      for col_index in cols_to_remove:
+        del row[col_index]
+      if dialect == 'impala':                         # for the boolean col updating csv_val to (1,0)
+        row = self.nomalize_booleans(row, columns)
+      yield row
+
+  def _iter_insert_statements(self, database, table_name, rows):
+    """
+    Yields INSERT statements of at most LOCAL_FILE_INSERT_BATCH_SIZE rows, so that a large file does not become one huge
+    statement.
+    """
+    batch_size = LOCAL_FILE_INSERT_BATCH_SIZE.get()
+    values = []
+
+    for row in rows:
+      values.append('(%s)' % ', '.join(repr(value) for value in row))
+      if len(values) >= batch_size:
+        yield self._get_insert_statement(database, table_name, values)
+        values = []
+
+    if values:
+      yield self._get_insert_statement(database, table_name, values)
+
+  def _get_insert_statement(self, database, table_name, values):
+    return '''\nINSERT INTO %(database)s.%(table_name)s VALUES %(csv_rows)s;\n''' % {
+      'database': database,
+      'table_name': table_name,
+      'csv_rows': ', '.join(values)
+    }
+
+  def _should_stage(self, path):
+    threshold = LOCAL_FILE_STAGING_THRESHOLD.get()
+    return self.fs is not None and threshold > 0 and os.path.getsize(path) >= threshold
+
+  def _stage_local_file_rows(self, path, source, columns, cols_to_remove, dialect):
+    """
+    Copies the rows of the local file, as read by the INSERT statements, chunk by chunk into a unique scratch directory of the
+    home of the user and returns its path.
+    """
+    with open(path, 'r') as local_file:
+      rows = self._iter_local_file_rows(local_file, source, columns, cols_to_remove, dialect)
+      lines = self._iter_delimited_lines(rows) if dialect == 'impala' else self._iter_csv_lines(rows)
+      return self._stage_chunks(os.path.basename(path), self._iter_chunks(lines))
+
+  def _stage_chunks(self, name, chunks):
+    """
+    Writes the chunks of bytes one at a time into the file name of a unique scratch directory of the home of the user and returns
+    its path.
+    """
+    user_scratch_dir = self.fs.get_home_dir() + '/.scratchdir/%s' % str(uuid.uuid4())  # Make sure it's unique.
+    self.fs.do_as_user(self.user, self.fs.mkdir, user_scratch_dir, 0o0777)
+    staged_path = user_scratch_dir + '/' + name
+
+    self.fs.do_as_user(self.user, self.fs.create, staged_path, overwrite=True, data=next(chunks, b''))
+    for data in chunks:
+      self.fs.do_as_user(self.user, self.fs.append, staged_path, data)
+
+    return staged_path
+
+  def _iter_chunks(self, lines):
+    """
+    Yields the lines encoded in UTF-8 by chunks of about STAGING_CHUNK_SIZE bytes.
+    """
+    chunk = []
+    size = 0
+
+    for line in lines:
+      data = line.encode('utf-8')
+      chunk.append(data)
+      size += len(data)
+      if size >= STAGING_CHUNK_SIZE:
+        yield b''.join(chunk)
+        chunk = []
+        size = 0
+
+    if chunk:
+      yield b''.join(chunk)
+
+  def _iter_delimited_lines(self, rows):
+    """
+    Yields the rows in the IMPALA_STAGED_ROW_FORMAT.
+    """
+    for row in rows:
+      yield '\x01'.join(IMPALA_STAGED_ESCAPED_RE.sub(r'\\\g<0>', value) for value in row) + '\n'
+
+  def _iter_csv_lines(self, rows):
+    """
+    Yields the rows in the CSV format read by the OpenCSVSerde by default, i.e. quoted with the quotes and backslashes escaped by a
+    backslash.
+    """
+    line = io.StringIO()
+    writer = csv.writer(line, doublequote=False, escapechar='\\', quoting=csv.QUOTE_ALL, lineterminator='\n')
+
+    for row in rows:
+      writer.writerow(row)
+      yield line.getvalue()
+      line.seek(0)
+      line.truncate()
+
+  def _load_staged_local_file_rows(self, path, source, columns, cols_to_remove, database, table_name):
+    """
+    Returns the statement loading the rows of a local file, staged on the file system in the IMPALA_STAGED_ROW_FORMAT, into a
+    table of strings.
+    """
+    staged_path = self._stage_local_file_rows(path, source, columns, cols_to_remove, 'impala')
+
+    form_data = {'path': staged_path, 'overwrite': False, 'partition_columns': []}
+    query_server_config = dbms.get_query_server_config(name=source['sourceType'])
+    db = dbms.get(self.user, query_server=query_server_config)
+    return '\n%s;\n' % db.load_data(database, table_name, form_data, None, generate_ddl_only=True)
+
+  def _load_staged_local_file(self, path, source, database, table_name, columns, cols_to_remove):
+    """
+    Returns the statements loading the rows of a local file staged on the file system into a temporary CSV table, then inserting
+    them into the table.
+    """
+    staged_path = self._stage_local_file_rows(path, source, columns, cols_to_remove, 'hive')
+    tmp_table_name = 'hue__tmp_%s' % table_name
+
+    tbl_properties = OrderedDict()
+    tbl_properties['transactional'] = 'false'
+
+    sql = '''\nCREATE TABLE IF NOT EXISTS %(database)s.%(tmp_table_name)s (
+%(columns)s)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.OpenCSVSerde'
+STORED AS TextFile
+TBLPROPERTIES(%(tbl_properties)s);\n''' % {
+      'database': database,
+      'tmp_table_name': tmp_table_name,
+      'columns': ',\n'.join(['  `%(name)s` string' % col for col in columns]),
+      'tbl_properties': ', '.join("'%s'='%s'" % item for item in tbl_properties.items()),
+    }
+
+    form_data = {'path': staged_path, 'overwrite': False, 'partition_columns': []}
+    query_server_config = dbms.get_query_server_config(name=source['sourceType'])
+    db = dbms.get(self.user, query_server=query_server_config)
+    sql += '\n%s;\n' % db.load_data(database, tmp_table_name, form_data, None, generate_ddl_only=True)
+
+    sql += '''\nINSERT INTO %(database)s.%(table_name)s SELECT\n%(columns)s\nFROM %(database)s.%(tmp_table_name)s;\n
+DROP TABLE IF EXISTS %(database)s.%(tmp_table_name)s;\n''' % {
+      'database': database,
+      'table_name': table_name,
+      'tmp_table_name': tmp_table_name,
+      'columns': ',\n'.join(['  CAST ( `%(name)s` AS %(type)s ) `%(name)s`' % col for col in columns]),
+    }
+
+    return sql
+
 
 def _create_database(request, source, destination, start_time):
   database = destination['name']
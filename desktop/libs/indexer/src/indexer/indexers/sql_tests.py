@@ -26,6 +26,7 @@ from azure.conf import ABFS_CLUSTERS
 from beeswax.server import dbms
 from desktop.lib.django_test_util import make_logged_in_client
 from desktop.settings import BASE_DIR
+from indexer.conf import LOCAL_FILE_INSERT_BATCH_SIZE, LOCAL_FILE_STAGING_THRESHOLD
 from indexer.indexers.sql import SQLIndexer
 from useradmin.models import User
 
@@ -2351,6 +2352,157 @@ CREATE TABLE IF NOT EXISTS default.test1 (
     assert statement == sql
 
 
+def test_create_table_from_local_mysql_batches():
+  with patch('indexer.indexers.sql.get_interpreter') as get_interpreter:
+    get_interpreter.return_value = {'Name': 'MySQL', 'dialect': 'mysql'}
+    source = {'path': BASE_DIR + '/apps/beeswax/data/tables/us_population.csv', 'sourceType': 'mysql', 'format': {'hasHeader': False}}
+    destination = {
+      'name': 'default.test1',
+      'columns': [
+        {'name': 'field_1', 'type': 'string', 'keep': True},
+        {'name': 'field_2', 'type': 'string', 'keep': False},
+        {'name': 'field_3', 'type': 'bigint', 'keep': True},
+      ],
+      'sourceType': 'mysql',
+    }
+    finish = LOCAL_FILE_INSERT_BATCH_SIZE.set_for_testing(4)
+    try:
+      sql = SQLIndexer(user=Mock(), fs=Mock()).create_table_from_local_file(source, destination).get_str()
+    finally:
+      finish()
+
+    statement = '''USE default;
+
+CREATE TABLE IF NOT EXISTS default.test1 (
+  `field_1` VARCHAR(255),
+  `field_3` bigint);
+
+INSERT INTO default.test1 VALUES ('NY', '8143197'), ('CA', '3844829'), ('IL', '2842518'), ('TX', '2016582');
+
+INSERT INTO default.test1 VALUES ('PA', '1463281'), ('AZ', '1461575'), ('TX', '1256509'), ('CA', '1255540');
+
+INSERT INTO default.test1 VALUES ('TX', '1213825'), ('CA', '912332');'''
+
+    assert statement == sql
+
+
+def test_create_table_from_local_hive_staged(tmp_path):
+  path = tmp_path / 'test.csv'
+  path.write_text('field_1,field_2,field_3\nNY,New York,8143197\n\n"Smith ""J"", \\ Co",other,1\nCA,Los Angeles,3844829\n')
+
+  with patch('indexer.indexers.sql.get_interpreter') as get_interpreter:
+    get_interpreter.return_value = {'Name': 'Hive', 'dialect': 'hive'}
+    source = {'path': str(path), 'sourceType': 'hive', 'format': {'hasHeader': True}}
+    destination = {
+      'name': 'default.test1',
+      'columns': [
+        {'name': 'field_1', 'type': 'string', 'keep': True},
+        {'name': 'field_2', 'type': 'string', 'keep': False},
+        {'name': 'field_3', 'type': 'bigint', 'keep': True},
+      ],
+      'sourceType': 'hive',
+    }
+    fs = Mock(do_as_user=lambda user, fn, *args, **kwargs: fn(*args, **kwargs))
+    fs.get_home_dir.return_value = '/user/test'
+
+    finish = LOCAL_FILE_STAGING_THRESHOLD.set_for_testing(1)
+    try:
+      with patch('indexer.indexers.sql.STAGING_CHUNK_SIZE', 10), patch('indexer.indexers.sql.dbms') as dbms:
+        dbms.get.return_value.load_data.return_value = "LOAD DATA INPATH '/user/test/staged.csv' INTO TABLE `default`.`hue__tmp_test1`"
+        sql = SQLIndexer(user=Mock(), fs=fs).create_table_from_local_file(source, destination).get_str()
+    finally:
+      finish()
+
+    staged_path = fs.create.call_args[0][0]
+    assert staged_path.startswith('/user/test/.scratchdir/') and staged_path.endswith('/test.csv')
+    # Same rows as the INSERT statements, without the header, the blank lines and the removed columns
+    assert b'"NY","8143197"\n"Smith \\"J\\", \\\\ Co","1"\n"CA","3844829"\n' == (
+      fs.create.call_args[1]['data'] + b''.join(call[0][1] for call in fs.append.call_args_list)
+    )
+    assert 1 < fs.append.call_count
+    assert staged_path == dbms.get.return_value.load_data.call_args[0][2]['path']
+
+    statement = '''USE default;
+
+CREATE TABLE IF NOT EXISTS default.test1 (
+  `field_1` string,
+  `field_3` bigint);
+
+CREATE TABLE IF NOT EXISTS default.hue__tmp_test1 (
+  `field_1` string,
+  `field_3` string)
+ROW FORMAT SERDE 'org.apache.hadoop.hive.serde2.OpenCSVSerde'
+STORED AS TextFile
+TBLPROPERTIES('transactional'='false');
+
+LOAD DATA INPATH '/user/test/staged.csv' INTO TABLE `default`.`hue__tmp_test1`;
+
+INSERT INTO default.test1 SELECT
+  CAST ( `field_1` AS string ) `field_1`,
+  CAST ( `field_3` AS bigint ) `field_3`
+FROM default.hue__tmp_test1;
+
+DROP TABLE IF EXISTS default.hue__tmp_test1;'''
+
+    assert statement == sql
+
+
+def test_create_table_from_local_impala_staged(tmp_path):
+  path = tmp_path / 'test.csv'
+  path.write_text('name,comment,active\n"Smith, J","multi\nline \\ comment",true\nDoe,,F\n')
+
+  with patch('indexer.indexers.sql.get_interpreter') as get_interpreter:
+    get_interpreter.return_value = {'Name': 'Impala', 'dialect': 'impala'}
+    source = {'path': str(path), 'sourceType': 'impala', 'format': {'hasHeader': True}}
+    destination = {
+      'name': 'default.test1',
+      'columns': [
+        {'name': 'name', 'type': 'string', 'keep': True},
+        {'name': 'comment', 'type': 'string', 'keep': True},
+        {'name': 'active', 'type': 'boolean', 'keep': True},
+      ],
+      'sourceType': 'impala',
+    }
+    fs = Mock(do_as_user=lambda user, fn, *args, **kwargs: fn(*args, **kwargs))
+    fs.get_home_dir.return_value = '/user/test'
+
+    finish = LOCAL_FILE_STAGING_THRESHOLD.set_for_testing(1)
+    try:
+      with patch('indexer.indexers.sql.dbms') as dbms:
+        dbms.get.return_value.load_data.return_value = "LOAD DATA INPATH '/user/test/staged.csv' INTO TABLE `default`.`test1_tmp`"
+        sql = SQLIndexer(user=Mock(), fs=fs).create_table_from_local_file(source, destination).get_str()
+    finally:
+      finish()
+
+    staged_path = fs.create.call_args[0][0]
+    assert staged_path.startswith('/user/test/.scratchdir/') and staged_path.endswith('/test.csv')
+    assert b'Smith, J\x01multi\\\nline \\\\ comment\x011\nDoe\x01\x010\n' == fs.create.call_args[1]['data']
+    assert staged_path == dbms.get.return_value.load_data.call_args[0][2]['path']
+    assert 'test1_tmp' == dbms.get.return_value.load_data.call_args[0][1]
+
+    statement = '''USE default;
+
+CREATE TABLE IF NOT EXISTS default.test1_tmp (
+  `name` string,
+  `comment` string,
+  `active` string)
+ROW FORMAT DELIMITED FIELDS TERMINATED BY '\\001' ESCAPED BY '\\\\'
+STORED AS TEXTFILE;
+
+LOAD DATA INPATH '/user/test/staged.csv' INTO TABLE `default`.`test1_tmp`;
+
+CREATE TABLE IF NOT EXISTS default.test1
+AS SELECT
+  CAST ( `name` AS string ) `name`,
+  CAST ( `comment` AS string ) `comment`,
+  CAST ( CAST ( `active` AS TINYINT ) AS boolean ) `active`
+FROM  default.test1_tmp;
+
+DROP TABLE IF EXISTS default.test1_tmp;'''
+
+    assert statement == sql
+
+
 @pytest.mark.django_db
 def test_create_table_with_manual_steps():
   with patch('indexer.indexers.sql.get_interpreter') as get_interpreter:
@@ -17,6 +17,7 @@
 
 import sys
 import json
+import threading
 from builtins import object
 from unittest.mock import Mock, patch
 
@@ -24,9 +25,10 @@ import pytest
 from django.urls import reverse
 
 from desktop.lib.django_test_util import make_logged_in_client
+from desktop.lib.exceptions_renderable import PopupException
 from desktop.lib.test_utils import add_to_group, grant_access
 from hadoop.pseudo_hdfs4 import get_db_prefix, is_live_cluster
-from indexer.conf import get_solr_ensemble
+from indexer.conf import QUERY_INDEXING_BATCH_SIZE, QUERY_INDEXING_MAX_ROWS, QUERY_INDEXING_WORKERS, get_solr_ensemble
 from indexer.controller import CollectionManagerController
 from libsolr import conf as libsolr_conf
 from libzookeeper import conf as libzookeeper_conf
@@ -73,6 +75,88 @@ class TestImporter(object):
       assert b"{'value': 'file', 'name': 'Remote File'}" not in resp.content
 
 
+class TestUpdateDataFromHive(object):
+
+  def setup_method(self):
+    self.resets = [
+      QUERY_INDEXING_BATCH_SIZE.set_for_testing(2),
+      QUERY_INDEXING_WORKERS.set_for_testing(2),
+    ]
+    self.indexed = []
+    self.lock = threading.Lock()
+
+  def teardown_method(self):
+    for reset in self.resets:
+      reset()
+
+  def _fetch_handle(self, rows):
+    fetches = []
+
+    def fetch_handle(batch_size, start_over):
+      offset = 0 if start_over else fetches[-1]
+      fetches.append(offset + batch_size)
+      return {'data': rows[offset:offset + batch_size], 'has_more': offset + batch_size < len(rows)}
+
+    return fetch_handle
+
+  def _index(self, name, data, **kwargs):
+    with self.lock:
+      self.indexed.append(data)
+    return {'responseHeader': {'status': 0}}
+
+  def test_update_data_from_hive(self):
+    rows = [[i, 'name %d' % i, None if i % 2 else 'a, "b"'] for i in range(5)]
+
+    with patch('indexer.controller.SolrClient') as SolrClient:
+      SolrClient.return_value.index.side_effect = self._index
+
+      row_count, truncated = CollectionManagerController(Mock()).update_data_from_hive(
+        'logs', ['id', 'name', 'note'], self._fetch_handle(rows)
+      )
+
+    assert 5 == row_count
+    assert not truncated
+    assert 3 == len(self.indexed)
+    assert (
+      'id,name,note\r\n'
+      '0,name 0,"a, ""b"""\r\n'
+      '1,name 1,\r\n'
+    ) == sorted(self.indexed)[0]
+    assert ['4,name 4,"a, ""b"""'] == [line for data in self.indexed for line in data.splitlines() if line.startswith('4,')]
+
+  def test_update_data_from_hive_max_rows(self):
+    self.resets.append(QUERY_INDEXING_MAX_ROWS.set_for_testing(3))
+    rows = [[i] for i in range(10)]
+
+    with patch('indexer.controller.SolrClient') as SolrClient:
+      SolrClient.return_value.index.side_effect = self._index
+
+      row_count, truncated = CollectionManagerController(Mock()).update_data_from_hive('logs', ['id'], self._fetch_handle(rows))
+
+    assert 3 == row_count
+    assert truncated
+    assert ['0', '1', '2'] == sorted(line for data in self.indexed for line in data.splitlines() if line != 'id')
+
+  def test_update_data_from_hive_max_rows_not_reached(self):
+    self.resets.append(QUERY_INDEXING_MAX_ROWS.set_for_testing(4))
+    rows = [[i] for i in range(4)]  # Exactly the maximum number of rows
+
+    with patch('indexer.controller.SolrClient') as SolrClient:
+      SolrClient.return_value.index.side_effect = self._index
+
+      row_count, truncated = CollectionManagerController(Mock()).update_data_from_hive('logs', ['id'], self._fetch_handle(rows))
+
+    assert 4 == row_count
+    assert not truncated
+
+  def test_update_data_from_hive_error(self):
+    with patch('indexer.controller.SolrClient') as SolrClient:
+      SolrClient.return_value.index.return_value = None
+
+      with pytest.raises(PopupException):
+        CollectionManagerController(Mock()).update_data_from_hive('logs', ['id'], self._fetch_handle([[i] for i in range(10)]))
+
+
 class TestIndexerWithSolr(object):
 
   @classmethod
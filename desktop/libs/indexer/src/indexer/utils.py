@@ -22,6 +22,7 @@ import csv
 import uuid
 import shutil
 import logging
+import numbers
 import tempfile
 from io import StringIO as string_io
 
@@ -325,6 +326,17 @@ def field_values_from_separated_file(fh, delimiter, quote_character, fields=None
       yield row
 
 
+def rows_to_csv(columns, rows):
+  """
+  CSV with a header of the rows of a query result, as expected by the Solr CSV update handler. Empty cells are blank, or 0 if numeric.
+  """
+  output = string_io()
+  writer = csv.writer(output)
+  writer.writerow(columns)
+  writer.writerows([cell if cell else (0 if isinstance(cell, numbers.Number) else '') for cell in row] for row in rows)
+  return output.getvalue()
+
+
 def field_values_from_log(fh, fields=[{'name': 'message', 'type': 'text_general'}, {'name': 'tdate', 'type': 'timestamp'}]):
   """
   Only timestamp and message
@@ -68,6 +68,16 @@ USE_LIBPATH_FOR_JARS = Config(
   type=coerce_bool
 )
 
+DEPLOYMENT_CACHE_TIMEOUT = Config(
+  key="deployment_cache_timeout",
+  help=_t(
+    "Number of seconds the files and directories deployed by the submissions are remembered, so that the next submissions"
+    " of a job do not write again the ones which did not change. 0 disables it."
+  ),
+  default=86400,
+  type=int
+)
+
 
 def get_oozie_status(user):
   from liboozie.oozie_api import get_oozie
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Deployment cache of the submissions.
+
+Coordinators running every hour would otherwise write again their workflow.xml and copy again the same jars into their
+workspace at each submission. The cache remembers the digest of the content of the files written by the submissions and the
+identity, i.e. size, modification time and id, of the files they left, so that an unchanged file only costs a stats call.
+Likewise, an existing directory is only created and given its permissions again if it was not by a submission.
+"""
+
+import hashlib
+import logging
+
+from django.core.cache import cache
+
+from liboozie.conf import DEPLOYMENT_CACHE_TIMEOUT
+
+LOG = logging.getLogger()
+
+CACHE_KEY_PREFIX = 'liboozie.deployment'
+
+
+def get_digest(data):
+  return hashlib.sha256(data).hexdigest()
+
+
+def get_identity(stats):
+  """
+  Returns what changes when a file is written again, or None if it does not exist.
+  """
+  if stats is None:
+    return None
+  return [stats.size, stats.mtime, getattr(stats, 'fileId', None)]
+
+
+class DeploymentCache(object):
+
+  def __init__(self, fs, timeout=None):
+    self.fs = fs
+    self.timeout = DEPLOYMENT_CACHE_TIMEOUT.get() if timeout is None else timeout
+
+  @property
+  def enabled(self):
+    return self.timeout > 0
+
+  def stats(self, path):
+    """
+    Returns the stats of the path or None if it cannot be read, in which case it is written again.
+    """
+    try:
+      return self.fs.stats(path)
+    except IOError:
+      return None
+
+  def is_file_current(self, path, digest):
+    """
+    Whether the file was written by a submission with the content of this digest and was not modified since.
+    """
+    if not self.enabled:
+      return False
+    entry = cache.get(self._get_key('file', path))
+    if entry is None or entry['digest'] != digest:
+      return False
+    stats = self.stats(path)
+    return stats is not None and entry['identity'] == get_identity(stats)
+
+  def set_file(self, path, digest):
+    if self.enabled:
+      self._set('file', path, {'digest': digest, 'identity': get_identity(self.stats(path))})
+
+  def is_copy_current(self, src, src_stats, dst, dst_stats):
+    """
+    Whether dst is a copy of src which was not modified since, either made by a submission or, according to the checksums of
+    the file system, with the same content.
+    """
+    if not self.enabled or src_stats is None or dst_stats is None:
+      return False
+
+    entry = cache.get(self._get_key('copy', dst))
+    if entry is not None and entry == self._get_copy_entry(src, src_stats, dst_stats):
+      return True
+
+    if src_stats.size == dst_stats.size:
+      src_checksum = self._get_checksum(src)
+      if src_checksum is not None and src_checksum == self._get_checksum(dst):
+        self._set('copy', dst, self._get_copy_entry(src, src_stats, dst_stats))
+        return True
+
+    return False
+
+  def set_copy(self, src, src_stats, dst):
+    if self.enabled:
+      self._set('copy', dst, self._get_copy_entry(src, src_stats, self.stats(dst)))
+
+  def is_directory_created(self, path, perms=None):
+    """
+    Whether the directory was created or given these permissions by a submission and still exists, i.e. was not deleted or
+    created again since.
+    """
+    if not self.enabled:
+      return False
+    entry = cache.get(self._get_key('directory', path))
+    if entry is None or entry['perms'] != perms:
+      return False
+    stats = self.stats(path)
+    return stats is not None and stats.isDir and entry['id'] == getattr(stats, 'fileId', None)
+
+  def set_directory(self, path, perms=None):
+    if self.enabled:
+      stats = self.stats(path)
+      self._set('directory', path, {'perms': perms, 'id': getattr(stats, 'fileId', None) if stats is not None else None})
+
+  def _get_copy_entry(self, src, src_stats, dst_stats):
+    return {'source': src, 'source_identity': get_identity(src_stats), 'identity': get_identity(dst_stats)}
+
+  def _get_checksum(self, path):
+    try:
+      return self.fs.get_file_checksum(path)
+    except Exception as e:  # e.g. file systems without checksums, like S3
+      LOG.debug('Failed to get the checksum of %s: %s' % (path, e))
+      return None
+
+  def _get_key(self, kind, path):
+    return '%s.%s.%s' % (CACHE_KEY_PREFIX, kind, hashlib.sha1(path.encode('utf-8')).hexdigest())
+
+  def _set(self, kind, path, entry):
+    cache.set(self._get_key(kind, path), entry, self.timeout)
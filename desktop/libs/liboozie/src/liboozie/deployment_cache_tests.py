@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import errno
+from unittest.mock import patch
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from liboozie.deployment_cache import DeploymentCache, get_digest
+
+
+class MockStats(object):
+  def __init__(self, size, mtime, fileId, isDir=False):
+    self.size = size
+    self.mtime = mtime
+    self.fileId = fileId
+    self.isDir = isDir
+
+
+class MockFs(object):
+  def __init__(self):
+    self.files = {}
+    self.checksums = {}
+    self.next_id = 0
+
+  def write(self, path, data, mtime=1):
+    self.next_id += 1
+    self.files[path] = MockStats(len(data), mtime, self.next_id)
+    self.checksums[path] = {'algorithm': 'MD5-of-0MD5-of-512CRC32C', 'bytes': get_digest(data), 'length': 28}
+
+  def mkdir(self, path):
+    self.next_id += 1
+    self.files[path] = MockStats(0, 1, self.next_id, isDir=True)
+
+  def stats(self, path):
+    if path not in self.files:
+      raise IOError(errno.ENOENT, 'File %s not found' % path)
+    return self.files[path]
+
+  def get_file_checksum(self, path):
+    return self.checksums[path]
+
+
+class TestDeploymentCache(object):
+
+  def setup_method(self):
+    self.fs = MockFs()
+    self.deployment_cache = DeploymentCache(self.fs, timeout=60)
+    self.cache_patcher = patch('liboozie.deployment_cache.cache', LocMemCache('liboozie-deployment-cache-tests', {}))
+    self.cache_patcher.start()
+
+  def teardown_method(self):
+    self.cache_patcher.stop()
+
+  def test_file(self):
+    path = '/user/test/workspace/workflow.xml'
+    digest = get_digest(b'<workflow-app/>')
+    assert not self.deployment_cache.is_file_current(path, digest)
+
+    self.fs.write(path, b'<workflow-app/>')
+    self.deployment_cache.set_file(path, digest)
+    assert self.deployment_cache.is_file_current(path, digest)
+    assert not self.deployment_cache.is_file_current(path, get_digest(b'<workflow-app name="changed"/>'))
+
+    self.fs.write(path, b'<workflow-app/>', mtime=2)  # Modified outside of the submissions
+    assert not self.deployment_cache.is_file_current(path, digest)
+
+    del self.fs.files[path]
+    assert not self.deployment_cache.is_file_current(path, digest)
+
+  def test_copy(self):
+    src, dst = '/user/test/udf.jar', '/user/test/workspace/lib/udf.jar'
+    self.fs.write(src, b'jar')
+    self.fs.write(dst, b'jar')
+    del self.fs.checksums[dst]  # e.g. S3
+    assert not self.deployment_cache.is_copy_current(src, self.fs.stats(src), dst, self.fs.stats(dst))
+
+    self.deployment_cache.set_copy(src, self.fs.stats(src), dst)
+    assert self.deployment_cache.is_copy_current(src, self.fs.stats(src), dst, self.fs.stats(dst))
+    assert not self.deployment_cache.is_copy_current('/user/test/other/udf.jar', self.fs.stats(src), dst, self.fs.stats(dst))
+
+    self.fs.write(src, b'new jar', mtime=2)
+    assert not self.deployment_cache.is_copy_current(src, self.fs.stats(src), dst, self.fs.stats(dst))
+
+  def test_copy_same_checksum(self):
+    src, dst = '/user/test/udf.jar', '/user/test/workspace/lib/udf.jar'
+    self.fs.write(src, b'jar')
+    self.fs.write(dst, b'jar', mtime=2)  # Copied by another server
+    assert self.deployment_cache.is_copy_current(src, self.fs.stats(src), dst, self.fs.stats(dst))
+
+    self.fs.write(dst, b'JAR', mtime=3)
+    assert not self.deployment_cache.is_copy_current(src, self.fs.stats(src), dst, self.fs.stats(dst))
+
+  def test_directory(self):
+    path = '/user/test/workspace'
+    assert not self.deployment_cache.is_directory_created(path)
+
+    self.fs.mkdir(path)
+    self.deployment_cache.set_directory(path)
+    assert self.deployment_cache.is_directory_created(path)
+    assert not self.deployment_cache.is_directory_created(path, 0o1777)
+
+    del self.fs.files[path]  # Deleted outside of the submissions
+    assert not self.deployment_cache.is_directory_created(path)
+
+    self.fs.mkdir(path)  # Created again, maybe with other permissions
+    assert not self.deployment_cache.is_directory_created(path)
+
+  def test_disabled(self):
+    deployment_cache = DeploymentCache(self.fs, timeout=0)
+    path = '/user/test/workspace/workflow.xml'
+    self.fs.write(path, b'<workflow-app/>')
+
+    deployment_cache.set_file(path, get_digest(b'<workflow-app/>'))
+    assert not deployment_cache.is_file_current(path, get_digest(b'<workflow-app/>'))
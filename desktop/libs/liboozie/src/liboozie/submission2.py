@@ -21,6 +21,8 @@ import time
 import errno
 import logging
 from builtins import object
+from collections import OrderedDict
+from contextlib import contextmanager
 from string import Template
 
 from django.utils.functional import wraps
@@ -37,6 +39,7 @@ from hadoop.fs.hadoopfs import Hdfs
 from indexer.conf import CONFIG_JDBC_LIBS_PATH
 from liboozie.conf import REMOTE_DEPLOYMENT_DIR, USE_LIBPATH_FOR_JARS
 from liboozie.credentials import Credentials
+from liboozie.deployment_cache import DeploymentCache, get_digest
 from liboozie.oozie_api import get_oozie
 from metadata.conf import ALTUS
 from oozie.utils import convert_to_server_timezone
@@ -79,6 +82,8 @@ class Submission(object):
     self.jt = jt  # Deprecated with YARN, we now use logical names only for RM
     self.oozie_id = oozie_id
     self.api = get_oozie(self.user)
+    self.deployment_cache = DeploymentCache(fs)
+    self.deploy_timings = OrderedDict()  # Seconds spent in each phase of the last deploy()
 
     if properties is not None:
       self.properties = properties
@@ -185,18 +190,48 @@ class Submission(object):
     return self.oozie_id
 
   def deploy(self, deployment_dir=None):
+    self.deploy_timings = OrderedDict()
+
     try:
       if not deployment_dir:
-        deployment_dir = self._create_deployment_dir()
+        with self._time_deploy_phase('directory'):
+          deployment_dir = self._create_deployment_dir()
     except Exception as ex:
       msg = _("Failed to create deployment directory: %s" % ex)
       LOG.exception(msg)
       raise PopupException(message=msg, detail=str(ex))
 
     if self.api.security_enabled:
-      jt_address = cluster.get_cluster_addr_for_job_submission()
-      self._update_properties(jt_address)  # Needed for coordinator deploying workflows with credentials
+      with self._time_deploy_phase('credentials'):
+        jt_address = cluster.get_cluster_addr_for_job_submission()
+        self._update_properties(jt_address)  # Needed for coordinator deploying workflows with credentials
+
+    with self._time_deploy_phase('actions'):
+      self._deploy_actions(deployment_dir)
+
+    with self._time_deploy_phase('xml'):
+      oozie_xml = self.job.to_xml(self.properties)
+    with self._time_deploy_phase('files'):
+      self._do_as(self.user.username, self._copy_files, deployment_dir, oozie_xml, self.properties)
+
+    LOG.info("Deployed %s in %s: %s" % (
+      self, deployment_dir, ', '.join('%s=%.3fs' % (phase, elapsed) for phase, elapsed in self.deploy_timings.items())
+    ))
+
+    return deployment_dir
+
+  @contextmanager
+  def _time_deploy_phase(self, phase):
+    start = time.time()
+    try:
+      yield
+    finally:
+      self.deploy_timings[phase] = self.deploy_timings.get(phase, 0) + time.time() - start
 
+  def _deploy_actions(self, deployment_dir):
+    """
+    Deploy the sub-workflows and the scripts of the actions.
+    """
     if hasattr(self.job, 'nodes'):
       for action in self.job.nodes:
         # Make sure XML is there
@@ -382,11 +417,6 @@ STORED AS TEXTFILE %s""" % (self.properties.get('send_result_path'),
                 paths.append(self.properties['oozie.libpath'])
               self.properties['oozie.libpath'] = ','.join(paths)
 
-    oozie_xml = self.job.to_xml(self.properties)
-    self._do_as(self.user.username, self._copy_files, deployment_dir, oozie_xml, self.properties)
-
-    return deployment_dir
-
   def _check_sqoop_statement(self, action):
     statement = ''
     if action.data['type'] == 'sqoop' and 'command' in action.data['properties']:  # Sqoop Workflow
@@ -513,6 +543,10 @@ STORED AS TEXTFILE %s""" % (self.properties.get('send_result_path'),
     """
     Return the directory in HDFS, creating it if necessary.
     """
+    if self.deployment_cache.is_directory_created(path, perms):
+      return path
+
+    exists = True
     try:
       statbuf = self.fs.stats(path)
       if not statbuf.isDir:
@@ -524,13 +558,15 @@ STORED AS TEXTFILE %s""" % (self.properties.get('send_result_path'),
         msg = _("Error accessing directory '%s': %s.") % (path, ex)
         LOG.exception(msg)
         raise IOError(ex.errno, msg)
+      exists = False
 
-    if not self.fs.exists(path):
+    if not exists:
       self._do_as(self.user.username, self.fs.mkdir, path, perms)
 
     if perms is not None:
       self._do_as(self.user.username, self.fs.chmod, path, perms)
 
+    self.deployment_cache.set_directory(path, perms)
     return path
 
   def _copy_files(self, deployment_dir, oozie_xml, oozie_properties):
@@ -575,12 +611,16 @@ STORED AS TEXTFILE %s""" % (self.properties.get('send_result_path'),
           else:
             jar_lib_path = self.fs.join(lib_path, self.fs.basename(jar_file))
           # Refresh if needed
-          if self.fs.exists(jar_lib_path) and self.fs.exists(jar_file):
-            stat_src = self.fs.stats(jar_file)
-            stat_dest = self.fs.stats(jar_lib_path)
+          stat_src = self.deployment_cache.stats(jar_file)
+          stat_dest = self.deployment_cache.stats(jar_lib_path)
+          if self.deployment_cache.is_copy_current(jar_file, stat_src, jar_lib_path, stat_dest):
+            LOG.debug("Unchanged %s" % jar_lib_path)
+            continue
+          if stat_src is not None and stat_dest is not None:
             if hasattr(stat_src, 'fileId') and hasattr(stat_dest, 'fileId') and stat_src.fileId != stat_dest.fileId:
               self.fs.remove(jar_lib_path, skip_trash=True)
           self.fs.copyfile(jar_file, jar_lib_path)
+          self.deployment_cache.set_copy(jar_file, stat_src, jar_lib_path)
 
   def _do_as(self, username, fn, *args, **kwargs):
     prev_user = self.fs.user
@@ -615,10 +655,16 @@ STORED AS TEXTFILE %s""" % (self.properties.get('send_result_path'),
     # We are converting the data into bytes by utf-8 encoding instead of str type.
     data = smart_str(data).encode('utf-8')
 
+    digest = get_digest(data)
+    if self.deployment_cache.is_file_current(file_path, digest):
+      LOG.debug("Unchanged %s" % (file_path,))
+      return
+
     if do_as:
       self.fs.do_as_user(self.user, self.fs.create, file_path, overwrite=True, permission=0o644, data=data)
     else:
       self.fs.create(file_path, overwrite=True, permission=0o644, data=data)
+    self.deployment_cache.set_file(file_path, digest)
     LOG.debug("Created/Updated %s" % (file_path,))
 
   def _generate_altus_action_script(self, service, command, arguments, auth_key_id, auth_key_secret):
@@ -826,14 +872,20 @@ print _exec('%(service)s', 'submitHueQuery', {'clusterCrn': cluster_crn, 'payloa
 
 def create_directories(fs, directory_list=[], remote_deployment_dir=REMOTE_DEPLOYMENT_DIR.get()):
   # If needed, create the remote home, deployment and data directories
-  directories = [remote_deployment_dir] + directory_list
+  deployment_cache = DeploymentCache(fs)
+  directories = [
+    directory for directory in [remote_deployment_dir] + directory_list if not deployment_cache.is_directory_created(directory, 0o1777)
+  ]
+  remote_home_dir = Hdfs.join('/user', fs.DEFAULT_USER)
+  home_created = False
 
   for directory in directories:
     if not fs.do_as_user(fs.DEFAULT_USER, fs.exists, directory):
-      remote_home_dir = Hdfs.join('/user', fs.DEFAULT_USER)
-      if directory.startswith(remote_home_dir):
+      if directory.startswith(remote_home_dir) and not home_created:
         # Home is 755
         fs.do_as_user(fs.DEFAULT_USER, fs.create_home_dir, remote_home_dir)
+        home_created = True
       # Shared by all the users
       fs.do_as_user(fs.DEFAULT_USER, fs.mkdir, directory, 0o1777)
       fs.do_as_user(fs.DEFAULT_USER, fs.chmod, directory, 0o1777)  # To remove after https://issues.apache.org/jira/browse/HDFS-3491
+    deployment_cache.set_directory(directory, 0o1777)
@@ -147,13 +147,21 @@ def test_copy_files():
 
       submission._copy_files('%s/workspace' % prefix, "<xml>My XML</xml>", {'prop1': 'val1'})
 
-      assert stats_udf1['fileId'] != cluster.fs.stats(deployment_dir + '/udf1.jar')['fileId']
-      assert stats_udf2['fileId'] != cluster.fs.stats(deployment_dir + '/udf2.jar')['fileId']
-      assert stats_udf3['fileId'] != cluster.fs.stats(deployment_dir + '/udf3.jar')['fileId']
+      # Unchanged jars are not copied again
+      assert stats_udf1['fileId'] == cluster.fs.stats(deployment_dir + '/udf1.jar')['fileId']
+      assert stats_udf2['fileId'] == cluster.fs.stats(deployment_dir + '/udf2.jar')['fileId']
+      assert stats_udf3['fileId'] == cluster.fs.stats(deployment_dir + '/udf3.jar')['fileId']
       assert stats_udf4['fileId'] == cluster.fs.stats(deployment_dir + '/udf4.jar')['fileId']
-      assert stats_udf5['fileId'] != cluster.fs.stats(deployment_dir + '/udf5.jar')['fileId']
+      assert stats_udf5['fileId'] == cluster.fs.stats(deployment_dir + '/udf5.jar')['fileId']
       assert stats_udf6['fileId'] == cluster.fs.stats(deployment_dir + '/udf6.jar')['fileId']
 
+      cluster.fs.create(jar_1, overwrite=True, data=b'New udf1')
+      submission._copy_files('%s/workspace' % prefix, "<xml>My XML</xml>", {'prop1': 'val1'})
+
+      assert stats_udf1['fileId'] != cluster.fs.stats(deployment_dir + '/udf1.jar')['fileId']
+      assert b'New udf1' == cluster.fs.read(deployment_dir + '/udf1.jar', 0, 100)
+      assert stats_udf2['fileId'] == cluster.fs.stats(deployment_dir + '/udf2.jar')['fileId']
+
     # Test _create_file()
     submission._create_file(deployment_dir, 'test.txt', data='Test data')
     assert cluster.fs.exists(deployment_dir + '/test.txt'), list_dir_workspace
@@ -21,7 +21,6 @@ from urllib.parse import unquote as urllib_unquote
 
 import sqlparse
 import opentracing.tracer
-from django.db.models import Q
 from django.urls import reverse
 from django.utils.translation import gettext as _
 from django.views.decorators.http import require_GET, require_POST
@@ -606,7 +605,7 @@ def get_history(request):
     docs = Document2.objects.get_history(doc_type='query-%s' % doc_type, connector_id=connector_id, user=request.user)
 
   if doc_text:
-    docs = docs.filter(Q(name__icontains=doc_text) | Q(description__icontains=doc_text) | Q(search__icontains=doc_text))
+    docs = docs.search_documents(search_text=doc_text)
 
   # Paginate
   docs = docs.order_by('-last_modified')
@@ -264,6 +264,86 @@ ENABLE_QUERY_ANALYSIS = Config(
   default=False,
 )
 
+ENABLE_RESULT_PREFETCH = Config(
+  key="enable_result_prefetch",
+  help=_t(
+    "Flag to fetch the next batch of query results in the background while the current one is displayed. Only used with a"
+    " single Gunicorn worker, as the batches are buffered in the memory of the worker."
+  ),
+  type=coerce_bool,
+  default=False,
+)
+
+RESULT_PREFETCH_MAX_ROWS = Config(
+  key="result_prefetch_max_rows",
+  help=_t("Maximum number of rows fetched in advance for each query."),
+  type=int,
+  default=1000,
+)
+
+RESULT_PREFETCH_MAX_BYTES = Config(
+  key="result_prefetch_max_bytes",
+  help=_t("No new batch of query results is fetched in advance while the ones already buffered take more than this number of bytes."),
+  type=int,
+  default=64 * 1024 * 1024,
+)
+
+RESULT_PREFETCH_TTL = Config(
+  key="result_prefetch_ttl",
+  help=_t("Seconds after which a batch of query results fetched in advance and not displayed is dropped, e.g. when its tab was closed."),
+  type=int,
+  default=10 * 60,
+)
+
+STATEMENT_EXECUTION_WORKERS = Config(
+  key="statement_execution_workers",
+  help=_t("Number of threads of a Hue process running the statements of the SqlAlchemy interpreters in the background."),
+  type=int,
+  default=10,
+)
+
+STATEMENT_HANDLE_TTL = Config(
+  key="statement_handle_ttl",
+  help=_t("Number of seconds after which a statement of the SqlAlchemy interpreters is closed if its results are not fetched anymore."),
+  type=int,
+  default=3600,
+)
+
+STATEMENT_MAX_HANDLES = Config(
+  key="statement_max_handles",
+  help=_t("Maximum number of open statements of the SqlAlchemy interpreters in a Hue process, the least recently used are closed."),
+  type=int,
+  default=1000,
+)
+
+STATUS_POLL_INITIAL_INTERVAL = Config(
+  key="status_poll_initial_interval",
+  help=_t("Number of seconds between the first status checks of the queries run by the downloads and scheduled tasks."),
+  type=int,
+  default=1,
+)
+
+STATUS_POLL_MAX_INTERVAL = Config(
+  key="status_poll_max_interval",
+  help=_t("Maximum number of seconds between two status checks of a query whose status and logs do not change."),
+  type=int,
+  default=30,
+)
+
+STATUS_POLL_WORKERS = Config(
+  key="status_poll_workers",
+  help=_t("Number of threads of a Hue process checking the status of the queries."),
+  type=int,
+  default=4,
+)
+
+STATUS_POLL_BACKEND_WORKERS = Config(
+  key="status_poll_backend_workers",
+  help=_t("Maximum number of queries of a same backend whose status is checked at the same time by a Hue process."),
+  type=int,
+  default=2,
+)
+
 
 EXAMPLES = ConfigSection(
   key='examples',
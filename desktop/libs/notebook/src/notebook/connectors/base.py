@@ -34,6 +34,7 @@ from desktop.lib.i18n import smart_str
 from metadata.optimizer.base import get_api as get_optimizer_api
 from notebook.conf import get_ordered_interpreters
 from notebook.sql_utils import get_current_statement
+from notebook.status_poller import get_status_poller
 
 LOG = logging.getLogger()
 
@@ -739,31 +740,24 @@ class ExecutionWrapper(object):
     if self.snippet['result']['handle'].get('sync', False):
       return  # Request is already completed
 
-    count = 0
-    sleep_seconds = 1
-    check_status_count = 0
-    get_log_is_full_log = self.api.get_log_is_full_log(self.notebook, self.snippet)
-
-    while True:
-      response = self.api.check_status(self.notebook, self.snippet)
-      if self.callback and hasattr(self.callback, 'on_status'):
-        self.callback.on_status(response['status'])
-      if self.callback and hasattr(self.callback, 'on_log'):
-        log = self.api.get_log(self.notebook, self.snippet, startFrom=count)
-        if get_log_is_full_log:
-          log = log[count:]
-
-        self.callback.on_log(log)
-        count += len(log)
-
-      if response['status'] not in ['waiting', 'running', 'submitted']:
-        break
-      check_status_count += 1
-      if check_status_count > 5:
-        sleep_seconds = 5
-      elif check_status_count > 10:
-        sleep_seconds = 10
-      time.sleep(sleep_seconds)
+    get_log = None
+    if self.callback and hasattr(self.callback, 'on_log'):
+      get_log_is_full_log = self.api.get_log_is_full_log(self.notebook, self.snippet)
+
+      def get_log(start_from):
+        log = self.api.get_log(self.notebook, self.snippet, startFrom=start_from)
+        return log[start_from:] if get_log_is_full_log else log
+
+    get_status_poller().wait(
+      self.snippet.get('type'),
+      self._check_status,
+      get_log=get_log,
+      on_status=self.callback.on_status if self.callback and hasattr(self.callback, 'on_status') else None,
+      on_log=self.callback.on_log if get_log else None
+    )
+
+  def _check_status(self):
+    return self.api.check_status(self.notebook, self.snippet)
 
   def close(self, handle):
     if self.should_close:
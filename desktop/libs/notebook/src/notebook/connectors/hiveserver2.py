@@ -50,6 +50,7 @@ from notebook.connectors.base import (
   get_interpreter,
   patch_snippet_for_connector,
 )
+from notebook.result_prefetch import get_prefetcher
 
 LOG = logging.getLogger()
 
@@ -391,26 +392,33 @@ class HS2Api(Api):
     db = self._get_db(snippet, interpreter=self.interpreter)
 
     handle = self._get_handle(snippet)
-    try:
-      results = db.fetch(handle, start_over=start_over, rows=rows)
-    except QueryServerException as ex:
-      if re.search('(client inactivity)|(Invalid query handle)', str(ex)) and ex.message:
-        raise QueryExpired(message=ex.message)
-      else:
-        raise QueryError(ex)
 
-    # No escaping...
-    return {
-        'has_more': results.has_more,
-        'data': results.rows(),
-        'meta': [{
-            'name': column.name,
-            'type': column.type,
-            'comment': column.comment
-          } for column in results.data_table.cols()
-        ],
-        'type': 'table'
-    }
+    def fetch(rows, start_over):
+      try:
+        results = db.fetch(handle, start_over=start_over, rows=rows)
+      except QueryServerException as ex:
+        if re.search('(client inactivity)|(Invalid query handle)', str(ex)) and ex.message:
+          raise QueryExpired(message=ex.message)
+        else:
+          raise QueryError(ex)
+
+      # No escaping...
+      return {
+          'has_more': results.has_more,
+          'data': results.rows(),
+          'meta': [{
+              'name': column.name,
+              'type': column.type,
+              'comment': column.comment
+            } for column in results.data_table.cols()
+          ],
+          'type': 'table'
+      }
+
+    prefetcher = get_prefetcher()
+    if prefetcher is None:
+      return fetch(rows, start_over)
+    return prefetcher.fetch(self._get_prefetch_key(snippet), fetch, rows, start_over=start_over)
 
   @query_error_handler
   def fetch_result_size(self, notebook, snippet):
@@ -445,6 +453,7 @@ class HS2Api(Api):
     db = self._get_db(snippet, interpreter=self.interpreter)
 
     handle = self._get_handle(snippet)
+    self._drop_prefetch(snippet)
     db.cancel_operation(handle)
     return {'status': 0}
 
@@ -461,6 +470,7 @@ class HS2Api(Api):
 
     try:
       handle = self._get_handle(snippet)
+      self._drop_prefetch(snippet)
       db.close_operation(handle)
     except Exception as e:
       if 'no valid handle' in str(e):
@@ -469,6 +479,14 @@ class HS2Api(Api):
         raise e
     return {'status': 0}
 
+  def _get_prefetch_key(self, snippet):
+    return snippet['result']['handle']['guid']
+
+  def _drop_prefetch(self, snippet):
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+      prefetcher.drop(self._get_prefetch_key(snippet))
+
   def can_start_over(self, notebook, snippet):
     try:
       db = self._get_db(snippet, interpreter=self.interpreter)
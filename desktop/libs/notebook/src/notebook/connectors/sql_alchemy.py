@@ -48,6 +48,9 @@ SqlAlchemy documentation is pretty good: https://docs.sqlalchemy.org/en/13/core/
 Each URL is mapped to one engine and should be created once per process.
 Each query statement grabs a connection from the engine and will return it after its close().
 Disposing the engine closes all its connections.
+
+The statements are executed in the background by the statement handles of the process, which also close the connections
+of the statements not used anymore. Their results are read from server side cursors when the dialect supports them.
 '''
 
 import re
@@ -72,11 +75,16 @@ from desktop.lib.i18n import force_unicode
 from librdbms.server import dbms
 from notebook.connectors.base import Api, AuthenticationRequired, QueryError, QueryExpired, _get_snippet_name
 from notebook.models import escape_rows
+from notebook.result_prefetch import get_prefetcher
+from notebook.statement_handles import StatementHandles, get_statement_handles
 
 ENGINES = {}
-CONNECTIONS = {}
+CONNECTIONS = get_statement_handles()
 ENGINE_KEY = '%(username)s-%(connector_name)s'
 URL_PATTERN = '(?P<driver_name>.+?://)(?P<host>[^:/ ]+):(?P<port>[0-9]*).*'
+# Like the SERVER_SIDE_CURSOR_RE of SQLAlchemy, only the queries are streamed as some drivers cannot run the other statements
+# with a server side cursor, e.g. the named cursors of psycopg2.
+STREAMED_STATEMENT_RE = re.compile(r'\s*(?:SELECT|WITH)\b', re.I | re.UNICODE)
 
 
 LOG = logging.getLogger()
@@ -236,41 +244,30 @@ class SqlAlchemyApi(Api):
     current_statement = self._get_current_statement(notebook, snippet)
     statement = current_statement['statement']
 
+    use_statement = None
     if self.interpreter['dialect_properties'].get('has_use_statement') and snippet.get('database'):
-      connection.execute(
-        'USE %(sql_identifier_quote)s%(database)s%(sql_identifier_quote)s' % {
-          'sql_identifier_quote': self.interpreter['dialect_properties']['sql_identifier_quote'],
-          'database': snippet['database'],
-        }
-      )
-
-    result = connection.execute(statement)
+      use_statement = 'USE %(sql_identifier_quote)s%(database)s%(sql_identifier_quote)s' % {
+        'sql_identifier_quote': self.interpreter['dialect_properties']['sql_identifier_quote'],
+        'database': snippet['database'],
+      }
 
-    logs = [message for message in result.cursor.fetch_logs()] if result.cursor and hasattr(result.cursor, 'fetch_logs') else []
-    cache = {
-      'logs': logs,
+    handle = {
+      'logs': [],
       'connection': connection,
-      'result': result,
-      'meta': [
-        {
-          'name': col[0] if (type(col) is tuple or type(col) is dict) else col.name if hasattr(col, 'name') else col,
-          'type': 'STRING_TYPE',
-          'comment': ''
-        }
-        for col in result.cursor.description
-      ] if result.cursor else []
+      'meta': [],
     }
-    CONNECTIONS[guid] = cache
+    CONNECTIONS.submit(guid, handle, self._execute_statement, connection, statement, use_statement)
 
+    # The statement runs in the background, check_status() tells if it returns rows once it is done
     response = {
       'sync': False,
-      'has_result_set': result.cursor is not None,
+      'has_result_set': True,
       'modified_row_count': 0,
       'guid': guid,
       'result': {
-        'has_more': result.cursor is not None,
+        'has_more': True,
         'data': [],
-        'meta': cache['meta'],
+        'meta': [],
         'type': 'table'
       }
     }
@@ -278,6 +275,29 @@ class SqlAlchemyApi(Api):
 
     return response
 
+  def _execute_statement(self, connection, statement, use_statement=None):
+    if use_statement:
+      connection.execute(use_statement)
+
+    if STREAMED_STATEMENT_RE.match(statement):
+      connection = connection.execution_options(stream_results=True)
+    result = connection.execute(statement)
+
+    logs = [message for message in result.cursor.fetch_logs()] if result.cursor and hasattr(result.cursor, 'fetch_logs') else []
+    return {
+      'logs': logs,
+      'result': result,
+      'has_result_set': result.cursor is not None,
+      'meta': [
+        {
+          'name': col[0] if (type(col) is tuple or type(col) is dict) else col.name if hasattr(col, 'name') else col,
+          'type': 'STRING_TYPE',
+          'comment': ''
+        }
+        for col in result.cursor.description
+      ] if result.cursor else []
+    }
+
   @query_error_handler
   def explain(self, notebook, snippet):
     session = self._get_session(notebook, snippet)
@@ -316,13 +336,23 @@ class SqlAlchemyApi(Api):
     response = {'status': 'canceled'}
 
     if connection:
+      if 'future' in connection:
+        if not connection['future'].done():
+          response['status'] = 'running'
+          return response
+        if connection['future'].exception() is not None:
+          StatementHandles.close(CONNECTIONS.pop(guid, connection))
+          raise connection['future'].exception()
+
+      has_result_set = connection['has_result_set'] if 'has_result_set' in connection else snippet['result']['handle']['has_result_set']
       cursor = connection['result'].cursor
       if (self.options['url'].startswith('presto://') | self.options['url'].startswith('trino://')) and cursor and cursor.poll():
         response['status'] = 'running'
-      elif snippet['result']['handle']['has_result_set']:
+      elif has_result_set:
         response['status'] = 'available'
       else:
         response['status'] = 'success'
+      response['has_result_set'] = has_result_set
     else:
       raise QueryExpired()
 
@@ -337,7 +367,7 @@ class SqlAlchemyApi(Api):
       stats = None
       progress = 100
       try:
-        if handle and handle['result'].cursor:
+        if handle and 'result' in handle and handle['result'].cursor:
           stats = handle['result'].cursor.poll()
       except AssertionError as e:
         LOG.warning('Query probably not running anymore: %s' % e)
@@ -351,19 +381,27 @@ class SqlAlchemyApi(Api):
     guid = snippet['result']['handle']['guid']
     handle = CONNECTIONS.get(guid)
 
-    if handle:
+    if not handle:
+      raise QueryExpired()
+    if 'future' in handle:
+      handle['future'].result()  # Waits for the statement if it is still running
+
+    def fetch(rows, start_over):
       data = handle['result'].fetchmany(rows)
       meta = handle['meta']
       self._assign_types(data, meta)
-    else:
-      raise QueryExpired()
 
-    return {
-      'has_more': data and len(data) >= rows or False,
-      'data': data if data else [],
-      'meta': meta if meta else [],
-      'type': 'table'
-    }
+      return {
+        'has_more': data and len(data) >= rows or False,
+        'data': data if data else [],
+        'meta': meta if meta else [],
+        'type': 'table'
+      }
+
+    prefetcher = get_prefetcher()
+    if prefetcher is None:
+      return fetch(rows, start_over)
+    return prefetcher.fetch(guid, fetch, rows, start_over=start_over)
 
   def _assign_types(self, results, meta):
     result = results and results[0]
@@ -403,10 +441,12 @@ class SqlAlchemyApi(Api):
 
     try:
       guid = snippet['result']['handle']['guid']
-      connection = CONNECTIONS.get(guid)
+      connection = CONNECTIONS.pop(guid, None)
       if connection:
-        connection['connection'].close()
-        del CONNECTIONS[guid]
+        prefetcher = get_prefetcher()
+        if prefetcher is not None:
+          prefetcher.drop(guid)
+        StatementHandles.close(connection)
       result['status'] = 0
     finally:
       return result
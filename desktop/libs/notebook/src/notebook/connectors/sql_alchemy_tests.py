@@ -18,7 +18,9 @@
 
 import sys
 import logging
+import threading
 from builtins import object
+from concurrent.futures import wait
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
@@ -27,8 +29,8 @@ from sqlalchemy.types import ARRAY, JSON, VARCHAR, NullType
 
 from desktop.auth.backend import rewrite_user
 from desktop.lib.django_test_util import make_logged_in_client
-from notebook.connectors.base import AuthenticationRequired
-from notebook.connectors.sql_alchemy import Assist, SqlAlchemyApi
+from notebook.connectors.base import AuthenticationRequired, QueryError
+from notebook.connectors.sql_alchemy import CONNECTIONS, Assist, SqlAlchemyApi
 from useradmin.models import User
 
 LOG = logging.getLogger()
@@ -345,11 +347,13 @@ class TestApi(object):
           _create_connection.return_value = Mock(
             execute=execute
           )
+          _create_connection.return_value.execution_options.return_value = _create_connection.return_value
           notebook = {}
           snippet = {'statement': 'SELECT 1;', 'result': {}}
 
           # Trim
-          engine = SqlAlchemyApi(self.user, interpreter).execute(notebook, snippet)
+          response = SqlAlchemyApi(self.user, interpreter).execute(notebook, snippet)
+          CONNECTIONS.get(response['guid'])['future'].result()
 
           execute.assert_called_with('SELECT 1')
 
@@ -357,10 +361,106 @@ class TestApi(object):
           interpreter['options']['url'] = 'mysql://hue:3306/hue'
           interpreter['dialect_properties']['sql_identifier_quote'] = '`'
 
-          engine = SqlAlchemyApi(self.user, interpreter).execute(notebook, snippet)
+          response = SqlAlchemyApi(self.user, interpreter).execute(notebook, snippet)
+          CONNECTIONS.get(response['guid'])['future'].result()
 
           execute.assert_called_with('SELECT 1')
 
+  def test_execute_in_background(self):
+    interpreter = {
+      'name': 'mysql',
+      'options': {
+        'url': 'mysql://hue:3306/hue',
+      },
+      'dialect_properties': {},
+    }
+    executed = threading.Event()
+    result = Mock(cursor=Mock(description=[('col1',)], spec=['description']))
+
+    def execute(statement):
+      assert executed.wait(5)
+      return result
+
+    with patch('notebook.connectors.sql_alchemy.SqlAlchemyApi._create_connection') as _create_connection:
+      with patch('notebook.connectors.sql_alchemy.SqlAlchemyApi._create_engine') as _create_engine:
+        connection = _create_connection.return_value
+        connection.execution_options.return_value.execute = Mock(side_effect=execute)
+        notebook = {}
+        snippet = {'statement': 'SELECT 1', 'result': {}}
+
+        response = SqlAlchemyApi(self.user, interpreter).execute(notebook, snippet)
+        snippet['result']['handle'] = response
+
+        assert 'running' == SqlAlchemyApi(self.user, interpreter).check_status(notebook, snippet)['status']
+
+        executed.set()
+        CONNECTIONS.get(response['guid'])['future'].result()
+
+        status = SqlAlchemyApi(self.user, interpreter).check_status(notebook, snippet)
+        assert 'available' == status['status']
+        assert status['has_result_set']
+        assert [{'name': 'col1', 'type': 'STRING_TYPE', 'comment': ''}] == CONNECTIONS.get(response['guid'])['meta']
+
+        SqlAlchemyApi(self.user, interpreter).close_statement(notebook, snippet)
+        assert response['guid'] not in CONNECTIONS
+        connection.close.assert_called_once()
+
+  def test_execute_error(self):
+    interpreter = {
+      'name': 'mysql',
+      'options': {
+        'url': 'mysql://hue:3306/hue',
+      },
+      'dialect_properties': {},
+    }
+
+    with patch('notebook.connectors.sql_alchemy.SqlAlchemyApi._create_connection') as _create_connection:
+      with patch('notebook.connectors.sql_alchemy.SqlAlchemyApi._create_engine') as _create_engine:
+        connection = _create_connection.return_value
+        connection.execution_options.return_value.execute = Mock(side_effect=Exception('Table not found'))
+        notebook = {}
+        snippet = {'statement': 'SELECT 1', 'result': {}}
+
+        response = SqlAlchemyApi(self.user, interpreter).execute(notebook, snippet)
+        snippet['result']['handle'] = response
+        wait([CONNECTIONS.get(response['guid'])['future']])
+
+        with pytest.raises(QueryError, match='Table not found'):
+          SqlAlchemyApi(self.user, interpreter).check_status(notebook, snippet)
+        assert response['guid'] not in CONNECTIONS
+        connection.close.assert_called_once()
+
+  def test_execute_only_streams_queries(self):
+    interpreter = {
+      'name': 'postgresql',
+      'options': {
+        'url': 'postgresql://hue:5432/hue',
+      },
+      'dialect_properties': {},
+    }
+
+    with patch('notebook.connectors.sql_alchemy.SqlAlchemyApi._create_connection') as _create_connection:
+      with patch('notebook.connectors.sql_alchemy.SqlAlchemyApi._create_engine') as _create_engine:
+        connection = _create_connection.return_value
+        connection.execute.return_value = Mock(cursor=None)
+        notebook = {}
+        snippet = {'statement': 'INSERT INTO t VALUES (1)', 'result': {}}
+
+        response = SqlAlchemyApi(self.user, interpreter).execute(notebook, snippet)
+        CONNECTIONS.get(response['guid'])['future'].result()
+
+        connection.execute.assert_called_with('INSERT INTO t VALUES (1)')
+        connection.execution_options.assert_not_called()
+
+        snippet = {'statement': 'WITH t AS (SELECT 1) SELECT * FROM t', 'result': {}}
+        connection.execution_options.return_value.execute.return_value = Mock(cursor=None)
+
+        response = SqlAlchemyApi(self.user, interpreter).execute(notebook, snippet)
+        CONNECTIONS.get(response['guid'])['future'].result()
+
+        connection.execution_options.assert_called_once_with(stream_results=True)
+        connection.execution_options.return_value.execute.assert_called_with('WITH t AS (SELECT 1) SELECT * FROM t')
+
   def test_get_log(self):
     notebook = Mock()
     snippet = MagicMock()
@@ -16,8 +16,11 @@
 # limitations under the License.
 
 import json
-import time
+import logging
 import textwrap
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
 import requests
@@ -33,7 +36,20 @@ from desktop.lib.conf import coerce_password_from_script
 from desktop.lib.i18n import force_unicode
 from desktop.lib.rest.http_client import HttpClient, RestException
 from desktop.lib.rest.resource import Resource
+from notebook.conf import ENABLE_RESULT_PREFETCH
 from notebook.connectors.base import Api, ExecutionWrapper, QueryError, ResultWrapper
+from notebook.result_prefetch import PREFETCH_WORKERS
+from notebook.statement_handles import StatementHandles, get_statement_handles
+
+LOG = logging.getLogger()
+
+DEFAULT_FETCH_SIZE = 100
+
+# Cursors of the queries by id, closed like connections when their statement is closed or not used anymore
+CURSORS = get_statement_handles()
+
+_prefetch_executor = None
+_prefetch_executor_lock = threading.Lock()
 
 
 def query_error_handler(func):
@@ -53,6 +69,111 @@ def query_error_handler(func):
   return decorator
 
 
+def _get_prefetch_executor():
+  global _prefetch_executor
+
+  if _prefetch_executor is None:
+    with _prefetch_executor_lock:
+      if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='TrinoResultCursor')
+  return _prefetch_executor
+
+
+class TrinoResultCursor(object):
+  """
+  Rows of a query, read page by page from its next_uri.
+
+  The pages are kept as returned by Trino in a deque, and each fetch slices the rows it needs out of the first ones instead of
+  concatenating them. When prefetch is on, the page at the next_uri is requested in the background while the buffered
+  ones are served, so that at most one page is read ahead.
+  """
+
+  def __init__(self, trino_request, next_uri, rows=None, columns=None, prefetch=False):
+    self.trino_request = trino_request
+    self.next_uri = next_uri
+    self.columns = columns or []
+    self.prefetch = prefetch
+
+    self._pages = deque()
+    self._offset = 0  # Rows of the first page already fetched
+    self._next_page = None
+    if rows:
+      self._pages.append(tuple(rows))
+
+  @property
+  def has_more(self):
+    return bool(self._pages) or self.next_uri is not None
+
+  def fetch(self, rows):
+    data = []
+
+    while len(data) < rows and self.has_more:
+      if not self._pages:
+        self._read_page()
+        continue
+
+      page = self._pages[0]
+      end = self._offset + rows - len(data)
+      data.extend(page[self._offset:end])
+      if end >= len(page):
+        self._pages.popleft()
+        self._offset = 0
+      else:
+        self._offset = end
+
+    if self.prefetch and self.next_uri is not None and self._next_page is None:
+      self._next_page = _get_prefetch_executor().submit(self._get_page, self.next_uri)
+
+    return data
+
+  def __iter__(self):
+    """
+    Iterates over the remaining rows, page by page.
+    """
+    while self.has_more:
+      if self._pages:
+        page = self._pages.popleft()
+        yield page[self._offset:] if self._offset else page
+        self._offset = 0
+      else:
+        self._read_page()
+
+  def close(self):
+    """
+    Cancels the query if it did not return all its rows.
+    """
+    if self._next_page is not None and not self._next_page.cancel():
+      try:
+        self._read_page()  # Waits for the page being read, to know the next_uri to cancel
+      except Exception as e:
+        LOG.warning('Failed to read the prefetched page of the Trino query at %s: %s' % (self.next_uri, e))
+    if self.next_uri:
+      try:
+        self.trino_request.delete(self.next_uri)
+      except Exception as e:
+        LOG.warning('Failed to cancel the Trino query at %s: %s' % (self.next_uri, e))
+      self.next_uri = None
+    self._pages.clear()
+
+  def _read_page(self):
+    next_page, self._next_page = self._next_page, None
+    status = next_page.result() if next_page is not None and not next_page.cancelled() else self._get_page(self.next_uri)
+
+    self.next_uri = status.next_uri
+    if status.columns:
+      self.columns = status.columns
+    if status.rows:
+      self._pages.append(tuple(status.rows))
+
+  def _get_page(self, next_uri):
+    try:
+      response = self.trino_request.get(next_uri)
+    except requests.exceptions.RequestException as e:
+      raise TrinoConnectionError("failed to fetch: {}".format(e))
+
+    return self.trino_request.process(response)
+
+
 class TrinoApi(Api):
   def __init__(self, user, interpreter=None):
     Api.__init__(self, user, interpreter=interpreter)
@@ -123,6 +244,11 @@ class TrinoApi(Api):
     response = self.trino_request.post(query_client.query)
     status = self.trino_request.process(response)
 
+    cursor = TrinoResultCursor(
+      self.trino_request, status.next_uri, rows=status.rows, columns=status.columns, prefetch=ENABLE_RESULT_PREFETCH.get()
+    )
+    CURSORS[status.id] = {'connection': cursor}
+
     response = {
       'row_count': 0,
       'next_uri': status.next_uri,
@@ -171,52 +297,34 @@ class TrinoApi(Api):
 
   @query_error_handler
   def fetch_result(self, notebook, snippet, rows, start_over):
-    data = []
-    columns = []
-    next_uri = snippet['result']['handle']['next_uri']
-    processed_rows = snippet['result']['handle'].get('row_count', 0)
-    status = False
-
-    if processed_rows == 0:
-      data = snippet['result']['handle']['result']['data']
-
-    while next_uri:
-      try:
-        response = self.trino_request.get(next_uri)
-      except requests.exceptions.RequestException as e:
-        raise TrinoConnectionError("failed to fetch: {}".format(e))
-
-      status = self.trino_request.process(response)
-      data += status.rows
-      columns = status.columns
-
-      if len(data) >= processed_rows + 100:
-        if processed_rows < 0:
-          data = data[:100]
-        else:
-          data = data[processed_rows:processed_rows + 100]
-        break
-
-      next_uri = status.next_uri
-      current_length = len(data)
-      if processed_rows < 0:
-        processed_rows = 0
-      data = data[processed_rows:processed_rows + 100]
-      processed_rows -= current_length
+    cursor = self._get_cursor(snippet['result']['handle'])
+    data = cursor.fetch(rows if rows > 0 else DEFAULT_FETCH_SIZE)
 
     return {
-      'row_count': 100 + processed_rows,
-      'next_uri': next_uri,
-      'has_more': bool(status.next_uri) if status else False,
-      'data': data or [],
+      'next_uri': cursor.next_uri,
+      'has_more': cursor.has_more,
+      'data': data,
       'meta': [{
         'name': column['name'],
         'type': column['type'],
         'comment': ''
-        } for column in columns] if status else [],
+        } for column in cursor.columns],
       'type': 'table'
     }
 
+  def _get_cursor(self, handle):
+    cursor = CURSORS.get(handle.get('guid'))
+    if cursor is not None:
+      return cursor['connection']
+
+    # e.g. the query was executed by another Hue process
+    cursor = TrinoResultCursor(
+      self.trino_request, handle['next_uri'], rows=handle.get('result', {}).get('data'), prefetch=ENABLE_RESULT_PREFETCH.get()
+    )
+    if handle.get('guid'):
+      CURSORS[handle['guid']] = {'connection': cursor}
+    return cursor
+
   @query_error_handler
   def autocomplete(self, snippet, database=None, table=None, column=None, nested=None, operation=None):
     response = {}
@@ -275,6 +383,11 @@ class TrinoApi(Api):
     return statement
 
   def close_statement(self, notebook, snippet):
+    cursor = CURSORS.pop(snippet['result']['handle'].get('guid'), None)
+    if cursor is not None:
+      StatementHandles.close(cursor)
+      return {'status': 0}
+
     try:
       if snippet['result']['handle']['next_uri']:
         self.trino_request.delete(snippet['result']['handle']['next_uri'])
@@ -400,40 +513,18 @@ class TrinoExecutionWrapper(ExecutionWrapper):
       result = self.snippet['result']['handle']['result']
     else:
       result = self.api.fetch_result(self.notebook, self.snippet, rows, start_over)
-      self.snippet['result']['handle']['row_count'] = result['row_count']
       self.snippet['result']['handle']['next_uri'] = result['next_uri']
 
     return ResultWrapper(result.get('meta'), result.get('data'), result.get('has_more'))
 
   def _until_available(self):
-    if self.snippet['result']['handle'].get('sync', False):
-      return  # Request is already completed
-
-    count = 0
-    sleep_seconds = 1
-    check_status_count = 0
-    get_log_is_full_log = self.api.get_log_is_full_log(self.notebook, self.snippet)
-
-    while True:
-      response = self.api.check_status(self.notebook, self.snippet)
-      old_uri = self.snippet['result']['handle']['next_uri']
-      self.snippet['result']['handle']['next_uri'] = response['next_uri']
-      if self.callback and hasattr(self.callback, 'on_status'):
-        self.callback.on_status(response['status'])
-      if self.callback and hasattr(self.callback, 'on_log'):
-        log = self.api.get_log(self.notebook, self.snippet, startFrom=count)
-        if get_log_is_full_log:
-          log = log[count:]
-
-        self.callback.on_log(log)
-        count += len(log)
-
-      if response['status'] not in ['waiting', 'running', 'submitted']:
-        self.snippet['result']['handle']['next_uri'] = old_uri
-        break
-      check_status_count += 1
-      if check_status_count > 5:
-        sleep_seconds = 5
-      elif check_status_count > 10:
-        sleep_seconds = 10
-      time.sleep(sleep_seconds)
+    old_uri = self.snippet['result']['handle']['next_uri']
+    try:
+      super(TrinoExecutionWrapper, self)._until_available()
+    finally:
+      self.snippet['result']['handle']['next_uri'] = old_uri
+
+  def _check_status(self):
+    response = self.api.check_status(self.notebook, self.snippet)
+    self.snippet['result']['handle']['next_uri'] = response['next_uri']
+    return response
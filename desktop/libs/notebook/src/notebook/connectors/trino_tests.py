@@ -22,7 +22,7 @@ from django.test import TestCase
 
 from desktop.auth.backend import rewrite_user
 from desktop.lib.django_test_util import make_logged_in_client
-from notebook.connectors.trino import TrinoApi
+from notebook.connectors.trino import TrinoApi, TrinoResultCursor
 from useradmin.models import User
 
 
@@ -249,7 +249,6 @@ class TestTrinoApi(TestCase):
     )
 
     expected_result = {
-      'row_count': 94,
       'next_uri': None,
       'has_more': False,
       'data': [
@@ -268,6 +267,46 @@ class TestTrinoApi(TestCase):
     assert len(result['data']) == 6
     assert len(result['meta']) == 2
 
+  def test_fetch_result_pages(self):
+    mock_trino_request = MagicMock()
+    self.trino_api.trino_request = mock_trino_request
+    _columns = [{'comment': '', 'name': 'test_column1', 'type': 'str'}]
+
+    mock_trino_request.process.side_effect = [
+      MagicMock(next_uri='http://url1', rows=[['value3'], ['value4'], ['value5']], columns=_columns),
+      MagicMock(next_uri=None, rows=[['value6']], columns=_columns)
+    ]
+    snippet = {'result': {'handle': {'guid': 'trino-fetch-pages', 'next_uri': 'http://url', 'result': {'data': [['value1'], ['value2']]}}}}
+
+    result = self.trino_api.fetch_result(notebook={}, snippet=snippet, rows=3, start_over=False)
+    assert [['value1'], ['value2'], ['value3']] == result['data']
+    assert result['has_more']
+    assert 'http://url1' == result['next_uri']
+
+    result = self.trino_api.fetch_result(notebook={}, snippet=snippet, rows=3, start_over=False)
+    assert [['value4'], ['value5'], ['value6']] == result['data']
+    assert not result['has_more']
+    assert result['next_uri'] is None
+
+    mock_trino_request.get.assert_any_call('http://url')
+    mock_trino_request.get.assert_any_call('http://url1')
+    assert 2 == mock_trino_request.get.call_count
+
+    self.trino_api.close_statement(notebook={}, snippet=snippet)
+    mock_trino_request.delete.assert_not_called()
+
+  def test_result_cursor_close(self):
+    mock_trino_request = MagicMock()
+    mock_trino_request.process.return_value = MagicMock(next_uri='http://url2', rows=[['value3']], columns=[])
+
+    cursor = TrinoResultCursor(mock_trino_request, 'http://url1', rows=[['value1'], ['value2']], prefetch=True)
+    assert [['value1']] == cursor.fetch(1)
+    assert [['value2'], ['value3']] == cursor.fetch(2)
+
+    cursor.close()
+    assert not cursor.has_more
+    mock_trino_request.delete.assert_called_once_with('http://url2')
+
   def test_get_select_query(self):
     # Test with specified database, table, and column
     database = '`test_schema.test_db`'
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from desktop.lib.metrics import global_registry
+from notebook.statement_handles import get_statement_handles_stats
+
+fetch_result_time = global_registry().timer(
+    name='notebook.fetch-result.time',
+    label='Fetch Result Time',
+    description='Time taken to fetch and decode a page of query results in the editor',
+    numerator='seconds',
+    counter_numerator='fetches',
+    rate_denominator='seconds',
+)
+
+prefetch_hits = global_registry().counter(
+    name='notebook.fetch-result.prefetch-hits',
+    label='Prefetched Result Pages',
+    description='Number of pages of query results served from the read-ahead buffer',
+    numerator='fetches',
+)
+
+prefetch_misses = global_registry().counter(
+    name='notebook.fetch-result.prefetch-misses',
+    label='Not Prefetched Result Pages',
+    description='Number of pages of query results fetched synchronously while the read-ahead buffer is enabled',
+    numerator='fetches',
+)
+
+status_checks = global_registry().counter(
+    name='notebook.status-poller.checks',
+    label='Query Status Checks',
+    description='Number of status checks of the queries waited for by the downloads and scheduled tasks',
+    numerator='checks',
+)
+
+status_checks_saved = global_registry().counter(
+    name='notebook.status-poller.checks-saved',
+    label='Saved Query Status Checks',
+    description='Number of status checks saved by the backoff compared to a check every second, then every 5 seconds',
+    numerator='checks',
+)
+
+
+def _statement_handles_stat(name):
+  return lambda: get_statement_handles_stats()[name]
+
+
+statement_handles = global_registry().gauge_callback(
+    name='notebook.statements.handles',
+    callback=_statement_handles_stat('handles'),
+    label='Open Statements',
+    description='Number of open statements of the SqlAlchemy interpreters',
+    numerator='statements',
+)
+
+statements_running = global_registry().gauge_callback(
+    name='notebook.statements.running',
+    callback=_statement_handles_stat('running'),
+    label='Running Statements',
+    description='Number of statements of the SqlAlchemy interpreters running in the background',
+    numerator='statements',
+)
+
+statements_queued = global_registry().gauge_callback(
+    name='notebook.statements.queued',
+    callback=_statement_handles_stat('queued'),
+    label='Queued Statements',
+    description='Number of statements of the SqlAlchemy interpreters waiting for a thread to run',
+    numerator='statements',
+)
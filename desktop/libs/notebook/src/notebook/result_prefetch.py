@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Read-ahead of the query results of the editor.
+
+Once a page of results has been served, the next batch is fetched and decoded in the background so that the following
+"fetch more" is served from memory instead of paying a full round trip to the query server.
+
+The buffer is in the memory of the Hue process while the cursor of the query server only moves forward, so the read-ahead
+is only enabled when there is a single Gunicorn worker: a "fetch more" served by another worker would skip the buffered rows.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from desktop.conf import GUNICORN_NUMBER_OF_WORKERS
+from notebook.conf import ENABLE_RESULT_PREFETCH, RESULT_PREFETCH_MAX_BYTES, RESULT_PREFETCH_MAX_ROWS, RESULT_PREFETCH_TTL
+from notebook.metrics import fetch_result_time, prefetch_hits, prefetch_misses
+
+LOG = logging.getLogger()
+
+PREFETCH_WORKERS = 4
+MAX_EXPIRED_KEYS = 10000
+
+
+def _get_size(data):
+  return sum(len(str(value)) for row in data for value in row)
+
+
+class _Prefetch(object):
+
+  def __init__(self, future):
+    self.future = future
+    self.size = 0
+    self.created = time.time()
+
+
+class ResultPrefetcher(object):
+  """
+  Buffers the next batch of rows of each operation.
+
+  The fetch callables take (rows, start_over) and return the result dict of Api.fetch_result(), i.e. with 'data', 'has_more'
+  and 'meta'. Memory is bounded by never prefetching more than max_rows rows at a time, by not starting new prefetches while
+  the buffered rows of the process exceed max_bytes and by dropping the batches not read within ttl seconds, e.g. of the
+  queries whose tab was closed. As rows can be fetched only once, the next fetch of an operation whose batch was dropped
+  raises QueryExpired instead of silently skipping it.
+  """
+
+  def __init__(self, max_rows, max_bytes, ttl=0, workers=PREFETCH_WORKERS):
+    self.max_rows = max_rows
+    self.max_bytes = max_bytes
+    self.ttl = ttl
+    self.buffered_bytes = 0
+
+    self._prefetches = {}
+    self._expired = OrderedDict()
+    self._lock = threading.Lock()
+    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ResultPrefetcher')
+
+  def fetch(self, key, fetch, rows, start_over=False):
+    self._expire()
+
+    with self._lock:
+      expired = self._expired.pop(key, None)
+    if expired and not start_over:
+      from notebook.connectors.base import QueryExpired
+      raise QueryExpired(message='The results fetched in advance expired after %d seconds.' % self.ttl)
+
+    with fetch_result_time.time():
+      if start_over:
+        prefetch = self._pop(key)
+        if prefetch is not None and not prefetch.future.cancel():
+          wait([prefetch.future])  # Otherwise it could read rows after the start over
+        prefetch = None
+      else:
+        prefetch = self._pop(key)
+
+      if prefetch is None:
+        prefetch_misses.inc()
+        result = fetch(rows, start_over)
+      else:
+        prefetch_hits.inc()
+        result = self._read(key, fetch, rows, prefetch)
+
+    if result.get('has_more'):
+      self._start(key, fetch, rows)
+
+    return result
+
+  def drop(self, key):
+    """
+    Forgets the buffered rows of an operation, e.g. when it is closed or canceled.
+    """
+    prefetch = self._pop(key)
+    if prefetch is not None:
+      prefetch.future.cancel()
+    with self._lock:
+      self._expired.pop(key, None)
+
+  def _read(self, key, fetch, rows, prefetch):
+    result = dict(prefetch.future.result())
+    data = result['data']
+
+    if len(data) > rows:
+      remaining = dict(result, data=data[rows:], has_more=True)
+      result['data'] = data[:rows]
+      self._buffer(key, self._done(remaining))
+      result['has_more'] = True
+    elif len(data) < rows and result.get('has_more'):
+      more = fetch(rows - len(data), False)
+      result['data'] = data + list(more['data'])
+      result['has_more'] = more.get('has_more')
+
+    return result
+
+  def _start(self, key, fetch, rows):
+    with self._lock:
+      if key in self._prefetches:
+        return
+      if self.buffered_bytes >= self.max_bytes:
+        LOG.debug('Not prefetching the results of %s: %d bytes are already buffered' % (key, self.buffered_bytes))
+        return
+      prefetch = _Prefetch(None)
+      prefetch.future = self._executor.submit(self._fetch, key, prefetch, fetch, min(rows, self.max_rows))
+      self._prefetches[key] = prefetch
+
+  def _fetch(self, key, prefetch, fetch, rows):
+    result = fetch(rows, False)
+    result['data'] = list(result['data'])  # Decode the rows in the background too
+
+    size = _get_size(result['data'])
+    with self._lock:
+      if self._prefetches.get(key) is prefetch:
+        prefetch.size = size
+        self.buffered_bytes += size
+    return result
+
+  def _buffer(self, key, future):
+    prefetch = _Prefetch(future)
+    prefetch.size = _get_size(future.result()['data'])
+    with self._lock:
+      self._prefetches[key] = prefetch
+      self.buffered_bytes += prefetch.size
+
+  def _expire(self):
+    if not self.ttl:
+      return
+
+    now = time.time()
+    with self._lock:
+      for key, prefetch in list(self._prefetches.items()):
+        if prefetch.future.done() and now - prefetch.created > self.ttl:
+          LOG.debug('Dropping the %d bytes of results prefetched for %s' % (prefetch.size, key))
+          del self._prefetches[key]
+          self.buffered_bytes -= prefetch.size
+          self._expired[key] = True
+      while len(self._expired) > MAX_EXPIRED_KEYS:
+        self._expired.popitem(last=False)
+
+  def _pop(self, key):
+    with self._lock:
+      prefetch = self._prefetches.pop(key, None)
+      if prefetch is not None:
+        self.buffered_bytes -= prefetch.size
+        prefetch.size = 0
+    return prefetch
+
+  @classmethod
+  def _done(cls, result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+  """
+  Returns the prefetcher of the process, or None when the read-ahead is disabled.
+  """
+  global _prefetcher
+
+  if not ENABLE_RESULT_PREFETCH.get() or GUNICORN_NUMBER_OF_WORKERS.get() != 1:
+    return None
+
+  if _prefetcher is None:
+    with _prefetcher_lock:
+      if _prefetcher is None:
+        _prefetcher = ResultPrefetcher(
+          max_rows=RESULT_PREFETCH_MAX_ROWS.get(), max_bytes=RESULT_PREFETCH_MAX_BYTES.get(), ttl=RESULT_PREFETCH_TTL.get()
+        )
+  return _prefetcher
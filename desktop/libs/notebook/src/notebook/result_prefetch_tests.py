@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from concurrent.futures import wait
+
+import pytest
+
+from desktop.conf import GUNICORN_NUMBER_OF_WORKERS
+from notebook.conf import ENABLE_RESULT_PREFETCH
+from notebook.connectors.base import QueryExpired
+from notebook.result_prefetch import ResultPrefetcher, get_prefetcher
+
+
+class MockOperation(object):
+
+  def __init__(self, row_count):
+    self.row_count = row_count
+    self.position = 0
+    self.calls = []
+
+  def fetch(self, rows, start_over):
+    self.calls.append(rows)
+    if start_over:
+      self.position = 0
+    data = [[i] for i in range(self.position, min(self.position + rows, self.row_count))]
+    self.position += len(data)
+    return {'has_more': self.position < self.row_count, 'data': iter(data), 'meta': [], 'type': 'table'}
+
+
+def first_values(result):
+  return [row[0] for row in result['data']]
+
+
+class TestResultPrefetcher(object):
+
+  def setup_method(self):
+    self.prefetcher = ResultPrefetcher(max_rows=1000, max_bytes=1024 * 1024)
+
+  def _wait(self, key):
+    self.prefetcher._prefetches[key].future.result(5)
+
+  def test_pages_are_served_from_the_buffer(self):
+    operation = MockOperation(250)
+
+    result = self.prefetcher.fetch('guid', operation.fetch, 100)
+    assert list(range(0, 100)) == first_values(result)
+    self._wait('guid')
+    assert [100, 100] == operation.calls
+
+    result = self.prefetcher.fetch('guid', operation.fetch, 100)
+    assert list(range(100, 200)) == first_values(result)
+    assert result['has_more']
+    self._wait('guid')
+
+    result = self.prefetcher.fetch('guid', operation.fetch, 100)
+    assert list(range(200, 250)) == first_values(result)
+    assert not result['has_more']
+    assert 'guid' not in self.prefetcher._prefetches
+    assert 0 == self.prefetcher.buffered_bytes
+
+  def test_page_size_change(self):
+    operation = MockOperation(1000)
+    self.prefetcher.fetch('guid', operation.fetch, 100)
+    self._wait('guid')
+
+    result = self.prefetcher.fetch('guid', operation.fetch, 30)
+    assert list(range(100, 130)) == first_values(result)
+
+    result = self.prefetcher.fetch('guid', operation.fetch, 100)
+    assert list(range(130, 230)) == first_values(result)
+    assert [100, 100, 30] == operation.calls[:3]
+
+  def test_start_over_and_drop(self):
+    operation = MockOperation(1000)
+    self.prefetcher.fetch('guid', operation.fetch, 100)
+    self._wait('guid')
+
+    result = self.prefetcher.fetch('guid', operation.fetch, 100, start_over=True)
+    assert list(range(0, 100)) == first_values(result)
+
+    self._wait('guid')
+    self.prefetcher.drop('guid')
+    assert 'guid' not in self.prefetcher._prefetches
+    assert 0 == self.prefetcher.buffered_bytes
+
+  def test_drop_while_fetching(self):
+    self.prefetcher.fetch('guid', MockOperation(1000).fetch, 100)
+    self._wait('guid')
+    buffered_bytes = self.prefetcher.buffered_bytes
+
+    operation = MockOperation(1000)
+    released = threading.Event()
+
+    def fetch(rows, start_over):
+      if operation.calls:
+        released.wait(5)
+      return operation.fetch(rows, start_over)
+
+    self.prefetcher.fetch('other', fetch, 100)
+    prefetch = self.prefetcher._prefetches['other']
+    self.prefetcher.drop('other')
+    released.set()
+    wait([prefetch.future], 5)  # Cancelled if it did not start yet
+
+    assert 'other' not in self.prefetcher._prefetches
+    assert buffered_bytes == self.prefetcher.buffered_bytes
+
+  def test_bounded_by_rows_and_bytes(self):
+    self.prefetcher = ResultPrefetcher(max_rows=10, max_bytes=1)
+    operation = MockOperation(1000)
+
+    self.prefetcher.fetch('guid', operation.fetch, 100)
+    self._wait('guid')
+    assert [100, 10] == operation.calls
+
+    self.prefetcher.fetch('other', MockOperation(1000).fetch, 100)
+    assert 'other' not in self.prefetcher._prefetches
+
+  def test_expired_batches_are_dropped(self):
+    self.prefetcher = ResultPrefetcher(max_rows=1000, max_bytes=1024 * 1024, ttl=60)
+    operation = MockOperation(1000)
+    self.prefetcher.fetch('guid', operation.fetch, 100)
+    self._wait('guid')
+    self.prefetcher._prefetches['guid'].created -= 61  # e.g. the tab was closed
+
+    self.prefetcher.fetch('other', MockOperation(1000).fetch, 100)
+    assert 'guid' not in self.prefetcher._prefetches
+
+    with pytest.raises(QueryExpired):
+      self.prefetcher.fetch('guid', operation.fetch, 100)
+    assert list(range(0, 100)) == first_values(self.prefetcher.fetch('guid', operation.fetch, 100, start_over=True))
+
+  def test_disabled_with_several_workers(self):
+    resets = [ENABLE_RESULT_PREFETCH.set_for_testing(True), GUNICORN_NUMBER_OF_WORKERS.set_for_testing(4)]
+    try:
+      assert get_prefetcher() is None
+    finally:
+      for reset in resets:
+        reset()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Storage of the query results fetched by the task server.
+
+The result is kept as a plain CSV file so that it can still be downloaded as is, along with a sparse index of the byte
+offset of every block of ROW_BLOCK_SIZE rows. Any page of rows can then be served by decoding only the blocks it overlaps.
+
+While it is written, the index is also saved every CHECKPOINT_ROWS rows as a checkpoint, from which a new writer can
+append the rest of the result after its worker died.
+"""
+
+import io
+import csv
+import sys
+import json
+import mmap
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+
+from desktop.lib.export_csvxls import CsvWriter
+
+LOG = logging.getLogger()
+
+ROW_BLOCK_SIZE = 1000
+CACHE_TIMEOUT = 60 * 5
+MAX_CACHED_BLOCKS = 16
+CHECKPOINT_ROWS = 100 * ROW_BLOCK_SIZE
+
+
+def index_key(result_key):
+  return result_key + '_index'
+
+
+def block_key(result_key, block):
+  return '%s_block_%d' % (result_key, block)
+
+
+def checkpoint_key(result_key):
+  return result_key + '_checkpoint'
+
+
+class ResultWriter(object):
+  """
+  Writes the batches of a content generator as CSV and records the byte offset at which each block of rows starts.
+
+  When a cache is provided, the index and each block are also pushed to it so that readers without access to the
+  storage can serve the result block by block.
+
+  The optional callback can implement on_progress(row_count, bytes_written), called after each block, and
+  on_checkpoint(checkpoint), called with the checkpoint dict before it is saved so that it can add its own state to it.
+  """
+
+  def __init__(self, storage, result_key, cache=None, block_size=ROW_BLOCK_SIZE, checkpoint_rows=CHECKPOINT_ROWS, callback=None):
+    self.storage = storage
+    self.result_key = result_key
+    self.cache = cache
+    self.block_size = block_size
+    self.checkpoint_rows = checkpoint_rows
+    self.callback = callback
+
+    self.write_id = uuid.uuid4().hex  # Tells the blocks of a result from the ones of the previous result with the same key
+    self.headers = []
+    self.row_count = 0
+    self.offsets = [0]
+    self._csv = CsvWriter()
+    self._block = []
+    self._bytes_written = 0
+    self._f = None
+    self._skip = 0
+    self._checkpoint_row_count = 0
+
+  @classmethod
+  def load_checkpoint(cls, storage, result_key):
+    """
+    Returns the last checkpoint of an unfinished result, or None if there is none or if the result can't be appended to,
+    i.e. it is not a local file.
+    """
+    if not _get_path(storage, result_key) or not storage.exists(checkpoint_key(result_key)):
+      return None
+
+    with storage.open(checkpoint_key(result_key), 'rb') as f:
+      return json.loads(f.read().decode('utf-8'))
+
+  def resume(self, checkpoint):
+    """
+    Continues the result from a checkpoint: the rows after it are discarded and as many rows as it holds are skipped from
+    the content generator, which needs to start again from the first row.
+    """
+    self.headers = checkpoint['headers']
+    self.block_size = checkpoint['block_size']
+    self.offsets = checkpoint['offsets']
+    self.row_count = self._checkpoint_row_count = self._skip = checkpoint['row_count']
+    self._bytes_written = checkpoint['bytes_written']
+    return self
+
+  def write(self, content_generator):
+    with self._open() as f:
+      self._f = f
+      for headers, data in content_generator:
+        if not self._bytes_written and headers:
+          self.headers = list(headers)
+          self._csv.write_rows([self.headers])
+          self._write_chunk(self._csv.drain())
+          self.offsets = [self._bytes_written]
+
+        for row in data:
+          if self._skip:
+            self._skip -= 1
+            continue
+          self._block.append(row)
+          if len(self._block) == self.block_size:
+            self._flush_block()
+            if self.checkpoint_rows and self.row_count - self._checkpoint_row_count >= self.checkpoint_rows:
+              self._save_checkpoint()
+      self._flush_block()
+
+    index = self._get_index()
+    with self.storage.open(index_key(self.result_key), 'wb') as f:
+      f.write(json.dumps(index).encode('utf-8'))
+    if self.cache is not None:
+      self.cache.set(index_key(self.result_key), index, CACHE_TIMEOUT)
+    if self._checkpoint_row_count:
+      self.storage.delete(checkpoint_key(self.result_key))
+
+    return index
+
+  def _open(self):
+    if not self._bytes_written:
+      return self.storage.open(self.result_key, 'wb')
+
+    f = open(_get_path(self.storage, self.result_key), 'r+b')
+    f.truncate(self._bytes_written)
+    f.seek(self._bytes_written)
+    return f
+
+  def _get_index(self):
+    return {
+      'headers': self.headers,
+      'block_size': self.block_size,
+      'offsets': self.offsets,
+      'row_count': self.row_count,
+      'write_id': self.write_id,
+    }
+
+  def _save_checkpoint(self):
+    self._f.flush()
+
+    checkpoint = self._get_index()
+    checkpoint['bytes_written'] = self._bytes_written
+    if self.callback is not None and hasattr(self.callback, 'on_checkpoint'):
+      self.callback.on_checkpoint(checkpoint)
+
+    with self.storage.open(checkpoint_key(self.result_key), 'wb') as f:
+      f.write(json.dumps(checkpoint).encode('utf-8'))
+    self._checkpoint_row_count = self.row_count
+
+  def _flush_block(self):
+    if not self._block:
+      return
+
+    self._csv.write_rows(self._block)
+    content = self._csv.drain()
+    if self.cache is not None:
+      self.cache.set(block_key(self.result_key, len(self.offsets) - 1), content, CACHE_TIMEOUT)
+
+    self._write_chunk(content)
+    self.offsets.append(self._bytes_written)
+    self.row_count += len(self._block)
+    self._block = []
+
+    if self.callback is not None and hasattr(self.callback, 'on_progress'):
+      self.callback.on_progress(self.row_count, self._bytes_written)
+
+  def _write_chunk(self, content):
+    chunk = content.encode('utf-8')
+    self._f.write(chunk)
+    self._bytes_written += len(chunk)
+
+
+def _get_path(storage, name):
+  try:
+    return storage.path(name)
+  except NotImplementedError:
+    return None
+
+
+class ResultReader(object):
+  """
+  Serves pages of rows of a result written by ResultWriter in O(page size + block size).
+
+  Blocks come from the cache when one is provided, otherwise or when they expired from it from the storage, memory-mapped
+  when it is a local file. The decoded blocks of the storage are kept in a small LRU shared by the readers of the process,
+  keyed by the write id of the result so that a result written again under the same key is never served from older blocks.
+  """
+
+  _blocks = OrderedDict()
+  _blocks_lock = threading.Lock()
+
+  def __init__(self, storage, result_key, cache=None, max_cached_blocks=MAX_CACHED_BLOCKS):
+    self.storage = storage
+    self.result_key = result_key
+    self.cache = cache
+    self.max_cached_blocks = max_cached_blocks
+
+    self.index = cache.get(index_key(result_key)) if cache is not None else None
+    if self.index is None and (cache is None or storage.exists(index_key(result_key))):
+      with storage.open(index_key(result_key), 'rb') as f:
+        self.index = json.loads(f.read().decode('utf-8'))
+
+  @property
+  def headers(self):
+    return self.index['headers'] if self.index else []
+
+  @property
+  def row_count(self):
+    return self.index['row_count'] if self.index else 0
+
+  def rows(self, start, count):
+    """Returns the rows [start, start + count) of the result."""
+    block_size = self.index['block_size']
+    end = min(start + count, self.row_count)
+    data = []
+
+    while start < end:
+      block, position = divmod(start, block_size)
+      rows = self._get_block(block)[position:position + end - start]
+      data.extend(rows)
+      start += len(rows)
+      if not rows:
+        break
+
+    return data
+
+  def _get_block(self, block):
+    if self.cache is not None:
+      content = self.cache.get(block_key(self.result_key, block))
+      if content is not None:
+        return self._decode(content)
+      LOG.info('Block %d of cached results %s not found, reading it from the storage.' % (block, self.result_key))
+
+    key = (self.result_key, self.index.get('write_id'), block)
+    with self._blocks_lock:
+      if key in self._blocks:
+        self._blocks.move_to_end(key)
+        return self._blocks[key]
+
+    rows = self._decode(self._read_block(block))
+
+    with self._blocks_lock:
+      self._blocks[key] = rows
+      while len(self._blocks) > self.max_cached_blocks:
+        self._blocks.popitem(last=False)
+
+    return rows
+
+  def _read_block(self, block):
+    offsets = self.index['offsets']
+    start, end = offsets[block], offsets[block + 1]
+
+    path = _get_path(self.storage, self.result_key)
+    if path:
+      with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+          content = mapped[start:end]
+    else:
+      with self.storage.open(self.result_key, 'rb') as f:
+        f.seek(start)
+        content = f.read(end - start)
+
+    return content.decode('utf-8')
+
+  @classmethod
+  def _decode(cls, content):
+    csv.field_size_limit(sys.maxsize)
+    return list(csv.reader(io.StringIO(content, newline='')))
+
+  @classmethod
+  def evict(cls, result_key):
+    with cls._blocks_lock:
+      for key in [key for key in cls._blocks if key[0] == result_key]:
+        del cls._blocks[key]
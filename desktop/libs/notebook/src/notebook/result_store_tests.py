@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.storage import FileSystemStorage
+
+from notebook.result_store import ResultReader, ResultWriter, checkpoint_key
+
+
+def content_generator(batches=5, batch_size=300):
+  for batch in range(batches):
+    yield ['id|INT_TYPE', 'name|STRING_TYPE'], [
+      [batch * batch_size + i, 'multi\nline' if i % 10 == 0 else 'name_%d' % i] for i in range(batch_size)
+    ]
+
+
+def failing_generator(failing_row, **kwargs):
+  for headers, data in content_generator(**kwargs):
+    if len(data) >= failing_row:
+      yield headers, data[:failing_row]
+      raise Exception('Worker lost')
+    failing_row -= len(data)
+    yield headers, data
+
+
+class TestResultStore():
+
+  def setup_method(self):
+    ResultReader.evict('result')
+
+  def test_write_index(self, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+
+    index = ResultWriter(storage, 'result', block_size=400).write(content_generator())
+
+    assert ['id|INT_TYPE', 'name|STRING_TYPE'] == index['headers']
+    assert 1500 == index['row_count']
+    assert 5 == len(index['offsets'])  # 4 blocks
+    with storage.open('result', 'rb') as f:
+      assert f.read().startswith(b'id|INT_TYPE,name|STRING_TYPE\r\n0,"multi\nline"\r\n1,name_1\r\n')
+
+  def test_read_pages(self, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    ResultWriter(storage, 'result', block_size=400).write(content_generator())
+
+    reader = ResultReader(storage, 'result')
+
+    assert ['id|INT_TYPE', 'name|STRING_TYPE'] == reader.headers
+    assert list(range(390, 410)) == [int(row[0]) for row in reader.rows(390, 20)]
+    assert ['1200', 'multi\nline'] == reader.rows(1200, 1)[0]
+    assert 5 == len(reader.rows(1495, 100))
+    assert [] == reader.rows(1500, 100)
+
+  def test_read_only_needed_blocks(self, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    ResultWriter(storage, 'result', block_size=400).write(content_generator())
+
+    reader = ResultReader(storage, 'result')
+
+    with patch.object(ResultReader, '_read_block', wraps=reader._read_block) as _read_block:
+      reader.rows(850, 100)
+      reader.rows(900, 10)
+
+      _read_block.assert_called_once_with(2)
+
+  def test_read_from_cache(self, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    cache = LocMemCache('test_result_store', {})
+    ResultWriter(storage, 'result', cache=cache, block_size=400).write(content_generator())
+
+    reader = ResultReader(storage, 'result', cache=cache)
+
+    with patch.object(ResultReader, '_read_block') as _read_block:
+      assert list(range(790, 810)) == [int(row[0]) for row in reader.rows(790, 20)]
+      _read_block.assert_not_called()
+
+  def test_read_expired_block_from_storage(self, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    cache = LocMemCache('test_result_store_expired', {})
+    ResultWriter(storage, 'result', cache=cache, block_size=400).write(content_generator())
+    cache.delete('result_block_2')
+
+    reader = ResultReader(storage, 'result', cache=cache)
+
+    assert list(range(790, 810)) == [int(row[0]) for row in reader.rows(790, 20)]
+
+  def test_read_rewritten_result(self, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    ResultWriter(storage, 'result', block_size=400).write(content_generator())
+    assert '0' == ResultReader(storage, 'result').rows(0, 1)[0][0]
+
+    ResultWriter(storage, 'result', block_size=400).write(iter([(['id|INT_TYPE'], [[1000 + i] for i in range(10)])]))  # Run again
+
+    assert '1000' == ResultReader(storage, 'result').rows(0, 1)[0][0]
+
+  def test_resume_from_checkpoint(self, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    ResultWriter(storage, 'expected', block_size=100).write(content_generator())
+    callback = Mock(spec=['on_checkpoint', 'on_progress'])
+    callback.on_checkpoint.side_effect = lambda checkpoint: checkpoint.update(handle={'guid': 'guid'})
+
+    with pytest.raises(Exception):
+      ResultWriter(storage, 'result', block_size=100, checkpoint_rows=400, callback=callback).write(failing_generator(1050))
+
+    checkpoint = ResultWriter.load_checkpoint(storage, 'result')
+    assert 800 == checkpoint['row_count']
+    assert {'guid': 'guid'} == checkpoint['handle']
+    callback.on_progress.assert_called_with(1000, storage.size('result'))
+
+    index = ResultWriter(storage, 'result', block_size=100).resume(checkpoint).write(content_generator())
+
+    assert 1500 == index['row_count']
+    assert not storage.exists(checkpoint_key('result'))
+    with storage.open('expected', 'rb') as expected, storage.open('result', 'rb') as result:
+      assert expected.read() == result.read()
+    with storage.open('expected_index', 'rb') as expected, storage.open('result_index', 'rb') as result:
+      expected_index, result_index = json.loads(expected.read()), json.loads(result.read())
+      assert expected_index.pop('write_id') != result_index.pop('write_id')
+      assert expected_index == result_index
+
+  def test_no_checkpoint(self, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+
+    ResultWriter(storage, 'result', block_size=100, checkpoint_rows=400).write(content_generator())
+
+    assert ResultWriter.load_checkpoint(storage, 'result') is None
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Background execution of the statements of the interpreters without a query server keeping their state, e.g. SqlAlchemy.
+
+The statements run on a bounded thread pool of the Hue process instead of in the web requests, and their connections and
+results are kept in handles until the editor closes them or stops asking for them.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from notebook.conf import STATEMENT_EXECUTION_WORKERS, STATEMENT_HANDLE_TTL, STATEMENT_MAX_HANDLES
+
+LOG = logging.getLogger()
+
+
+class StatementHandles(object):
+  """
+  Handles of the executed statements by guid.
+
+  A handle is a dict with the 'connection' of its statement. The statements submitted with it run in the background: the
+  handle gets a 'future' which completes once the handle is updated with the dict returned by the statement.
+
+  The handles not accessed for ttl seconds, or the least recently accessed ones above max_handles, are closed. The
+  statement of a closed handle is not run if it did not start yet, and its connection is closed once it is done otherwise.
+  """
+
+  def __init__(self, workers, ttl, max_handles):
+    self.ttl = ttl
+    self.max_handles = max_handles
+
+    self._handles = OrderedDict()
+    self._accessed = {}
+    self._lock = threading.Lock()
+    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='StatementHandles')
+
+  def submit(self, guid, handle, fn, *args, **kwargs):
+    """
+    Adds the handle and runs fn(*args, **kwargs) in the background.
+    """
+    handle['future'] = self._executor.submit(self._run, handle, fn, *args, **kwargs)
+    self[guid] = handle
+    return handle
+
+  def get(self, guid, default=None):
+    with self._lock:
+      evicted = self._evict()
+      handle = self._handles.get(guid)
+      if handle is not None:
+        self._handles.move_to_end(guid)
+        self._accessed[guid] = time.time()
+    self._close_all(evicted)
+    return handle if handle is not None else default
+
+  def pop(self, guid, default=None):
+    with self._lock:
+      self._accessed.pop(guid, None)
+      return self._handles.pop(guid, default)
+
+  def __setitem__(self, guid, handle):
+    with self._lock:
+      self._handles[guid] = handle
+      self._handles.move_to_end(guid)
+      self._accessed[guid] = time.time()
+      evicted = self._evict()
+    self._close_all(evicted)
+
+  def __delitem__(self, guid):
+    with self._lock:
+      del self._handles[guid]
+      del self._accessed[guid]
+
+  def __contains__(self, guid):
+    return guid in self._handles
+
+  def __len__(self):
+    return len(self._handles)
+
+  def get_stats(self):
+    """
+    Returns the numbers of handles, of statements running and of statements waiting for a thread.
+    """
+    with self._lock:
+      handles = len(self._handles)
+      futures = [handle['future'] for handle in self._handles.values() if 'future' in handle]
+    running = sum(1 for future in futures if future.running())
+    queued = sum(1 for future in futures if not future.running() and not future.done())
+    return {'handles': handles, 'running': running, 'queued': queued}
+
+  @classmethod
+  def close(cls, handle):
+    """
+    Closes the connection of the handle, after its statement if it is running.
+    """
+    future = handle.get('future')
+    if future is not None and not future.cancel() and not future.done():
+      future.add_done_callback(lambda future: cls._close_connection(handle))
+    else:
+      cls._close_connection(handle)
+
+  @classmethod
+  def _close_connection(cls, handle):
+    try:
+      handle['connection'].close()
+    except Exception as e:
+      LOG.warning('Failed to close the connection of a statement: %s' % e)
+
+  def _run(self, handle, fn, *args, **kwargs):
+    handle.update(fn(*args, **kwargs))
+
+  def _evict(self):
+    expired = time.time() - self.ttl
+    evicted = []
+    while self._handles:
+      guid = next(iter(self._handles))
+      if self._accessed[guid] > expired and len(self._handles) <= self.max_handles:
+        break  # The next ones were accessed more recently
+      evicted.append(self._handles.pop(guid))
+      del self._accessed[guid]
+    return evicted
+
+  def _close_all(self, handles):
+    for handle in handles:
+      LOG.debug('Closing a statement handle not accessed for %ss or above %d handles' % (self.ttl, self.max_handles))
+      self.close(handle)
+
+
+_statement_handles = None
+_statement_handles_lock = threading.Lock()
+
+
+def get_statement_handles():
+  """
+  Returns the statement handles of the process.
+  """
+  global _statement_handles
+
+  if _statement_handles is None:
+    with _statement_handles_lock:
+      if _statement_handles is None:
+        _statement_handles = StatementHandles(
+          workers=STATEMENT_EXECUTION_WORKERS.get(), ttl=STATEMENT_HANDLE_TTL.get(), max_handles=STATEMENT_MAX_HANDLES.get()
+        )
+  return _statement_handles
+
+
+def get_statement_handles_stats():
+  if _statement_handles is None:
+    return {'handles': 0, 'running': 0, 'queued': 0}
+  return _statement_handles.get_stats()
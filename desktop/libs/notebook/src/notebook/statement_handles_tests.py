@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from unittest.mock import Mock, patch
+
+from notebook.statement_handles import StatementHandles
+
+
+class TestStatementHandles(object):
+
+  def setup_method(self):
+    self.handles = StatementHandles(workers=1, ttl=60, max_handles=2)
+
+  def test_submit(self):
+    started = threading.Event()
+    release = threading.Event()
+
+    def execute(statement):
+      started.set()
+      assert release.wait(5)
+      return {'result': statement}
+
+    running = self.handles.submit('guid-1', {'connection': Mock()}, execute, 'SELECT 1')
+    queued = self.handles.submit('guid-2', {'connection': Mock()}, execute, 'SELECT 2')
+    assert started.wait(5)
+
+    assert {'handles': 2, 'running': 1, 'queued': 1} == self.handles.get_stats()
+
+    release.set()
+    queued['future'].result(5)
+    assert 'SELECT 1' == self.handles.get('guid-1')['result']
+    assert 'SELECT 2' == self.handles.get('guid-2')['result']
+    assert {'handles': 2, 'running': 0, 'queued': 0} == self.handles.get_stats()
+
+    handle = self.handles.pop('guid-1')
+    assert handle is running
+    assert self.handles.get('guid-1') is None
+
+  def test_max_handles(self):
+    first = {'connection': Mock()}
+    second = {'connection': Mock()}
+    third = {'connection': Mock()}
+
+    self.handles['guid-1'] = first
+    self.handles['guid-2'] = second
+    self.handles.get('guid-1')  # Now the most recently used
+    self.handles['guid-3'] = third
+
+    assert ['guid-1', 'guid-3'] == list(self.handles._handles)
+    second['connection'].close.assert_called_once()
+    assert not first['connection'].close.called
+
+  def test_ttl(self):
+    handle = {'connection': Mock()}
+    self.handles['guid-1'] = handle
+
+    with patch('notebook.statement_handles.time.time', return_value=self.handles._accessed['guid-1'] + 61):
+      assert self.handles.get('guid-1') is None
+
+    handle['connection'].close.assert_called_once()
+
+  def test_close_running(self):
+    started = threading.Event()
+    release = threading.Event()
+
+    def execute():
+      started.set()
+      assert release.wait(5)
+      return {}
+
+    closed = threading.Event()
+    running = self.handles.submit('guid-1', {'connection': Mock(close=Mock(side_effect=closed.set))}, execute)
+    queued = self.handles.submit('guid-2', {'connection': Mock()}, execute)
+    assert started.wait(5)
+
+    StatementHandles.close(self.handles.pop('guid-2'))
+    assert queued['future'].cancelled()
+    queued['connection'].close.assert_called_once()
+
+    StatementHandles.close(self.handles.pop('guid-1'))
+    assert not running['connection'].close.called  # Closed once the statement is done
+
+    release.set()
+    assert closed.wait(5)
+    running['connection'].close.assert_called_once()
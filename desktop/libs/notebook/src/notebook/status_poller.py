@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Status polling of the queries waited for outside of the editor, e.g. by the downloads and scheduled tasks.
+
+Instead of each waiting thread sleeping between its own checks, the queries are registered with the poller of the process.
+Its threads check the ones which are due, at most backend_workers queries of a same backend at a time so that a slow backend
+only holds up its own queries, and back off exponentially with some jitter while the status and logs of a query do not change.
+"""
+
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from notebook.conf import (
+  STATUS_POLL_BACKEND_WORKERS,
+  STATUS_POLL_INITIAL_INTERVAL,
+  STATUS_POLL_MAX_INTERVAL,
+  STATUS_POLL_WORKERS,
+)
+from notebook.metrics import status_checks, status_checks_saved
+
+LOG = logging.getLogger()
+
+RUNNING_STATUSES = ('waiting', 'running', 'submitted')
+
+
+def get_fixed_schedule_checks(elapsed):
+  """
+  Returns the number of checks of the previous fixed schedule over elapsed seconds: every second, then every 5 seconds.
+  """
+  if elapsed < 5:
+    return int(elapsed) + 1
+  return 6 + int((elapsed - 5) / 5)
+
+
+class Backoff(object):
+  """
+  Exponential intervals with jitter, which do not grow while the polled query makes progress.
+  """
+
+  def __init__(self, initial, maximum, factor=2, jitter=0.1):
+    self.initial = initial
+    self.maximum = maximum
+    self.factor = factor
+    self.jitter = jitter
+    self.interval = initial
+
+  def next(self, progress=False):
+    interval = self.interval
+    if not progress:
+      self.interval = min(self.interval * self.factor, self.maximum)
+    return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class _Watch(object):
+
+  def __init__(self, backend, check_status, get_log, backoff):
+    self.backend = backend
+    self.check_status = check_status
+    self.get_log = get_log
+    self.backoff = backoff
+    self.poller_thread = None
+
+    self.due = time.time()
+    self.started = self.due
+    self.checks = 0
+    self.log_offset = 0
+    self.last_status = None
+    self.last_progress = None
+
+    self.updates = deque()  # (status, log) of the checks not handled yet by the waiting thread
+    self.done = False
+    self.error = None
+    self.event = threading.Event()
+
+  def check(self):
+    response = self.check_status()
+    log = self.get_log(self.log_offset) if self.get_log is not None else ''
+    self.checks += 1
+    self.log_offset += len(log)
+
+    status = response['status']
+    progress = bool(log) or status != self.last_status or response.get('progress') != self.last_progress
+    self.last_status = status
+    self.last_progress = response.get('progress')
+
+    self.updates.append((status, log))
+    self.done = status not in RUNNING_STATUSES
+    if not self.done:
+      self.due = time.time() + self.backoff.next(progress=progress)
+
+
+class StatusPoller(object):
+  """
+  Checks the status of the registered queries until they are not running anymore.
+
+  The status and logs are read by the poller threads but handed over to the callbacks in the waiting thread, which can rely on
+  its thread local state, e.g. the current Celery task.
+  """
+
+  def __init__(self, initial_interval, max_interval, workers, backend_workers=1):
+    self.initial_interval = initial_interval
+    self.max_interval = max_interval
+    self.backend_workers = backend_workers
+
+    self._watches = []
+    self._checking = {}  # Number of the queries being checked by backend
+    self._condition = threading.Condition()
+    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='StatusPoller')
+    self._thread = None
+
+  def wait(self, backend, check_status, get_log=None, on_status=None, on_log=None):
+    """
+    Blocks until the query is not running anymore and returns its last status.
+
+    check_status() returns the response of Api.check_status() and get_log(start_from) the logs of the query after the
+    start_from first characters. The errors of the checks are raised here, as well as a RuntimeError if the poller thread stops.
+    """
+    watch = _Watch(backend, check_status, get_log, Backoff(self.initial_interval, self.max_interval))
+
+    with self._condition:
+      self._start()
+      watch.poller_thread = self._thread
+      self._watches.append(watch)
+      self._condition.notify()
+
+    status = None
+    while True:
+      if not watch.event.wait(self.max_interval):
+        if not watch.poller_thread.is_alive():
+          with self._condition:
+            if watch in self._watches:
+              self._watches.remove(watch)
+          raise RuntimeError('The status poller stopped before the %s query was done' % backend)
+        continue
+      watch.event.clear()
+
+      while watch.updates:
+        status, log = watch.updates.popleft()
+        if on_status is not None:
+          on_status(status)
+        if on_log is not None:
+          on_log(log)
+
+      if watch.error is not None:
+        raise watch.error
+      if watch.done and not watch.updates:
+        self._record(watch)
+        return status
+
+  def _start(self):
+    if self._thread is None or not self._thread.is_alive():
+      self._thread = threading.Thread(target=self._run, name='StatusPoller')
+      self._thread.daemon = True
+      self._thread.start()
+
+  def _run(self):
+    try:
+      while True:
+        with self._condition:
+          due = self._pop_due()
+          while not due:
+            self._condition.wait(self._get_timeout())
+            due = self._pop_due()
+
+          for watch in due:
+            self._executor.submit(self._check, watch)
+    except Exception:
+      LOG.exception('The status poller stopped')  # The waiting threads notice it and raise
+
+  def _pop_due(self):
+    now = time.time()
+    due = []
+    watches = []
+    for watch in self._watches:
+      if watch.due <= now and self._checking.get(watch.backend, 0) < self.backend_workers:
+        self._checking[watch.backend] = self._checking.get(watch.backend, 0) + 1
+        due.append(watch)
+      else:
+        watches.append(watch)
+    self._watches = watches
+    return due
+
+  def _get_timeout(self):
+    watches = [watch for watch in self._watches if self._checking.get(watch.backend, 0) < self.backend_workers]
+    if not watches:
+      return None  # Until a query is registered or a check is done
+    return max(min(watch.due for watch in watches) - time.time(), 0)
+
+  def _check(self, watch):
+    try:
+      watch.check()
+    except Exception as e:
+      LOG.debug('Failed to check the status of a %s query: %s' % (watch.backend, e))
+      watch.error = e
+      watch.done = True
+    watch.event.set()
+
+    with self._condition:
+      self._checking[watch.backend] -= 1
+      if not self._checking[watch.backend]:
+        del self._checking[watch.backend]
+      if not watch.done:
+        self._watches.append(watch)
+      self._condition.notify()
+
+  def _record(self, watch):
+    status_checks.inc(watch.checks)
+    status_checks_saved.inc(max(get_fixed_schedule_checks(time.time() - watch.started) - watch.checks, 0))
+
+
+_status_poller = None
+_status_poller_lock = threading.Lock()
+
+
+def get_status_poller():
+  """
+  Returns the status poller of the process.
+  """
+  global _status_poller
+
+  if _status_poller is None:
+    with _status_poller_lock:
+      if _status_poller is None:
+        _status_poller = StatusPoller(
+          initial_interval=STATUS_POLL_INITIAL_INTERVAL.get(),
+          max_interval=STATUS_POLL_MAX_INTERVAL.get(),
+          workers=STATUS_POLL_WORKERS.get(),
+          backend_workers=STATUS_POLL_BACKEND_WORKERS.get()
+        )
+  return _status_poller
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import threading
+
+import pytest
+
+from notebook.status_poller import Backoff, StatusPoller, get_fixed_schedule_checks
+
+
+def test_backoff():
+  backoff = Backoff(initial=1, maximum=5, jitter=0)
+
+  assert [1, 2, 4, 5, 5] == [backoff.next() for _ in range(5)]
+  assert 5 == backoff.next(progress=True)
+
+  backoff = Backoff(initial=1, maximum=5, jitter=0.5)
+  assert 0.5 <= backoff.next() <= 1.5
+  assert 1 <= backoff.next() <= 3
+
+
+def test_get_fixed_schedule_checks():
+  assert 1 == get_fixed_schedule_checks(0)
+  assert 5 == get_fixed_schedule_checks(4.5)
+  assert 6 == get_fixed_schedule_checks(5)
+  assert 8 == get_fixed_schedule_checks(15)
+
+
+class TestStatusPoller(object):
+
+  def setup_method(self):
+    self.poller = StatusPoller(initial_interval=0.01, max_interval=0.05, workers=2, backend_workers=1)
+
+  def test_wait(self):
+    statuses = iter(['submitted', 'running', 'running', 'available'])
+    logs = 'line1\nline2\n'
+    thread = threading.current_thread()
+    received = []
+
+    def get_log(start_from):
+      return logs[start_from:start_from + 6]
+
+    def on_status(status):
+      assert threading.current_thread() is thread
+      received.append(status)
+
+    status = self.poller.wait(
+      'hive', lambda: {'status': next(statuses)}, get_log=get_log, on_status=on_status, on_log=received.append
+    )
+
+    assert 'available' == status
+    assert ['submitted', 'line1\n', 'running', 'line2\n', 'running', '', 'available', ''] == received
+
+  def test_wait_error(self):
+    def check_status():
+      raise RuntimeError('Operation expired')
+
+    with pytest.raises(RuntimeError):
+      self.poller.wait('hive', check_status)
+
+    assert 'expired' == self.poller.wait('hive', lambda: {'status': 'expired'})
+
+  def test_wait_concurrently(self):
+    lock = threading.Lock()
+    checking = {}
+    results = []
+
+    def check_status(backend):
+      with lock:
+        checking[backend] = checking.get(backend, 0) + 1
+        assert checking[backend] <= 1  # No more than backend_workers checks of a backend at a time
+      time.sleep(0.01)
+      with lock:
+        checking[backend] -= 1
+      return {'status': 'available'}
+
+    def wait(backend):
+      results.append(self.poller.wait(backend, lambda: check_status(backend)))
+
+    threads = [threading.Thread(target=wait, args=(backend,)) for backend in ['hive', 'impala', 'hive', 'impala']]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join(5)
+
+    assert ['available'] * 4 == results
+
+  def test_wait_slow_check(self):
+    poller = StatusPoller(initial_interval=0.01, max_interval=0.05, workers=2, backend_workers=2)
+    slow = threading.Event()
+
+    def wait_slow():
+      poller.wait('hive', lambda: slow.wait(5) and {'status': 'available'})
+
+    thread = threading.Thread(target=wait_slow)
+    thread.start()
+    try:
+      time.sleep(0.05)
+      assert 'available' == poller.wait('hive', lambda: {'status': 'available'})  # Not held up by the slow check
+    finally:
+      slow.set()
+      thread.join(5)
+
+  def test_wait_stopped_poller(self):
+    self.poller._executor.shutdown()
+
+    with pytest.raises(RuntimeError, match='stopped'):
+      self.poller.wait('hive', lambda: {'status': 'available'})
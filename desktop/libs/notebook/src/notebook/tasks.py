@@ -17,11 +17,8 @@
 
 from __future__ import absolute_import, unicode_literals
 
-import csv
-import sys
 import json
 import time
-import codecs
 import logging
 import datetime
 from builtins import next, object
@@ -44,6 +41,7 @@ from desktop.settings import CACHES_CELERY_KEY, CACHES_CELERY_QUERY_RESULT_KEY
 from notebook.api import _get_statement
 from notebook.connectors.base import ExecutionWrapper, QueryError, QueryExpired, get_api
 from notebook.models import MockedDjangoRequest, Notebook, make_notebook
+from notebook.result_store import ResultReader, ResultWriter, checkpoint_key, index_key
 from notebook.sql_utils import get_current_statement
 from useradmin.models import User
 
@@ -63,15 +61,19 @@ STATE_MAP = {
   states.REJECTED: 'rejected',
   states.IGNORED: 'ignored'
 }
+PROGRESS_INTERVAL = 10  # Seconds between the progress updates of a download
 storage_info = json.loads(TASK_SERVER.RESULT_STORAGE.get())
 storage = get_storage_class(storage_info.get('backend'))(**storage_info.get('properties', {}))
 
 
 class ExecutionWrapperCallback(object):
-  def __init__(self, uuid, meta, f_log):
+  def __init__(self, uuid, meta, f_log, statement=None):
     self.meta = meta
     self.uuid = uuid
     self.f_log = f_log
+    self.statement = statement
+    self._progress_start = None
+    self._progress_reported = 0
 
   def on_execute(self, handle):
     if handle.get('sync', False) and handle['result'].get('data'):
@@ -91,12 +93,36 @@ class ExecutionWrapperCallback(object):
     self.meta['status'] = status
     download_to_file.update_state(task_id=self.uuid, state='PROGRESS', meta=self.meta)
 
+  def on_progress(self, row_count, bytes_written):
+    """
+    Reports the rows and bytes written along with their throughput, measured from the first written block.
+    """
+    now = time.time()
+    if self._progress_start is None:
+      self._progress_start = (now, row_count, bytes_written)
+      return
+
+    start, start_rows, start_bytes = self._progress_start
+    elapsed = max(now - start, 1e-6)
+    self.meta['row_counter'] = row_count
+    self.meta['bytes_written'] = bytes_written
+    self.meta['rows_per_second'] = int((row_count - start_rows) / elapsed)
+    self.meta['bytes_per_second'] = int((bytes_written - start_bytes) / elapsed)
+
+    if now - self._progress_reported >= PROGRESS_INTERVAL:
+      self._progress_reported = now
+      download_to_file.update_state(task_id=self.uuid, state='PROGRESS', meta=self.meta)
+
+  def on_checkpoint(self, checkpoint):
+    checkpoint['handle'] = self.meta['handle']
+    checkpoint['statement'] = self.statement
+
 
 # TODO: Add periodic cleanup task
 # TODO: UI should be able to close a query that is available, but not expired
 # TODO: use cache for editor 1000 rows and storage for result export
 # TODO: Move FETCH_RESULT_LIMIT to front end
-@app.task()
+@app.task(acks_late=True, reject_on_worker_lost=True)
 def download_to_file(notebook, snippet, file_format='csv', max_rows=-1, **kwargs):
   task_id = notebook['uuid']
   result_key = _result_key(task_id)
@@ -107,37 +133,82 @@ def download_to_file(notebook, snippet, file_format='csv', max_rows=-1, **kwargs
 
   meta = {'row_counter': 0, 'handle': {}, 'status': '', 'truncated': False}
 
-  with storage.open(_log_key(notebook, snippet), 'wb') as f_log:
-    result_wrapper = ExecutionWrapper(
-        api,
-        notebook,
-        snippet,
-        ExecutionWrapperCallback(notebook['uuid'], meta, f_log)
-    )
-    content_generator = DataAdapter(
-        result_wrapper,
-        max_rows=max_rows,
-        store_data_type_in_header=True
-    )
-    response = export_csvxls.create_generator(content_generator, file_format)
+  cache = caches[CACHES_CELERY_QUERY_RESULT_KEY] if TASK_SERVER.RESULT_CACHE.get() else None
+  # Cached blocks might have expired since the worker died, so only results in the storage are resumed
+  checkpoint = _load_checkpoint(result_key, snippet) if cache is None and file_format == 'csv' else None
+  if checkpoint is None:
+    storage.delete(checkpoint_key(result_key))
 
-    with storage.open(result_key, 'wb') as f:
-      for chunk in response:
-        f.write(chunk.encode('utf-8'))
+  try:
+    with storage.open(_log_key(notebook, snippet), 'ab' if checkpoint else 'wb') as f_log:
+      callback = ExecutionWrapperCallback(notebook['uuid'], meta, f_log, statement=snippet.get('statement'))
+      result_wrapper = ExecutionWrapper(api, notebook, snippet, callback)
+      writer = ResultWriter(storage, result_key, cache=cache, callback=callback)
+
+      if checkpoint:
+        LOG.info('Resuming the download of %s after row %d' % (task_id, checkpoint['row_count']))
+        _resume(result_wrapper, checkpoint.get('handle'))
+        meta['handle'] = snippet['result']['handle']
+        writer.resume(checkpoint)
+
+      content_generator = DataAdapter(
+          result_wrapper,
+          max_rows=max_rows,
+          store_data_type_in_header=True
+      )
+      if file_format == 'csv':
+        writer.write(content_generator)
+      else:
+        # Only CSV results are indexed by blocks of rows, the other formats can be downloaded but not paged
+        with storage.open(result_key, 'wb') as f:
+          for chunk in export_csvxls.create_generator(content_generator, file_format):
+            f.write(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+
+      meta['row_counter'] = content_generator.row_counter
+      meta['truncated'] = content_generator.is_truncated
+      download_to_file.update_state(task_id=task_id, state='AVAILABLE', meta=meta)
+  except Exception:
+    storage.delete(checkpoint_key(result_key))  # Only a redelivered task resumes the download
+    raise
 
-    if TASK_SERVER.RESULT_CACHE.get():
-      with storage.open(result_key, 'rb') as store:
-        with codecs.getreader('utf-8')(store) as text_file:
-          delimiter = ','
-          csv_reader = csv.reader(text_file, delimiter=delimiter)
-          caches[CACHES_CELERY_QUERY_RESULT_KEY].set(result_key, [row for row in csv_reader], 60 * 5)
-          LOG.info('Caching results %s.' % result_key)
+  return meta
 
-    meta['row_counter'] = content_generator.row_counter
-    meta['truncated'] = content_generator.is_truncated
-    download_to_file.update_state(task_id=task_id, state='AVAILABLE', meta=meta)
 
-  return meta
+def _load_checkpoint(result_key, snippet):
+  """
+  Returns the checkpoint of the download when the task was redelivered after its worker was lost while fetching the
+  result of the same statement. A new execution of the notebook reuses the task id and starts from scratch.
+  """
+  if not (download_to_file.request.delivery_info or {}).get('redelivered'):
+    return None
+
+  checkpoint = ResultWriter.load_checkpoint(storage, result_key)
+  if checkpoint is not None and checkpoint.get('statement') != snippet.get('statement'):
+    LOG.warning('Not resuming the download of %s: the checkpoint is of another statement' % result_key)
+    return None
+
+  return checkpoint
+
+
+def _resume(result_wrapper, handle):
+  """
+  Points the execution to the query handle of the checkpoint, when it can still be read from its first row. Otherwise the
+  query will be executed again. The rows already written are skipped in both cases, as the position of the server cursor
+  is unknown: the worker might have fetched more rows after the checkpoint.
+  """
+  snippet = result_wrapper.snippet
+  snippet.setdefault('result', {})['handle'] = handle or {}
+
+  if handle and handle.get('guid'):
+    try:
+      if result_wrapper.api.can_start_over(result_wrapper.notebook, snippet):
+        result_wrapper.should_close = True
+        return
+    except Exception as e:
+      LOG.warning('The query handle of the checkpoint is not valid anymore: %s' % e)
+
+  LOG.info('The query will be executed again')
+  snippet['result']['handle'] = {}
 
 
 @app.task(ignore_result=True)
@@ -361,24 +432,18 @@ def fetch_result(notebook, snippet, rows, start_over, **kwargs):
   skip = 0
   if not start_over:
     skip = caches[CACHES_CELERY_KEY].get(_fetch_progress_key(notebook, snippet), default=0)
-  target = skip + rows
 
   if info.get('handle', {}).get('has_result_set', False):
-    csv.field_size_limit(sys.maxsize)
-    count = 0
-    headers, csv_reader = _get_data(task_id)
+    reader = _get_reader(task_id)
+    if reader.index is None:
+      raise QueryError('Cached results %s not found.' % _result_key(task_id))
 
-    for col in headers:
+    for col in reader.headers:
       split = col.split('|')
       split_type = split[1] if len(split) > 1 else 'STRING_TYPE'
       cols.append({'name': split[0], 'type': split_type, 'comment': None})
-    for row in csv_reader:
-      count += 1
-      if count <= skip:  # TODO: seek(skip) or [skip:]
-        continue
-      data.append(row)
-      if count >= target:
-        break
+    data.extend(reader.rows(skip, rows))
+    count = skip + len(data)
 
     caches[CACHES_CELERY_KEY].set(_fetch_progress_key(notebook, snippet), count, timeout=None)
 
@@ -387,22 +452,11 @@ def fetch_result(notebook, snippet, rows, start_over, **kwargs):
   return results
 
 
-def _get_data(task_id):
+def _get_reader(task_id):
   result_key = _result_key(task_id)
+  cache = caches[CACHES_CELERY_QUERY_RESULT_KEY] if TASK_SERVER.RESULT_CACHE.get() else None
 
-  if TASK_SERVER.RESULT_CACHE.get():
-    csv_reader = caches[CACHES_CELERY_QUERY_RESULT_KEY].get(result_key)  # TODO check if expired
-    if csv_reader is None:
-      raise QueryError('Cached results %s not found.' % result_key)
-    headers = csv_reader[0] if csv_reader else []  # TODO check size
-    csv_reader = csv_reader[1:] if csv_reader else []
-  else:
-    f = storage.open(result_key, 'rb')
-    delimiter = ','
-    csv_reader = csv.reader(f, delimiter=delimiter)
-    headers = next(csv_reader, [])
-
-  return headers, csv_reader
+  return ResultReader(storage, result_key, cache=cache)
 
 
 def fetch_result_size(*args, **kwargs):
@@ -479,6 +533,9 @@ def _cleanup(notebook, snippet):
   task_id = _get_query_key(notebook, snippet)
 
   storage.delete(_result_key(task_id))  # TODO: abstract storage + caches
+  storage.delete(index_key(_result_key(task_id)))
+  storage.delete(checkpoint_key(_result_key(task_id)))
+  ResultReader.evict(_result_key(task_id))
   storage.delete(_log_key(notebook, snippet))
   caches[CACHES_CELERY_KEY].delete(_fetch_progress_key(notebook, snippet))
 
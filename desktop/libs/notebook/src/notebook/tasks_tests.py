@@ -25,7 +25,7 @@ from celery import states
 
 from desktop.lib.django_test_util import make_logged_in_client
 from notebook.connectors.sql_alchemy import SqlAlchemyApi
-from notebook.tasks import close_statement, download_to_file, get_log, run_sync_query
+from notebook.tasks import ExecutionWrapperCallback, _load_checkpoint, close_statement, download_to_file, get_log, run_sync_query
 from useradmin.models import User
 
 LOG = logging.getLogger()
@@ -137,3 +137,54 @@ class TestRunSyncQueryTask():
             task = run_sync_query(query, self.user)
 
             assert task == {'history_uuid': '1', 'uuid': '1'}
+
+
+class TestExecutionWrapperCallback():
+
+  def test_on_progress(self):
+    meta = {'row_counter': 0, 'handle': {'guid': 'guid'}}
+    callback = ExecutionWrapperCallback('uuid', meta, Mock())
+
+    with patch('notebook.tasks.download_to_file') as download_to_file:
+      with patch('notebook.tasks.time') as time:
+        time.time.side_effect = [100, 110, 112]
+
+        callback.on_progress(1000, 50000)
+        callback.on_progress(11000, 550000)
+        callback.on_progress(12000, 600000)
+
+        download_to_file.update_state.assert_called_once_with(task_id='uuid', state='PROGRESS', meta=meta)
+
+    assert 12000 == meta['row_counter']
+    assert 600000 == meta['bytes_written']
+    assert 916 == meta['rows_per_second']
+    assert 45833 == meta['bytes_per_second']
+
+  def test_on_checkpoint(self):
+    callback = ExecutionWrapperCallback('uuid', {'handle': {'guid': 'guid'}}, Mock(), statement='SELECT 1')
+    checkpoint = {'row_count': 1000}
+
+    callback.on_checkpoint(checkpoint)
+
+    assert {'row_count': 1000, 'handle': {'guid': 'guid'}, 'statement': 'SELECT 1'} == checkpoint
+
+
+class TestLoadCheckpoint():
+
+  def _load_checkpoint(self, redelivered, statement):
+    checkpoint = {'row_count': 1000, 'handle': {'guid': 'guid'}, 'statement': 'SELECT 1'}
+
+    with patch('notebook.tasks.download_to_file') as download_to_file:
+      with patch('notebook.tasks.ResultWriter.load_checkpoint', return_value=checkpoint):
+        download_to_file.request.delivery_info = {'redelivered': redelivered}
+
+        return _load_checkpoint('uuid_result', {'statement': statement})
+
+  def test_redelivered(self):
+    assert 1000 == self._load_checkpoint(redelivered=True, statement='SELECT 1')['row_count']
+
+  def test_new_execution(self):
+    assert self._load_checkpoint(redelivered=False, statement='SELECT 1') is None
+
+  def test_other_statement(self):
+    assert self._load_checkpoint(redelivered=True, statement='SELECT 2') is None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Counts the database queries of the directory hierarchy operations of documents: walking the parent directories and the
+children level by level versus reading the ancestors index.
+
+A tree of directories and queries is created in the home directory of the user, in a transaction which is rolled back.
+"""
+
+import os
+import time
+import argparse
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from desktop.models import Directory, Document2  # noqa: E402
+from useradmin.models import User  # noqa: E402
+
+
+def legacy_get_child_ids_recursively(directory_id):
+  directory = Directory.objects.get(id=directory_id)
+  children_ids = []
+  for child in directory.children.filter(is_history=False).filter(is_managed=False):
+    children_ids.append(child.id)
+    if child.is_directory:
+      children_ids.extend(legacy_get_child_ids_recursively(child.id))
+  return children_ids
+
+
+def legacy_can_write(doc, user):
+  return (
+    doc.owner == user
+    or any([perm.user_has_access(user) for perm in doc.get_permissions('write')])
+    or (doc.parent_directory and legacy_can_write(doc.parent_directory, user))
+  )
+
+
+def legacy_contains_cycle(doc):
+  # Walks the parent directories up to the root when there is no cycle
+  parent = doc.parent_directory
+  while parent is not None:
+    if parent.uuid == doc.uuid:
+      return True
+    parent = parent.parent_directory
+  return False
+
+
+def create_tree(user, parent, depth, fanout, queries):
+  documents = []
+  directory = Directory.objects.create(name='benchmark_%d' % depth, owner=user, parent_directory=parent)
+  for i in range(queries):
+    documents.append(
+      Document2.objects.create(name='query_%d.sql' % i, type='query-hive', owner=user, data={}, parent_directory=directory)
+    )
+  if depth > 1:
+    for i in range(fanout):
+      documents.extend(create_tree(user, directory, depth - 1, fanout, queries))
+  return [directory] + documents
+
+
+def measure(function, *args):
+  with CaptureQueriesContext(connection) as queries:
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+  return len(queries), elapsed
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--username', required=True, help='Owner of the tree.')
+  parser.add_argument('--other-username', required=True, help='User checking the write permission of the deepest query.')
+  parser.add_argument('--depth', type=int, default=6, help='Number of levels of directories.')
+  parser.add_argument('--fanout', type=int, default=3, help='Number of sub-directories per directory.')
+  parser.add_argument('--queries', type=int, default=10, help='Number of queries per directory.')
+  args = parser.parse_args()
+
+  user = User.objects.get(username=args.username)
+  other = User.objects.get(username=args.other_username)
+
+  with transaction.atomic():
+    home = Document2.objects.get_home_directory(user)
+    documents = create_tree(user, home, args.depth, args.fanout, args.queries)
+    root, deepest = documents[0], Document2.objects.get(id=documents[-1].id)
+    print('documents=%d' % len(documents))
+
+    scenarios = (
+      ('children', lambda: legacy_get_child_ids_recursively(root.id), lambda: list(root._get_child_ids_recursively(root.id))),
+      ('can_write', lambda: legacy_can_write(Document2.objects.get(id=deepest.id), other),
+        lambda: Document2.objects.get(id=deepest.id).can_write(other)),
+      ('cycle', lambda: legacy_contains_cycle(Document2.objects.get(id=deepest.id)),
+        lambda: Document2.objects.get(id=deepest.id)._contains_cycle()),
+    )
+    for name, legacy, indexed in scenarios:
+      for implementation, function in (('legacy', legacy), ('indexed', indexed)):
+        queries, elapsed = measure(function)
+        print('%-9s %-7s queries=%d time=%.2fms' % (name, implementation, queries, elapsed * 1000))
+
+    transaction.set_rollback(True)
+
+
+if __name__ == '__main__':
+  main()
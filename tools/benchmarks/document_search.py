@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times the search of documents by text: matching the text of all the documents of the user versus first looking up their
+words in the search terms index.
+
+Synthetic queries with words of a Zipf distributed vocabulary are created for the user, in a transaction which is
+rolled back.
+"""
+
+import os
+import time
+import random
+import string
+import argparse
+from itertools import accumulate
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from desktop.models import Document2, Document2SearchTerm, SearchTerm, get_search_terms  # noqa: E402
+from useradmin.models import User  # noqa: E402
+
+BATCH_SIZE = 5000
+
+
+def legacy_search(documents, search_text):
+  return documents.filter(Q(name__icontains=search_text) | Q(description__icontains=search_text) | Q(search__icontains=search_text))
+
+
+def indexed_search(documents, search_text):
+  return documents.search_documents(search_text=search_text)
+
+
+def create_documents(user, count, vocabulary_size, seed):
+  random.seed(seed)
+  vocabulary = [
+    ''.join(random.choice(string.ascii_lowercase) for i in range(random.randint(4, 12))) for j in range(vocabulary_size)
+  ]
+  cum_weights = list(accumulate(1.0 / rank for rank in range(1, vocabulary_size + 1)))
+
+  def words(k):
+    return random.choices(vocabulary, cum_weights=cum_weights, k=k)
+
+  term_ids = {}
+
+  for start in range(0, count, BATCH_SIZE):
+    documents = Document2.objects.bulk_create([
+      Document2(
+        name='%s.sql' % '_'.join(words(2)),
+        description=' '.join(words(5)),
+        search='SELECT %s FROM %s WHERE %s = 1' % (', '.join(words(4)), words(1)[0], words(1)[0]),
+        type='query-hive',
+        owner=user,
+        is_history=True,
+      ) for i in range(min(BATCH_SIZE, count - start))
+    ])
+    if documents[0].id is None:  # The database does not return the ids of the new rows
+      documents = Document2.objects.filter(owner=user, is_history=True).order_by('-id')[:len(documents)]
+
+    terms = dict(
+      (document.id, get_search_terms(' '.join((document.name, document.description, document.search)))) for document in documents
+    )
+    term_ids.update(SearchTerm.objects.get_ids(set().union(*terms.values()).difference(term_ids)))
+    Document2SearchTerm.objects.bulk_create([
+      Document2SearchTerm(document_id=doc_id, term_id=term_ids[term]) for doc_id, doc_terms in terms.items() for term in doc_terms
+    ], batch_size=BATCH_SIZE)
+
+  return vocabulary
+
+
+def measure(search, documents, search_text, runs):
+  elapsed = []
+  for i in range(runs):
+    start = time.perf_counter()
+    count = search(documents, search_text).count()
+    elapsed.append(time.perf_counter() - start)
+  return count, min(elapsed)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--username', required=True, help='Owner of the documents.')
+  parser.add_argument('--documents', type=int, default=100000, help='Number of documents.')
+  parser.add_argument('--vocabulary', type=int, default=50000, help='Number of distinct words.')
+  parser.add_argument('--runs', type=int, default=3, help='Number of runs of each search, the fastest is reported.')
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  user = User.objects.get(username=args.username)
+
+  with transaction.atomic():
+    start = time.perf_counter()
+    vocabulary = create_documents(user, args.documents, args.vocabulary, args.seed)
+    print('documents=%d created in %.1fs' % (args.documents, time.perf_counter() - start))
+
+    rare, common = vocabulary[-1], vocabulary[0]
+    searches = (
+      ('rare word', rare),
+      ('common word', common),
+      ('word fragment', rare[1:-1]),
+      ('two words', '%s %s' % (vocabulary[10], vocabulary[11])),
+      ('keyword', 'select'),
+      ('short text', 'ab'),
+    )
+
+    documents = Document2.objects.documents(user, include_history=True)
+    for name, search_text in searches:
+      for implementation, search in (('legacy', legacy_search), ('indexed', indexed_search)):
+        count, elapsed = measure(search, documents, search_text, args.runs)
+        print('%-13s %-7s text=%-16r matches=%-8d time=%.1fms' % (name, implementation, search_text, count, elapsed * 1000))
+
+    transaction.set_rollback(True)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Measures the rows/sec and the peak of Python memory allocations of the CSV and XLSX exports, comparing the previous
+implementation (one tablib Dataset per batch, the whole workbook saved in memory) with the streaming writers.
+"""
+
+import os
+import re
+import time
+import argparse
+import tracemalloc
+from io import BytesIO
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import six  # noqa: E402
+import tablib  # noqa: E402
+import openpyxl  # noqa: E402
+
+from desktop.lib import export_csvxls  # noqa: E402
+
+
+def legacy_encode_row(row, encoding='utf-8', make_excel_links=False):
+  encoded_row = []
+  for cell in row:
+    if isinstance(cell, six.string_types):
+      cell = re.sub(r'[\000-\010]|[\013-\014]|[\016-\037]', '?', cell)
+      if make_excel_links:
+        cell = re.compile('^(https?://.+)', re.IGNORECASE).sub(r'=HYPERLINK("\1")', cell)
+    encoded_row.append(export_csvxls.nullify(cell))
+  return encoded_row
+
+
+def legacy_generator(content_generator, format):
+  if format == 'csv':
+    show_headers = True
+    for headers, data in content_generator:
+      dataset = tablib.Dataset()
+      if show_headers and headers:
+        dataset.headers = legacy_encode_row(headers)
+      for row in data:
+        dataset.append(legacy_encode_row(row))
+      yield dataset.csv
+      show_headers = False
+  else:
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    for headers, data in content_generator:
+      for row in data:
+        worksheet.append(legacy_encode_row(row, make_excel_links=True))
+    output = BytesIO()
+    workbook.save(output)
+    yield output.getvalue()
+
+
+def content_generator(rows, batch_size):
+  headers = ['id', 'name', 'url', 'amount', 'comment']
+  for start in range(0, rows, batch_size):
+    yield headers, [
+      [i, 'name_%d' % i, 'https://gethue.com/%d' % i, i * 1.5, None if i % 7 else 'line\x01break']
+      for i in range(start, min(rows, start + batch_size))
+    ]
+
+
+def measure(generator_fn, format, rows, batch_size):
+  tracemalloc.start()
+  start = time.perf_counter()
+  size = 0
+  for chunk in generator_fn(content_generator(rows, batch_size), format):
+    size += len(chunk)
+  elapsed = time.perf_counter() - start
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return rows / elapsed, peak / 1024 / 1024, size
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--rows', type=int, default=200000, help='Number of rows to export.')
+  parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows per fetched batch.')
+  parser.add_argument('--formats', default='csv,xls', help='Comma separated formats to export.')
+  args = parser.parse_args()
+
+  for format in args.formats.split(','):
+    for name, generator_fn in (('legacy', legacy_generator), ('streaming', export_csvxls.create_generator)):
+      rows_per_sec, peak_mb, size = measure(generator_fn, format, args.rows, args.batch_size)
+      print('%-4s %-10s rows/sec=%-10d peak_mb=%-8.1f bytes=%d' % (format, name, rows_per_sec, peak_mb, size))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the decoding of a HiveServer2 TRowSet into rows: popping the first value of every column for each row versus
+decoding each column once and transposing the column arrays.
+"""
+
+import os
+import time
+import random
+import argparse
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from TCLIService.ttypes import (  # noqa: E402
+  TBoolColumn,
+  TColumn,
+  TColumnDesc,
+  TDoubleColumn,
+  TI64Column,
+  TRowSet,
+  TStringColumn,
+  TTableSchema,
+)
+
+from beeswax.server.hive_server2_lib import HiveServerTColumnValue2, HiveServerTRowSet2  # noqa: E402
+
+
+def null_bitmap(size, ratio):
+  mask = bytearray((size + 7) // 8)
+  for i in range(size):
+    if random.random() < ratio:
+      mask[i // 8] |= 1 << (i % 8)
+  return bytes(mask)
+
+
+def make_row_set(size, null_ratio):
+  columns = [
+    TColumn(i64Val=TI64Column(values=list(range(size)), nulls=null_bitmap(size, null_ratio))),
+    TColumn(stringVal=TStringColumn(values=['value_%d' % i for i in range(size)], nulls=null_bitmap(size, null_ratio))),
+    TColumn(doubleVal=TDoubleColumn(values=[i * 0.5 for i in range(size)], nulls=null_bitmap(size, null_ratio))),
+    TColumn(boolVal=TBoolColumn(values=[i % 2 == 0 for i in range(size)], nulls=null_bitmap(size, null_ratio))),
+  ]
+  schema = TTableSchema(columns=[TColumnDesc(columnName='c%d' % i, position=i) for i in range(len(columns))])
+  return TRowSet(startRowOffset=0, rows=[], columns=columns), schema
+
+
+def legacy_rows(row_set):
+  rows = []
+  while True:
+    try:
+      rows.append([HiveServerTColumnValue2(field).val.pop(0) for field in row_set.columns])
+    except IndexError:
+      return rows
+
+
+def columnar_rows(row_set, schema):
+  return [row.fields() for row in HiveServerTRowSet2(row_set, schema)]
+
+
+def timed(fn, *args):
+  start = time.perf_counter()
+  rows = fn(*args)
+  return time.perf_counter() - start, len(rows)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--sizes', default='1000,100000,1000000', help='Comma separated number of rows to decode.')
+  parser.add_argument('--null-ratio', type=float, default=0.1, help='Ratio of null values in each column.')
+  parser.add_argument('--skip-legacy-above', type=int, default=100000, help='Do not time the quadratic path above this size.')
+  args = parser.parse_args()
+
+  for size in [int(size) for size in args.sizes.split(',')]:
+    row_set, schema = make_row_set(size, args.null_ratio)
+    columnar, count = timed(columnar_rows, row_set, schema)
+
+    if size <= args.skip_legacy_above:
+      row_set, schema = make_row_set(size, args.null_ratio)
+      legacy, _ = timed(legacy_rows, row_set)
+      legacy = '%.3fs' % legacy
+    else:
+      legacy = 'skipped'
+
+    print('rows=%-9d decoded=%-9d legacy=%-10s columnar=%.3fs' % (size, count, legacy, columnar))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures the time, the peak of Python memory allocations and the size of the largest statement of the "create table from a
+local file" importer by file size, comparing the previous implementation (one INSERT statement with all the rows) with the
+batched INSERT statements and with the staging of its rows on the file system for LOAD DATA.
+"""
+
+import os
+import csv
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from indexer.indexers.sql import SQLIndexer  # noqa: E402
+
+SOURCE = {'format': {'hasHeader': True}}
+COLUMNS = [{'name': name, 'type': 'string', 'keep': True} for name in ('id', 'name', 'city', 'amount', 'comment')]
+
+
+class DiscardingFs(object):
+  """
+  File system accepting the staged file without storing it, to only measure the cost on the Hue side.
+  """
+
+  def get_home_dir(self):
+    return '/user/benchmark'
+
+  def do_as_user(self, user, fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+  def mkdir(self, path, mode=None):
+    pass
+
+  def create(self, path, overwrite=False, data=None):
+    pass
+
+  def append(self, path, data):
+    pass
+
+
+def legacy_inserts(indexer, path):
+  with open(path, 'r') as local_file:
+    _csv_rows = []
+    for count, row in enumerate(csv.reader(local_file)):
+      if count == 0 or not row:
+        continue
+      _csv_rows.append(tuple(row))
+    return ['\nINSERT INTO default.test VALUES %s;\n' % str(_csv_rows)[1:-1]]
+
+
+def batched_inserts(indexer, path):
+  with open(path, 'r') as local_file:
+    rows = indexer._iter_local_file_rows(local_file, SOURCE, COLUMNS, [], 'hive')
+    return list(indexer._iter_insert_statements('default', 'test', rows))
+
+
+def staged(indexer, path):
+  return [indexer._stage_local_file_rows(path, SOURCE, COLUMNS, [], 'hive')]
+
+
+def write_file(path, size_mb):
+  with open(path, 'w', newline='') as local_file:
+    writer = csv.writer(local_file)
+    writer.writerow([col['name'] for col in COLUMNS])
+    i = 0
+    while local_file.tell() < size_mb * 1024 * 1024:
+      writer.writerow([i, 'name_%d' % i, 'San Francisco', i * 1.5, 'it\'s a "quoted" comment'])
+      i += 1
+
+
+def measure(fn, indexer, path):
+  tracemalloc.start()
+  start = time.perf_counter()
+  statements = fn(indexer, path)
+  elapsed = time.perf_counter() - start
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return elapsed, peak / 1024 / 1024, max(len(statement) for statement in statements)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--sizes', default='1,10,50', help='Comma separated sizes of the files in MB.')
+  args = parser.parse_args()
+
+  indexer = SQLIndexer(user=None, fs=DiscardingFs())
+
+  for size_mb in [int(size) for size in args.sizes.split(',')]:
+    with tempfile.NamedTemporaryFile(suffix='.csv') as local_file:
+      write_file(local_file.name, size_mb)
+      for name, fn in (('legacy', legacy_inserts), ('batched', batched_inserts), ('staged', staged)):
+        elapsed, peak_mb, largest = measure(fn, indexer, local_file.name)
+        print('size_mb=%-4d %-8s time=%.2fs peak_mb=%-8.1f largest_statement=%d' % (size_mb, name, elapsed, peak_mb, largest))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures the time and the peak of Python memory allocations of indexing a query result into Solr, comparing the previous
+implementation (fetch then index each batch in turn, CSV with tablib) with the pipelined one, by number of workers.
+
+The latencies of the fetches and of the Solr update requests are simulated.
+"""
+
+import os
+import time
+import numbers
+import argparse
+import tracemalloc
+from unittest.mock import Mock, patch
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import tablib  # noqa: E402
+
+from indexer.conf import QUERY_INDEXING_BATCH_SIZE, QUERY_INDEXING_WORKERS  # noqa: E402
+from indexer.controller import CollectionManagerController  # noqa: E402
+
+COLUMNS = ['id', 'name', 'city', 'amount', 'comment']
+
+
+class FakeSolrClient(object):
+
+  def __init__(self, user, latency=0):
+    self.latency = latency
+
+  def index(self, name, data, **kwargs):
+    time.sleep(self.latency)
+    return {'responseHeader': {'status': 0}}
+
+
+def get_fetch_handle(rows, latency):
+  offsets = [0]
+
+  def fetch_handle(batch_size, start_over):
+    time.sleep(latency)
+    if start_over:
+      offsets[0] = 0
+    offset = offsets[0]
+    offsets[0] += batch_size
+    data = [[i, 'name_%d' % i, 'San Francisco', i * 1.5, None] for i in range(offset, min(offset + batch_size, rows))]
+    return {'data': data, 'has_more': offset + batch_size < rows}
+
+  return fetch_handle
+
+
+def legacy_update_data_from_hive(client, collection_or_core_name, columns, fetch_handle, batch_size):
+  row_count = 0
+  has_more = True
+
+  while has_more:
+    result = fetch_handle(batch_size, row_count == 0)
+    has_more = result['has_more']
+
+    if result['data']:
+      dataset = tablib.Dataset()
+      dataset.append(columns)
+      for row in result['data']:
+        dataset.append([cell if cell else (0 if isinstance(cell, numbers.Number) else '') for cell in row])
+      client.index(name=collection_or_core_name, data=dataset.csv)
+      row_count += len(result['data'])
+
+  return row_count
+
+
+def measure(fn):
+  tracemalloc.start()
+  start = time.perf_counter()
+  row_count = fn()
+  elapsed = time.perf_counter() - start
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return row_count, elapsed, peak / 1024 / 1024
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--rows', type=int, default=100000, help='Number of rows of the query result.')
+  parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows by fetch and update request.')
+  parser.add_argument('--workers', default='1,2,4,8', help='Comma separated numbers of concurrent update requests.')
+  parser.add_argument('--fetch-latency', type=float, default=0.02, help='Seconds of each fetch.')
+  parser.add_argument('--index-latency', type=float, default=0.05, help='Seconds of each update request.')
+  args = parser.parse_args()
+
+  def legacy():
+    client = FakeSolrClient(None, args.index_latency)
+    return legacy_update_data_from_hive(client, 'logs', COLUMNS, get_fetch_handle(args.rows, args.fetch_latency), args.batch_size)
+
+  row_count, elapsed, peak_mb = measure(legacy)
+  print('%-12s rows=%-8d time=%.2fs peak_mb=%.1f' % ('legacy', row_count, elapsed, peak_mb))
+
+  resets = [QUERY_INDEXING_BATCH_SIZE.set_for_testing(args.batch_size)]
+  try:
+    with patch('indexer.controller.SolrClient', lambda user: FakeSolrClient(user, args.index_latency)):
+      for workers in [int(workers) for workers in args.workers.split(',')]:
+        resets.append(QUERY_INDEXING_WORKERS.set_for_testing(workers))
+
+        def pipelined():
+          controller = CollectionManagerController(Mock())
+          return controller.update_data_from_hive('logs', COLUMNS, get_fetch_handle(args.rows, args.fetch_latency))[0]
+
+        row_count, elapsed, peak_mb = measure(pipelined)
+        print('%-12s rows=%-8d time=%.2fs peak_mb=%.1f' % ('workers=%d' % workers, row_count, elapsed, peak_mb))
+  finally:
+    for reset in reversed(resets):
+      reset()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the overhead per request of the metrics of the Gunicorn workers: pushing a dump of all the metrics of the worker
+to a multiprocessing Manager dict when a request starts and ends, versus recording the request in the memory-mapped
+shared metrics.
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from multiprocessing import Manager
+from unittest.mock import patch
+
+import pyformance
+
+from desktop.lib.metrics import registry as metrics_registry
+from desktop.lib.metrics.shared import SharedMetrics
+
+
+def create_metrics(registry):
+  counters = [
+    registry.counter(name=name, label=name, description=name, numerator='requests')
+    for name in metrics_registry.SHARED_COUNTERS
+  ]
+  timers = [
+    registry.timer(
+      name=name, label=name, description=name, numerator='seconds', counter_numerator='requests', rate_denominator='seconds'
+    )
+    for name in metrics_registry.SHARED_TIMERS
+  ]
+  return counters[0], timers[0]
+
+
+def legacy_requests(requests):
+  registry = metrics_registry.MetricsRegistry(pyformance.MetricsRegistry())
+  active_requests, response_time = create_metrics(registry)
+  shared = Manager().dict()
+
+  start = time.perf_counter()
+  for i in range(requests):
+    timer = response_time.time()
+    active_requests.inc()
+    shared[os.getpid()] = registry.dump_metrics()
+    timer.stop()
+    active_requests.dec()
+    shared[os.getpid()] = registry.dump_metrics()
+  return time.perf_counter() - start
+
+
+def shared_requests(requests, path):
+  registry = metrics_registry.MetricsRegistry(pyformance.MetricsRegistry())
+  active_requests, response_time = create_metrics(registry)
+  shared = SharedMetrics(
+    path,
+    counters=metrics_registry.SHARED_COUNTERS,
+    timers=metrics_registry.SHARED_TIMERS,
+    gauges=metrics_registry.SHARED_GAUGES,
+    owner=os.getpid()
+  )
+
+  with patch.object(registry, 'get_shared_metrics', return_value=shared):
+    start = time.perf_counter()
+    for i in range(requests):
+      timer = response_time.time()
+      active_requests.inc()
+      timer.stop()
+      active_requests.dec()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    registry.get_metrics_shared_data()
+    report = time.perf_counter() - start
+
+  return elapsed, report
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--requests', type=int, default=10000, help='Number of requests recorded.')
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+  try:
+    legacy = legacy_requests(args.requests)
+    shared, report = shared_requests(args.requests, os.path.join(tmpdir, 'metrics.workers'))
+  finally:
+    shutil.rmtree(tmpdir)
+
+  print('requests=%d legacy=%.1fus/request shared=%.1fus/request report=%.1fms' % (
+    args.requests, legacy / args.requests * 1e6, shared / args.requests * 1e6, report * 1e3)
+  )
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the application of a TColumn null bitmap to its values: yielding the eight bits of every byte and zipping them
+with the values versus expanding only the non zero bytes through a lookup table, and through NumPy when it is installed.
+"""
+
+import os
+import time
+import random
+import argparse
+from unittest.mock import patch
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from desktop.lib import python_util  # noqa: E402
+
+
+def legacy_mark_nulls(mask):
+  for n in bytearray(mask):
+    yield n & 0x01
+    yield n & 0x02
+    yield n & 0x04
+    yield n & 0x08
+
+    yield n & 0x10
+    yield n & 0x20
+    yield n & 0x40
+    yield n & 0x80
+
+
+def legacy_set_nulls(values, nulls):
+  _values = [None if is_null else value for value, is_null in zip(values, legacy_mark_nulls(nulls))]
+  if len(values) != len(_values):
+    _values.extend(values[len(_values):])
+  return _values
+
+
+def lookup_set_nulls(values, nulls):
+  with patch.object(python_util, 'numpy', None):
+    return python_util.set_nulls(values, nulls)
+
+
+def numpy_set_nulls(values, nulls):
+  with patch.object(python_util, 'NUMPY_BITMAP_MIN_BYTES', 0):
+    return python_util.set_nulls(values, nulls)
+
+
+def null_bitmap(size, ratio):
+  mask = bytearray((size + 7) // 8)
+  for i in random.sample(range(size), int(size * ratio)):
+    mask[i // 8] |= 1 << (i % 8)
+  return bytes(mask)
+
+
+def timed(fn, values, nulls, repeat):
+  start = time.perf_counter()
+  for i in range(repeat):
+    fn(values, nulls)
+  return (time.perf_counter() - start) / repeat
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--sizes', default='1024,100000,1000000', help='Comma separated number of values of the column.')
+  parser.add_argument('--null-ratios', default='0.001,0.1,0.5', help='Comma separated ratios of null values.')
+  parser.add_argument('--repeat', type=int, default=5, help='Number of runs averaged for each timing.')
+  args = parser.parse_args()
+
+  for size in [int(size) for size in args.sizes.split(',')]:
+    values = list(range(size))
+    for ratio in [float(ratio) for ratio in args.null_ratios.split(',')]:
+      nulls = null_bitmap(size, ratio)
+      expected = legacy_set_nulls(values, nulls)
+      assert expected == lookup_set_nulls(values, nulls)
+
+      legacy = timed(legacy_set_nulls, values, nulls, args.repeat)
+      lookup = timed(lookup_set_nulls, values, nulls, args.repeat)
+      if python_util.numpy is not None:
+        assert expected == numpy_set_nulls(values, nulls)
+        numpy = '%.4fs' % timed(numpy_set_nulls, values, nulls, args.repeat)
+      else:
+        numpy = 'n/a'
+
+      print('values=%-9d nulls=%-6s legacy=%.4fs lookup=%.4fs numpy=%s' % (size, ratio, legacy, lookup, numpy))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times the operations of the Oozie editor and submission on a synthetic workflow made of a chain of shell actions: parsing
+the data of the workflow on every access versus once per version of its data.
+"""
+
+import os
+import json
+import time
+import argparse
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from oozie.models2 import ParsedWorkflow, ShellAction, Workflow  # noqa: E402
+
+START_ID = '3f107997-04cc-8733-60a9-a4bb62cebffc'
+END_ID = '33430f0f-ebfa-c3ec-f237-3e77efa03d0a'
+KILL_ID = '17c9c895-5a16-7443-bb81-f34b30b21548'
+
+
+class LegacyWorkflow(Workflow):
+
+  def _get_parsed(self):
+    return ParsedWorkflow(self.document, self._parse_data(), self.user)  # Parsed again on every access
+
+
+def make_workflow_data(actions):
+  data = json.loads(Workflow().data)
+  nodes = [node for node in data['workflow']['nodes'] if node['id'] != START_ID]
+  ids = ['action-%d' % i for i in range(actions)]
+
+  for i, action_id in enumerate(ids):
+    properties = dict(ShellAction.get_fields())
+    properties['shell_command'] = 'step_%d.sh ${date}' % i
+    nodes.append({
+      'id': action_id,
+      'name': 'shell-%d' % i,
+      'type': 'shell-widget',
+      'properties': properties,
+      'children': [{'to': ids[i + 1] if i + 1 < len(ids) else END_ID}, {'error': KILL_ID}]
+    })
+
+  start = {'id': START_ID, 'name': 'Start', 'type': 'start-widget', 'properties': {}, 'children': [{'to': ids[0]}]}
+  data['workflow']['nodes'] = [start] + nodes
+  return json.dumps(data)
+
+
+def submit(workflow):
+  # The calls of Submission.deploy() and of the job parameters popup
+  workflow.find_all_parameters()
+  [node.data['type'] for node in workflow.nodes]
+  workflow.credentials
+  workflow.to_xml({'date': '2024-01-01'})
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--actions', type=int, default=500, help='Number of actions of the workflow.')
+  parser.add_argument('--repeat', type=int, default=5, help='Number of times each scenario is run.')
+  args = parser.parse_args()
+
+  data = make_workflow_data(args.actions)
+  print('actions=%d bytes=%d' % (args.actions, len(data)))
+
+  scenarios = (
+    ('open', lambda workflow: (workflow.get_json(), workflow.name, workflow.find_parameters())),
+    ('to_xml', lambda workflow: workflow.to_xml()),
+    ('submit', submit),
+  )
+  for name, scenario in scenarios:
+    for implementation, cls in (('legacy', LegacyWorkflow), ('parsed', Workflow)):
+      start = time.perf_counter()
+      for i in range(args.repeat):
+        scenario(cls(data=data))
+      elapsed = (time.perf_counter() - start) / args.repeat
+      print('%-7s %-7s time=%.2fms' % (name, implementation, elapsed * 1000))
+
+
+if __name__ == '__main__':
+  main()
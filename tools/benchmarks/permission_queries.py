@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Counts the database queries of the permission checks of page loads of an existing user: querying the group permissions at
+every check versus reading the permissions of the user cached for all the requests.
+
+A page load checks the "access" permission of an app, then the "access_view" one when it is denied, as done by
+LoginAndPermissionMiddleware, plus the checks of the page itself.
+"""
+
+import os
+import time
+import argparse
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from useradmin.models import GroupPermission, User, UserProfile  # noqa: E402
+
+
+def legacy_has_hue_permission(profile, action, app):
+  perm = profile._lookup_permission(app, action)
+  group_ids = profile.user.groups.values_list('id', flat=True)
+  return GroupPermission.objects.filter(group__id__in=group_ids, hue_permission=perm).exists()
+
+
+def cached_has_hue_permission(profile, action, app):
+  return profile.has_hue_permission(action=action, app=app)
+
+
+def page_loads(has_hue_permission, user, checks, pages):
+  with CaptureQueriesContext(connection) as queries:
+    start = time.perf_counter()
+    for i in range(pages):
+      profile = UserProfile.objects.get(user=user)  # As for a new request
+      for action, app in checks:
+        has_hue_permission(profile, action, app)
+    elapsed = time.perf_counter() - start
+  return len(queries) - pages, elapsed
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--username', required=True, help='User whose permissions are checked. Not a superuser.')
+  parser.add_argument('--app', default='notebook', help='App of the page.')
+  parser.add_argument('--page-checks', type=int, default=3, help='Number of other permission checks of the page.')
+  parser.add_argument('--pages', type=int, default=100, help='Number of page loads.')
+  args = parser.parse_args()
+
+  user = User.objects.get(username=args.username)
+  checks = [('access', args.app), ('access_view:%s' % args.app, args.app)] + [('access', args.app)] * args.page_checks
+
+  for name, has_hue_permission in (('legacy', legacy_has_hue_permission), ('cached', cached_has_hue_permission)):
+    queries, elapsed = page_loads(has_hue_permission, user, checks, args.pages)
+    print('%-6s checks/page=%d queries/page=%.2f time/page=%.2fms' % (
+      name, len(checks), queries / args.pages, elapsed / args.pages * 1000)
+    )
+
+
+if __name__ == '__main__':
+  main()
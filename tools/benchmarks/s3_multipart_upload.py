@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# Licensed to Cloudera, Inc. under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  Cloudera, Inc. licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the upload of the parts of an S3 multipart upload one after the other versus on a pool of threads, against a local
+stand-in of S3 which takes a fixed latency plus a bandwidth limited transfer time for each part.
+"""
+
+import os
+import time
+import argparse
+from io import BytesIO
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'desktop.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from aws.s3.upload import ParallelPartUploader  # noqa: E402
+
+MB = 1024 * 1024
+
+
+class LocalMultiPartUpload(object):
+
+  def __init__(self, latency, bandwidth):
+    self.key_name = 'benchmark'
+    self.latency = latency
+    self.bandwidth = bandwidth
+
+  def upload_part_from_file(self, fp, part_num):
+    data = fp.read()
+    time.sleep(self.latency + len(data) / self.bandwidth)
+
+  def cancel_upload(self):
+    pass
+
+
+def sequential_upload(mp, parts):
+  for part_num, data in enumerate(parts, 1):
+    mp.upload_part_from_file(fp=BytesIO(data), part_num=part_num)
+
+
+def parallel_upload(mp, parts, parallelism, max_inflight_size):
+  uploader = ParallelPartUploader(mp, parallelism=parallelism, max_inflight_size=max_inflight_size, retries=0)
+  for part_num, data in enumerate(parts, 1):
+    uploader.submit(part_num, data)
+  uploader.wait()
+
+
+def timed(fn, *args):
+  start = time.perf_counter()
+  fn(*args)
+  return time.perf_counter() - start
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--parts', type=int, default=16, help='Number of parts of the file.')
+  parser.add_argument('--part-size', type=int, default=8, help='Size of a part in MB.')
+  parser.add_argument('--latency', type=float, default=0.1, help='Seconds of latency of each part upload.')
+  parser.add_argument('--bandwidth', type=float, default=100, help='MB per second of a single part upload.')
+  parser.add_argument('--parallelisms', default='1,2,4,8', help='Comma separated numbers of concurrent part uploads.')
+  parser.add_argument('--max-inflight-size', type=int, default=512, help='Budget of the bytes being uploaded in MB.')
+  args = parser.parse_args()
+
+  mp = LocalMultiPartUpload(args.latency, args.bandwidth * MB)
+  parts = [os.urandom(args.part_size * MB) for i in range(args.parts)]
+  size = args.parts * args.part_size
+
+  sequential = timed(sequential_upload, mp, parts)
+  print('parallelism=%-3s %.2fs %.1f MB/s (sequential)' % ('-', sequential, size / sequential))
+
+  for parallelism in [int(parallelism) for parallelism in args.parallelisms.split(',')]:
+    elapsed = timed(parallel_upload, mp, parts, parallelism, args.max_inflight_size * MB)
+    print('parallelism=%-3d %.2fs %.1f MB/s' % (parallelism, elapsed, size / elapsed))
+
+
+if __name__ == '__main__':
+  main()